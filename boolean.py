@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+
+import heapq
+import itertools
+import math
+
+from offset import split_subpaths
+from curvefit import fit_closed_polyline, segments_to_path_data
+
+
+OPERATIONS = {
+    "union": lambda a, b: a or b,
+    "intersection": lambda a, b: a and b,
+    "difference": lambda a, b: a and not b,
+    "xor": lambda a, b: a != b,
+}
+
+
+def contour_edges(contours, owner):
+    edges = []
+    for points in contours:
+        n = len(points)
+        for i in range(n):
+            a = points[i]
+            b = points[(i + 1) % n]
+            if a != b:
+                edges.append((a, b, owner))
+    return edges
+
+
+END_EVENT = 0
+START_EVENT = 1
+
+
+class SweepSegment:
+    __slots__ = ("left", "right", "edge", "below", "above")
+
+    def __init__(self, left, right, edge):
+        self.left = left
+        self.right = right
+        self.edge = edge
+        self.below = None
+        self.above = None
+
+    def position(self, point):
+        (x1, y1), (x2, y2) = self.left, self.right
+        if x1 == x2:
+            return min(max(point[1], y1), y2)
+        if point[0] == x1:
+            return y1
+        if point[0] == x2:
+            return y2
+        return y1 + (point[0] - x1) * (y2 - y1) / (x2 - x1)
+
+    def slope(self):
+        (x1, y1), (x2, y2) = self.left, self.right
+        return math.inf if x1 == x2 else (y2 - y1) / (x2 - x1)
+
+
+def coincident(s, t):
+    rx = s.right[0] - s.left[0]
+    ry = s.right[1] - s.left[1]
+    sx = t.right[0] - t.left[0]
+    sy = t.right[1] - t.left[1]
+    scale = max(abs(rx), abs(ry), abs(sx), abs(sy), 1e-12)
+    return (
+        abs(rx * sy - ry * sx) <= 1e-12 * scale * scale
+        and abs((t.left[0] - s.left[0]) * ry - (t.left[1] - s.left[1]) * rx) <= 1e-9 * scale * scale
+    )
+
+
+def insertion_index(status, segment, point, tolerance=0.0):
+    slope = segment.slope()
+    lo, hi = 0, len(status)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        other = status[mid]
+        y = other.position(point)
+        if y < point[1] - tolerance or (abs(y - point[1]) <= tolerance and other.slope() <= slope):
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def intersect_edges(edges):
+    rank = [0] * len(edges)
+    for position, k in enumerate(sorted(range(len(edges)), key=lambda k: min(edges[k][0][0], edges[k][1][0]))):
+        rank[k] = position
+
+    xs = [p[0] for a, b, _ in edges for p in (a, b)]
+    ys = [p[1] for a, b, _ in edges for p in (a, b)]
+    tolerance = 1e-9 * max(max(xs) - min(xs), max(ys) - min(ys), 1.0)
+
+    segments = []
+    queue = []
+    sequence = itertools.count()
+
+    def add(segment):
+        segments.append(segment)
+        heapq.heappush(queue, (segment.left, START_EVENT, next(sequence), segment))
+        heapq.heappush(queue, (segment.right, END_EVENT, next(sequence), segment))
+
+    def split(segment, point):
+        if segment.left < point < segment.right:
+            add(SweepSegment(point, segment.right, segment.edge))
+            segment.right = point
+            heapq.heappush(queue, (point, END_EVENT, next(sequence), segment))
+
+    def check(s, t):
+        if s.edge == t.edge:
+            return
+        if rank[s.edge] < rank[t.edge]:
+            s, t = t, s
+        (a, b, _), (c, d, _) = edges[s.edge], edges[t.edge]
+        if max(c[1], d[1]) < min(a[1], b[1]) or min(c[1], d[1]) > max(a[1], b[1]):
+            return
+        for point, on_s, on_t in segment_crossings(a, b, c, d):
+            for vertex in (s.left, s.right, t.left, t.right):
+                if abs(vertex[0] - point[0]) <= tolerance and abs(vertex[1] - point[1]) <= tolerance:
+                    point = vertex
+                    break
+            if on_s:
+                split(s, point)
+            if on_t:
+                split(t, point)
+
+    def group(index):
+        lo = hi = index
+        while lo > 0 and coincident(status[lo - 1], status[index]):
+            lo -= 1
+        while hi + 1 < len(status) and coincident(status[hi + 1], status[index]):
+            hi += 1
+        return lo, hi
+
+    def check_neighbours(index):
+        lo, hi = group(index)
+        members = status[lo:hi + 1]
+        for other in members:
+            if other is not status[index]:
+                check(other, status[index])
+        for bound in (lo - 1, hi + 1):
+            if 0 <= bound < len(status):
+                for other in members:
+                    check(other, status[bound])
+
+    def check_across(below, above):
+        lo, _ = group(below)
+        _, hi = group(above)
+        for s in status[lo:below + 1]:
+            for t in status[above:hi + 1]:
+                check(s, t)
+
+    for k, (a, b, _) in enumerate(edges):
+        add(SweepSegment(min(a, b), max(a, b), k))
+
+    status = []
+    while queue:
+        point = queue[0][0]
+        ending = []
+        starting = []
+        while queue and queue[0][0] == point:
+            _, kind, _, segment = heapq.heappop(queue)
+            if kind == START_EVENT:
+                starting.append(segment)
+            elif segment.right == point:
+                ending.append(segment)
+
+        gaps = []
+        for segment in ending:
+            index = status.index(segment)
+            del status[index]
+            if 0 < index < len(status):
+                gaps.append((status[index - 1], status[index]))
+        for segment in starting:
+            status.insert(insertion_index(status, segment, point, tolerance), segment)
+
+        for segment in starting:
+            check_neighbours(status.index(segment))
+        for below, above in gaps:
+            if below.right > point and above.right > point:
+                index = status.index(below)
+                if index + 1 < len(status) and status[index + 1] is above:
+                    check_across(index, index + 1)
+
+    segments.sort(key=lambda segment: (segment.edge, segment.left))
+    pieces = []
+    for k, parts in itertools.groupby(segments, key=lambda segment: segment.edge):
+        a, b, owner = edges[k]
+        parts = [(segment.left, segment.right) for segment in parts]
+        if b < a:
+            parts = [(end, start) for start, end in reversed(parts)]
+        pieces.extend((start, end, owner) for start, end in parts)
+    return pieces
+
+
+def classify_pieces(pieces):
+    deltas = {}
+    for a, b, owner in pieces:
+        key = (a, b) if a < b else (b, a)
+        delta = deltas.setdefault(key, [0, 0])
+        delta[owner] += 1 if a < b else -1
+
+    segments = {key: SweepSegment(key[0], key[1], None) for key in deltas}
+    events = []
+    for key, segment in segments.items():
+        events.append((key[0], START_EVENT, segment))
+        if key[0][0] != key[1][0]:
+            events.append((key[1], END_EVENT, segment))
+    events.sort(key=lambda event: event[:2])
+
+    def wind(segment, below):
+        delta = deltas[(segment.left, segment.right)]
+        segment.below = below
+        segment.above = (below[0] + delta[0], below[1] + delta[1])
+
+    status = []
+    outside = (0, 0)
+    for point, group in itertools.groupby(events, key=lambda event: event[0]):
+        group = list(group)
+        for _, kind, segment in group:
+            if kind == END_EVENT:
+                status.remove(segment)
+
+        starting = [segment for _, kind, segment in group if kind == START_EVENT]
+        sloped = [segment for segment in starting if segment.left[0] != segment.right[0]]
+        for segment in sloped:
+            status.insert(insertion_index(status, segment, point), segment)
+        for index in sorted(status.index(segment) for segment in sloped):
+            wind(status[index], status[index - 1].above if index else outside)
+        for segment in starting:
+            if segment.below is None:
+                index = insertion_index(status, segment, point)
+                wind(segment, status[index - 1].above if index else outside)
+
+    return {key: (segment.above, segment.below) for key, segment in segments.items()}
+
+
+def segment_crossings(a, b, c, d):
+    rx = b[0] - a[0]
+    ry = b[1] - a[1]
+    sx = d[0] - c[0]
+    sy = d[1] - c[1]
+    denom = rx * sy - ry * sx
+    qx = c[0] - a[0]
+    qy = c[1] - a[1]
+    scale = max(abs(rx), abs(ry), abs(sx), abs(sy), 1e-12)
+
+    if abs(denom) <= 1e-12 * scale * scale:
+        if abs(qx * ry - qy * rx) > 1e-9 * scale * scale:
+            return []
+        crossings = []
+        length_r = rx * rx + ry * ry
+        length_s = sx * sx + sy * sy
+        for point in (c, d):
+            t = ((point[0] - a[0]) * rx + (point[1] - a[1]) * ry) / length_r
+            if 0 < t < 1:
+                crossings.append((point, True, False))
+        for point in (a, b):
+            u = ((point[0] - c[0]) * sx + (point[1] - c[1]) * sy) / length_s
+            if 0 < u < 1:
+                crossings.append((point, False, True))
+        return crossings
+
+    t = (qx * sy - qy * sx) / denom
+    u = (qx * ry - qy * rx) / denom
+    if t < 0 or t > 1 or u < 0 or u > 1:
+        return []
+
+    if t in (0, 1) or u in (0, 1):
+        if t == 0:
+            point = a
+        elif t == 1:
+            point = b
+        elif u == 0:
+            point = c
+        else:
+            point = d
+    else:
+        point = (a[0] + t * rx, a[1] + t * ry)
+    return [(point, 0 < t < 1, 0 < u < 1)]
+
+
+class WindingIndex:
+    def __init__(self, edges, buckets=None):
+        self.edges = [(a, b) for a, b, _ in edges]
+        xs = [p[0] for edge in self.edges for p in edge]
+        self.min_x = min(xs)
+        self.max_x = max(xs)
+        self.count = buckets or max(1, int(math.sqrt(len(self.edges))))
+        self.width = (self.max_x - self.min_x) / self.count or 1.0
+        self.buckets = [[] for _ in range(self.count)]
+        for edge in self.edges:
+            lo = self.bucket(min(edge[0][0], edge[1][0]))
+            hi = self.bucket(max(edge[0][0], edge[1][0]))
+            for index in range(lo, hi + 1):
+                self.buckets[index].append(edge)
+
+    def bucket(self, x):
+        return min(self.count - 1, max(0, int((x - self.min_x) / self.width)))
+
+    def winding(self, point):
+        x, y = point
+        if x < self.min_x or x > self.max_x:
+            return 0
+        winding = 0
+        for a, b in self.buckets[self.bucket(x)]:
+            if a[0] <= x < b[0]:
+                if a[1] + (x - a[0]) * (b[1] - a[1]) / (b[0] - a[0]) < y:
+                    winding += 1
+            elif b[0] <= x < a[0]:
+                if a[1] + (x - a[0]) * (b[1] - a[1]) / (b[0] - a[0]) < y:
+                    winding -= 1
+        return winding
+
+
+def is_filled(winding, fill_rule):
+    if fill_rule == "evenodd":
+        return winding % 2 != 0
+    return winding != 0
+
+
+def link_loops(directed):
+    outgoing = {}
+    for start, end in directed:
+        outgoing.setdefault(start, []).append(end)
+
+    loops = []
+    while outgoing:
+        start = next(iter(outgoing))
+        loop = [start]
+        previous = None
+        current = start
+        while True:
+            candidates = outgoing.get(current)
+            if not candidates:
+                break
+            if previous is None or len(candidates) == 1:
+                chosen = candidates[0]
+            else:
+                heading = math.atan2(current[1] - previous[1], current[0] - previous[0])
+
+                def left_turn(end):
+                    angle = math.atan2(end[1] - current[1], end[0] - current[0]) - heading
+                    return (angle + math.pi) % (2 * math.pi)
+
+                chosen = max(candidates, key=left_turn)
+            candidates.remove(chosen)
+            if not candidates:
+                del outgoing[current]
+            previous, current = current, chosen
+            if current == start:
+                break
+            loop.append(current)
+        if len(loop) >= 3:
+            loops.append(loop)
+    return loops
+
+
+def polygon_boolean(subject, clip, operation="union", fill_rule="nonzero"):
+    if operation not in OPERATIONS:
+        raise ValueError(f"Unknown boolean operation: {operation}")
+    combine = OPERATIONS[operation]
+
+    subject_edges = contour_edges(subject, 0)
+    clip_edges = contour_edges(clip, 1)
+    if not subject_edges and not clip_edges:
+        return []
+
+    pieces = intersect_edges(subject_edges + clip_edges)
+    sides = classify_pieces(pieces)
+
+    def inside(winding):
+        return combine(is_filled(winding[0], fill_rule), is_filled(winding[1], fill_rule))
+
+    seen = set()
+    directed = []
+    for a, b, _ in pieces:
+        key = (a, b) if a < b else (b, a)
+        if key in seen:
+            continue
+        seen.add(key)
+
+        left, right = sides[key]
+        if key[0] != a:
+            left, right = right, left
+        left = inside(left)
+        right = inside(right)
+
+        if left and not right:
+            directed.append((a, b))
+        elif right and not left:
+            directed.append((b, a))
+
+    return link_loops(directed)
+
+
+def path_contours(path, precision=0.05, backend=None):
+    from geometry import get_backend
+    backend = get_backend(backend)
+    try:
+        from inkex import Path
+        if isinstance(path, str):
+            path = Path(path)
+        if isinstance(path, Path):
+            path = list(path.to_absolute())
+    except ImportError:
+        pass
+
+    contours = []
+    for contour in split_subpaths(path):
+        points = backend.flatten(contour, precision)
+        while len(points) > 1 and points[0] == points[-1]:
+            points.pop()
+        if len(points) >= 3:
+            contours.append(points)
+    return contours
+
+
+def path_boolean(subject, clip, operation="union", fill_rule="nonzero", precision=0.05, fit_curves=True,
+                 backend=None):
+    from geometry import get_backend
+    backend = get_backend(backend)
+    loops = backend.boolean(
+        path_contours(subject, precision, backend), path_contours(clip, precision, backend), operation, fill_rule
+    )
+
+    parts = []
+    for loop in loops:
+        if fit_curves:
+            start, segments = fit_closed_polyline(loop, precision)
+            parts.append(segments_to_path_data(start, segments))
+        else:
+            parts.append("M " + " L ".join(f"{x},{y}" for x, y in loop) + " Z")
+    return " ".join(parts)
@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
 
+import json
+import re
 import sys
+import time
 from pathlib import Path
 
 deps_dir = Path(__file__).parent / "deps"
@@ -8,10 +11,18 @@ if deps_dir.exists() and str(deps_dir) not in sys.path:
     sys.path.insert(0, str(deps_dir))
 
 import inkex
-from inkex import PathElement, Group, TextElement
-from offset import offset_path, boolean_lpe
-from placements import pattern_along_path, calculate_path_length
-from livinghinge import create_living_hinge_pattern, detect_straight_segments
+from lxml import etree
+from inkex.elements._parser import SVG_PARSER
+from inkex import PathElement, TextElement
+from offset import boolean_lpe, HIDDER_FILTER_ID
+from primitives import detect_primitive
+from pieces import run_box_pipeline, draft_outline, draft_point_limit, OPERATIONS
+from pipeline import POOL_ERRORS
+from svgwriter import FragmentWriter
+from export import export_paths, operation_paths, piece_bbox, write_dxf, write_svg, dxf_problems, LAYERS, OPERATION_LAYERS
+from memory import MemoryMonitor, MemoryBudgetExceeded, MB, live_objects, track
+from cache import FragmentCache, StageCache, cache_key, reid_fragments, ID_REFERENCE
+from geometry import use_backend
 
 
 class Boxbot(inkex.EffectExtension):
@@ -36,6 +47,13 @@ class Boxbot(inkex.EffectExtension):
         "fill": "none",
     }
 
+    OPERATION_LABELS = {
+        "inner": "1 Inner cuts",
+        "hinges": "2 Hinges",
+        "outer": "3 Outer cuts",
+        "guides": "Guides and labels (not cut)",
+    }
+
     LABEL_STYLE = {
         "font-size": "6px",
         "fill": "#ffff00",
@@ -44,6 +62,16 @@ class Boxbot(inkex.EffectExtension):
         "dominant-baseline": "middle",
     }
 
+    def __init__(self):
+        super().__init__()
+        self.stage_memo = {}
+        self.issued_ids = set()
+        self.id_counts = {}
+        self.drc_summary_record = None
+        self.messages_record = []
+        self.drc_summaries = {}
+        self.operation_layers = {}
+
     def add_arguments(self, pars):
         pars.add_argument("--units", default="mm", help="Document units")
         pars.add_argument("--notebook", default="box", help="Active notebook tab")
@@ -57,10 +85,18 @@ class Boxbot(inkex.EffectExtension):
         pars.add_argument("--tab_start_offset", type=float, default=0.0, help="Tab start offset")
         pars.add_argument("--tab_border_radius", type=float, default=0.5, help="Tab border radius")
         pars.add_argument("--num_tabs", type=int, default=8, help="Number of tabs per side")
+        pars.add_argument("--tab_placement", default="manual", help="Tab placement: manual start offset or optimized")
+        pars.add_argument("--max_tab_nudge", type=float, default=0.0, help="Maximum per-tab nudge when optimizing")
         pars.add_argument("--generate_living_hinge", type=inkex.Boolean, default=False, help="Generate living hinge pattern")
         pars.add_argument("--hinge_length_percent", type=int, default=25, help="Hinge cut length as percentage of side height")
         pars.add_argument("--hinge_gap", type=float, default=1.5, help="Hinge gap")
         pars.add_argument("--hinge_spacing", type=float, default=5.0, help="Hinge spacing")
+        pars.add_argument("--hinge_emission", default="separate", help="Hinge slit emission mode")
+        pars.add_argument("--hinge_lead_in", type=float, default=0.5, help="Hinge slit lead-in past the material edge")
+        pars.add_argument("--hinge_tab_clearance", type=float, default=1.0, help="Clearance between hinge slits and tabs")
+        pars.add_argument("--bend_detection", default="curvature", help="Bend detection: curvature or legacy segment length")
+        pars.add_argument("--min_straight_length", type=float, default=20.0, help="Shortest straight run kept free of hinges")
+        pars.add_argument("--bend_radius", type=float, default=500.0, help="Radius below which the outline counts as a bend")
         pars.add_argument("--magnet_type", default="none", help="Magnet type")
         pars.add_argument("--rectangle_magnet_width", type=float, default=6.0, help="Rectangle magnet width")
         pars.add_argument("--rectangle_magnet_height", type=float, default=2.0, help="Rectangle magnet height")
@@ -68,481 +104,462 @@ class Boxbot(inkex.EffectExtension):
         pars.add_argument("--num_magnets", type=int, default=4, help="Number of magnets")
         pars.add_argument("--magnet_placement_offset", type=float, default=0.0, help="Magnet placement offset")
         pars.add_argument("--hide_magnets", type=inkex.Boolean, default=True, help="Hide magnets")
-
-    def create_label(self, text, bbox, label_id):
+        pars.add_argument("--offset_engine", default="vertex", help="Offset engine for non-primitive outlines")
+        pars.add_argument("--boolean_mode", default="lpe", help="Join side tabs with a live LPE or bake the result")
+        pars.add_argument("--geometry_backend", default="auto", help="Geometry backend: auto (numpy, else python), numpy, python, or pyclipper/shapely for booleans only")
+        pars.add_argument("--bake_transforms", type=inkex.Boolean, default=False, help="Apply placements to path coordinates instead of per-element transforms")
+        pars.add_argument("--deterministic_ids", type=inkex.Boolean, default=False, help="Derive generated ids from a stable namespace")
+        pars.add_argument("--id_namespace", default="", help="Namespace for deterministic ids (defaults to the selected path id)")
+        pars.add_argument("--result_cache", default="use", help="Result cache mode: use, bypass or clear")
+        pars.add_argument("--pipeline_workers", type=int, default=0, help="Worker processes for independent pipeline stages")
+        pars.add_argument("--cache_size_mb", type=int, default=64, help="Result cache size limit in megabytes")
+        pars.add_argument("--quality", default="full", help="Output quality: full, or draft for a coarse outline with hinge placeholders and no labels or tab joins")
+        pars.add_argument("--draft_time_budget", type=float, default=0.5, help="Draft only: seconds that set how far the outline is simplified; lid pieces and design rule checks that would start after them are skipped")
+        pars.add_argument("--operation_layers", type=inkex.Boolean, default=False, help="Route cuts into per-operation layers in execution order")
+        pars.add_argument("--export_file", default="", help="Write the generated cuts to this DXF or SVG file")
+        pars.add_argument("--export_format", default="dxf", help="Export format: dxf or svg")
+        pars.add_argument("--export_guides", type=inkex.Boolean, default=False, help="Also export guides and labels (META geometry that is not cut)")
+        pars.add_argument("--export_only", type=inkex.Boolean, default=False, help="Only write the export file, leave the document unchanged")
+        pars.add_argument("--memory_report", type=inkex.Boolean, default=False, help="Report memory use per generation stage")
+        pars.add_argument("--memory_budget_mb", type=int, default=0, help="Abort when peak memory exceeds this many megabytes (0 = no limit)")
+        pars.add_argument("--design_rules", type=inkex.Boolean, default=False, help="Check generated cuts against design rules")
+        pars.add_argument("--drc_min_web", type=float, default=1.0, help="Minimum material web between cuts")
+        pars.add_argument("--drc_min_feature", type=float, default=0.5, help="Minimum cut feature size")
+        pars.add_argument("--drc_report", default="", help="Write the design rule summary as JSON to this file")
+
+    CACHE_IGNORED_OPTIONS = (
+        "ids", "input_file", "output", "selected_nodes", "notebook", "result_cache", "cache_size_mb", "pipeline_workers",
+        "drc_report", "export_file", "export_format", "export_guides", "export_only", "memory_report", "memory_budget_mb",
+    )
+
+    def cache_options(self):
+        options = {
+            name: value for name, value in vars(self.options).items()
+            if name not in self.CACHE_IGNORED_OPTIONS
+        }
+        options["user_unit"] = self.svg.unittouu("1mm")
+        options["id_namespace"] = self.id_namespace
+        options["geometry_backend"] = self.geometry_backend
+        return options
+
+    def capture_fragments(self, layer_before, defs_before):
+        layer = [
+            etree.tostring(child, encoding="unicode") for child in self.svg.get_current_layer()
+            if child not in layer_before and child is not self.svg.defs
+        ]
+        referenced = set()
+        for fragment in layer:
+            referenced.update(ID_REFERENCE.findall(fragment))
+        defs = [
+            etree.tostring(child, encoding="unicode") for child in self.svg.defs
+            if child not in defs_before or child.get("id") in referenced
+        ]
+        return {"layer": layer, "defs": defs}
+
+    def new_id(self, prefix, piece=None):
+        if self.options.deterministic_ids:
+            return self.next_id("-".join(part for part in (self.id_namespace, piece, prefix) if part))
+
+        new_id = self.svg.get_unique_id(prefix, blacklist=self.issued_ids)
+        self.issued_ids.add(new_id)
+        return new_id
+
+    def next_id(self, base):
+        index = self.id_counts.get(base, 0)
+        new_id = f"{base}-{index}"
+        while new_id in self.issued_ids or self.svg.getElementById(new_id) is not None:
+            index += 1
+            new_id = f"{base}-{index}"
+
+        self.id_counts[base] = index + 1
+        self.issued_ids.add(new_id)
+        return new_id
+
+    def insert_fragments(self, record):
+        def new_id(old_id):
+            if self.options.deterministic_ids:
+                if old_id not in self.issued_ids and self.svg.getElementById(old_id) is None:
+                    self.issued_ids.add(old_id)
+                    return old_id
+                return self.next_id(old_id.rsplit("-", 1)[0])
+            return self.new_id(re.sub(r'\d+$', '', old_id) or old_id)
+
+        layer_count = len(record["layer"])
+        fragments = reid_fragments(record["layer"] + record["defs"], new_id, keep=(HIDDER_FILTER_ID,))
+        current_layer = self.svg.get_current_layer()
+        inserted = []
+        for index, fragment in enumerate(fragments):
+            element = etree.fromstring(fragment, parser=SVG_PARSER)
+            if index < layer_count:
+                current_layer.append(element)
+                inserted.append(element)
+            elif self.svg.getElementById(element.get("id")) is None:
+                self.svg.defs.append(element)
+        return inserted
+
+    def create_label(self, text, bbox, label_id, piece=None):
         label = TextElement()
-        label.set_id(self.svg.get_unique_id(label_id))
+        label.set_id(self.new_id(label_id, piece))
         label.set('x', str(bbox.center_x))
         label.set('y', str(bbox.center_y))
         label.style = self.LABEL_STYLE
         label.text = text
         return label
 
-    def create_bottom_tabs_piece(self, inset_path_d):
-
-        def create_tab(index):
-            x = -tab_width / 2
-            y = -tab_height / 2
-            path_data = f"M {x},{y} L {x + tab_width},{y} L {x + tab_width},{y + tab_height} L {x},{y + tab_height} Z"
-
-            tab = PathElement()
-            tab.set_id(self.svg.get_unique_id(f"tab_{index}"))
-            tab.set('d', path_data)
-            return tab
-
-        group = Group(id=self.svg.get_unique_id("boxbot"))
-        self.svg.get_current_layer().add(group)
-
-        self.inset_path = PathElement()
-        self.inset_path.set_id(self.svg.get_unique_id("inset_path"))
-        self.inset_path.set('d', inset_path_d)
-        self.inset_path.style = self.META_STYLE
-        group.append(self.inset_path)
-
-        inset_csp = inkex.Path(inset_path_d).to_superpath()
-        self.inset_length = sum(
-            inkex.bezier.bezierlength((seg[1], seg[2], next_seg[0], next_seg[1]))
-            for subpath in inset_csp
-            for i, seg in enumerate(subpath[:-1])
-            for next_seg in [subpath[i + 1]]
-        )
-
-        kerf = self.svg.unittouu(f"{self.options.kerf}{self.options.units}")
-        tab_width = self.svg.unittouu(f"{self.options.tab_width}{self.options.units}") - kerf
-        tab_height = self.svg.unittouu(f"{self.options.material_thickness}{self.options.units}") - kerf
-        tab_start_offset = self.svg.unittouu(f"{self.options.tab_start_offset}{self.options.units}")
-
-        self.tabs = pattern_along_path(
-            inset_path_d,
-            self.options.num_tabs,
-            tab_width,
-            tab_start_offset,
-            "simple",
-            create_tab
-        )
-        for tab in self.tabs:
-            tab.style = self.CUT_INNER_STYLE
-            group.append(tab)
-
-        bottom_tabs_label = self.create_label("bottom tabs", group.bounding_box(), "bottom_tabs_label")
-        group.append(bottom_tabs_label)
-        self.bottom_inset = self.inset_path
-        self.bottom_tab_holes = self.tabs
-
-    def create_bottom_piece(self, offset_x):
-        bottom_group = Group(id=self.svg.get_unique_id("bottom"))
-        self.svg.get_current_layer().add(bottom_group)
-
-        bottom_path = PathElement()
-        bottom_path.set_id(self.svg.get_unique_id("bottom_path"))
-        bottom_path.set('d', str(self.original_path))
-        bottom_path.style = self.CUT_OUTER_STYLE
-        bottom_group.append(bottom_path)
-
-        bottom_inset = self.bottom_inset.copy()
-        bottom_inset.set_id(self.svg.get_unique_id("bottom_inset"))
-        bottom_group.append(bottom_inset)
-
-        for i, tab in enumerate(self.bottom_tab_holes):
-            bottom_tab = tab.copy()
-            bottom_tab.set_id(self.svg.get_unique_id(f"bottom_tab_{i}"))
-            bottom_tab.style = self.META_STYLE
-            bottom_group.append(bottom_tab)
-
-        bottom_bbox = bottom_group.bounding_box()
-        bottom_label = self.create_label("bottom", bottom_bbox, "bottom_label")
-        bottom_group.append(bottom_label)
-
-        bottom_group.transform = inkex.Transform(translate=(offset_x, 0))
-
-    def create_top_tabs_piece(self, offset_x):
-        top_tabs_group = Group(id=self.svg.get_unique_id("top_tabs"))
-        self.svg.get_current_layer().add(top_tabs_group)
-
-        top_tabs_original = PathElement()
-        top_tabs_original.set_id(self.svg.get_unique_id("top_tabs_original"))
-        top_tabs_original.set('d', str(self.original_path))
-        top_tabs_original.style = self.CUT_OUTER_STYLE
-        top_tabs_group.append(top_tabs_original)
-
-        top_tabs_inset = self.inset_path.copy()
-        top_tabs_inset.set_id(self.svg.get_unique_id("top_tabs_inset"))
-        top_tabs_group.append(top_tabs_inset)
-
-        for tab in self.tabs:
-            top_tab = tab.copy()
-            top_tab.set_id(self.svg.get_unique_id("top_tab"))
-            top_tabs_group.append(top_tab)
-
-        from offset import offset_path as create_offset_path
-        top_hole_inset_dist = -self.svg.unittouu(f"{self.options.top_hole_inset}{self.options.units}")
-        self.top_hole_inset = None
-        try:
-            top_hole_inset_d = create_offset_path(self.original_path, top_hole_inset_dist)
-            self.top_hole_inset = PathElement()
-            self.top_hole_inset.set_id(self.svg.get_unique_id("top_hole_inset"))
-            self.top_hole_inset.set('d', top_hole_inset_d)
-            self.top_hole_inset.style = self.CUT_INNER_STYLE
-            top_tabs_group.append(self.top_hole_inset)
-        except ValueError:
-            pass
-
-        self.magnets = []
-        if self.options.magnet_type != "none":
-            num_magnets = self.options.num_magnets
-            magnet_placement_offset = self.svg.unittouu(f"{self.options.magnet_placement_offset}{self.options.units}")
-            inset_path_d = self.inset_path.get('d')
-
-            def create_magnet(index):
-                if self.options.magnet_type == "rectangle":
-                    magnet_width = self.svg.unittouu(f"{self.options.rectangle_magnet_width}{self.options.units}")
-                    magnet_height = self.svg.unittouu(f"{self.options.rectangle_magnet_height}{self.options.units}")
-
-                    rect_x = -magnet_width / 2
-                    rect_y = -magnet_height / 2
-                    path_data = (
-                        f"M {rect_x},{rect_y} "
-                        f"L {rect_x + magnet_width},{rect_y} "
-                        f"L {rect_x + magnet_width},{rect_y + magnet_height} "
-                        f"L {rect_x},{rect_y + magnet_height} Z"
-                    )
-                else:
-                    magnet_diameter = self.svg.unittouu(f"{self.options.circle_magnet_diameter}{self.options.units}")
-                    radius = magnet_diameter / 2
-                    path_data = (
-                        f"M {radius},0 "
-                        f"A {radius},{radius} 0 0 1 0,{radius} "
-                        f"A {radius},{radius} 0 0 1 {-radius},0 "
-                        f"A {radius},{radius} 0 0 1 0,{-radius} "
-                        f"A {radius},{radius} 0 0 1 {radius},0 Z"
-                    )
-
-                magnet = PathElement()
-                magnet.set_id(self.svg.get_unique_id(f"magnet_{index}"))
-                magnet.set('d', path_data)
-                magnet.style = self.CUT_OUTER_STYLE if self.options.hide_magnets else self.META_STYLE
-                return magnet
-
-            if self.options.magnet_type == "rectangle":
-                item_width = self.svg.unittouu(f"{self.options.rectangle_magnet_width}{self.options.units}")
+    def uu(self, value):
+        return self.svg.unittouu(f"{value}{self.options.units}")
+
+    def pipeline_params(self):
+        tab_height = self.uu(self.options.material_thickness)
+        top_hole_inset = self.uu(self.options.top_hole_inset)
+        outline = self.original_path
+        if self.options.quality == "draft" and self.outline_shape is None:
+            outline = draft_outline(outline, draft_point_limit(self.draft_seconds), backend=self.geometry_backend)
+
+        return {
+            "outline": outline,
+            "outline_d": str(outline),
+            "outline_shape": self.outline_shape,
+            "offset_engine": self.options.offset_engine,
+            "geometry_backend": self.geometry_backend,
+            "tab_inset": -self.uu(self.options.tab_inset),
+            "top_hole_inset": -top_hole_inset,
+            "lid_fitting_inset": -(top_hole_inset + self.svg.unittouu("1mm")),
+            "generate_lid": self.options.generate_lid,
+            "kerf": self.uu(self.options.kerf),
+            "tab_width": self.uu(self.options.tab_width),
+            "material_thickness": tab_height,
+            "tab_start_offset": self.uu(self.options.tab_start_offset),
+            "tab_placement": self.options.tab_placement,
+            "max_tab_nudge": self.uu(self.options.max_tab_nudge),
+            "num_tabs": self.options.num_tabs,
+            "magnet_type": self.options.magnet_type,
+            "magnet_width": self.uu(self.options.rectangle_magnet_width),
+            "magnet_height": self.uu(self.options.rectangle_magnet_height),
+            "magnet_diameter": self.uu(self.options.circle_magnet_diameter),
+            "num_magnets": self.options.num_magnets,
+            "magnet_placement_offset": self.uu(self.options.magnet_placement_offset),
+            "hide_magnets": self.options.hide_magnets,
+            "box_height": self.uu(self.options.box_height),
+            "tab_border_radius": self.uu(self.options.tab_border_radius),
+            "boolean_mode": self.options.boolean_mode,
+            "bake_transforms": self.options.bake_transforms,
+            "min_straight_length": self.uu(self.options.min_straight_length),
+            "bend_detection": self.options.bend_detection,
+            "bend_radius": self.uu(self.options.bend_radius),
+            "generate_living_hinge": self.options.generate_living_hinge,
+            "hinge_length_percent": self.options.hinge_length_percent,
+            "hinge_gap": self.uu(self.options.hinge_gap),
+            "hinge_spacing": self.uu(self.options.hinge_spacing),
+            "hinge_emission": self.options.hinge_emission,
+            "hinge_lead_in": self.uu(self.options.hinge_lead_in),
+            "hinge_tab_clearance": self.uu(self.options.hinge_tab_clearance),
+            "quality": self.options.quality,
+            "flatten_tolerance": 0.5 if self.options.quality == "draft" else 0.05,
+            "design_rules": self.options.design_rules,
+            "drc_min_web": self.uu(self.options.drc_min_web),
+            "drc_min_feature": self.uu(self.options.drc_min_feature),
+            "drc_tolerance": self.uu(0.05),
+            "side_offset": (
+                self.original_path_bbox.left,
+                self.original_path_bbox.bottom + self.svg.unittouu("2mm") + tab_height,
+            ),
+        }
+
+    def annotate_violations(self, group, piece, violations, bbox):
+        radius = self.svg.unittouu("2mm")
+        for violation in violations:
+            if violation["at"] is None:
+                x, y = bbox.center_x, bbox.bottom + radius
             else:
-                item_width = self.svg.unittouu(f"{self.options.circle_magnet_diameter}{self.options.units}")
-
-            self.magnets = pattern_along_path(
-                inset_path_d,
-                num_magnets,
-                item_width,
-                magnet_placement_offset,
-                "even",
-                create_magnet
+                x, y = violation["at"]
+                marker = PathElement()
+                marker.set_id(self.new_id(f"drc_{violation['rule']}", piece))
+                marker.set('d', f"M {x - radius},{y} a {radius},{radius} 0 1 0 {2 * radius},0 a {radius},{radius} 0 1 0 {-2 * radius},0 Z")
+                marker.style = self.META_STYLE
+                group.append(marker)
+
+            label = TextElement()
+            label.set_id(self.new_id("drc_label", piece))
+            label.set('x', str(x))
+            label.set('y', str(y + 2 * radius))
+            label.style = self.LABEL_STYLE
+            label.text = self.violation_text(violation)
+            group.append(label)
+
+    def violation_text(self, violation):
+        value = violation["value"] / self.uu(1)
+        if violation["rule"] == "collapsed_offset":
+            return f"{violation['items'][0]} collapsed at {value:.2f}{self.options.units}"
+        if violation["rule"] == "overlap":
+            return "overlapping cuts"
+        limit = violation["limit"] / self.uu(1)
+        return f"{violation['rule']} {value:.2f} < {limit:.2f}{self.options.units}"
+
+    def drc_summary(self, report):
+        unit = self.uu(1)
+        return {
+            "units": self.options.units,
+            "summary": report["summary"],
+            "violations": [
+                dict(
+                    violation,
+                    at=None if violation["at"] is None else [violation["at"][0] / unit, violation["at"][1] / unit],
+                    value=violation["value"] / unit,
+                    limit=None if violation["limit"] is None else violation["limit"] / unit,
+                )
+                for violation in report["violations"]
+            ],
+        }
+
+    def report_design_rules(self, summaries):
+        if not summaries:
+            return
+
+        if self.options.drc_report:
+            report = next(iter(summaries.values())) if len(summaries) == 1 else {"outlines": summaries}
+            try:
+                with open(self.options.drc_report, "w", encoding="utf-8") as handle:
+                    json.dump(report, handle, indent=2)
+            except OSError as e:
+                self.msg(f"Could not write design rule report: {e}")
+
+        for namespace, summary in summaries.items():
+            if summary["violations"]:
+                counts = ", ".join(f"{rule}: {count}" for rule, count in sorted(summary["summary"].items()))
+                source = f" ({namespace})" if len(summaries) > 1 else ""
+                self.msg(f"Design rules{source}: {len(summary['violations'])} violations ({counts})")
+
+    def piece_records(self, piece, indices):
+        styles = {
+            "outer": str(inkex.Style(self.CUT_OUTER_STYLE)),
+            "inner": str(inkex.Style(self.CUT_INNER_STYLE)),
+            "meta": str(inkex.Style(self.META_STYLE)),
+        }
+        for index in indices:
+            record = piece["items"][index]
+            yield (
+                self.new_id(record["id"], piece["group"]),
+                record["d"],
+                styles[record["style"]],
+                record["transform"],
             )
 
-            for magnet in self.magnets:
-                top_tabs_group.append(magnet)
-
-        top_tabs_bbox = top_tabs_group.bounding_box()
-        top_tabs_label = self.create_label("top tabs", top_tabs_bbox, "top_tabs_label")
-        top_tabs_group.append(top_tabs_label)
-        top_tabs_group.transform = inkex.Transform(translate=(offset_x, 0))
-
-    def create_top_piece(self, offset_x):
-        top_group = Group(id=self.svg.get_unique_id("top"))
-        self.svg.get_current_layer().add(top_group)
-
-        top_path = PathElement()
-        top_path.set_id(self.svg.get_unique_id("top_path"))
-        top_path.set('d', str(self.original_path))
-        top_path.style = self.CUT_OUTER_STYLE
-        top_group.append(top_path)
-
-        top_inset = self.inset_path.copy()
-        top_inset.set_id(self.svg.get_unique_id("top_inset"))
-        top_group.append(top_inset)
-
-        for tab in self.tabs:
-            top_tab = tab.copy()
-            top_tab.set_id(self.svg.get_unique_id("top_tab"))
-            top_tab.style = self.META_STYLE
-            top_group.append(top_tab)
-
-        if self.top_hole_inset is not None:
-            top_hole_inset_copy = self.top_hole_inset.copy()
-            top_hole_inset_copy.set_id(self.svg.get_unique_id("top_hole_inset"))
-            top_group.append(top_hole_inset_copy)
-
-        if len(self.magnets) > 0:
-            for i, magnet in enumerate(self.magnets):
-                magnet_copy = magnet.copy()
-                magnet_copy.set_id(self.svg.get_unique_id(f"top_magnet_{i}"))
-                magnet_copy.style = self.META_STYLE if self.options.hide_magnets else self.CUT_OUTER_STYLE
-                top_group.append(magnet_copy)
-
-        top_bbox = top_group.bounding_box()
-        top_label = self.create_label("top", top_bbox, "top_label")
-        top_group.append(top_label)
-        top_group.transform = inkex.Transform(translate=(offset_x, 0))
-
-    def create_side_piece(self, offset_x, offset_y, inset_path_d):
-
-        side_group = Group(id=self.svg.get_unique_id("side"))
-        self.svg.get_current_layer().add(side_group)
-
-        tab_width = self.svg.unittouu(f"{self.options.tab_width}{self.options.units}")
-        tab_height = self.svg.unittouu(f"{self.options.material_thickness}{self.options.units}")
-        tab_start_offset = self.svg.unittouu(f"{self.options.tab_start_offset}{self.options.units}")
-        num_tabs = self.options.num_tabs
-
-        rect_width = self.inset_length
-        rect_height = (self.svg.unittouu(f"{self.options.box_height}{self.options.units}") -
-                      4 * self.svg.unittouu(f"{self.options.material_thickness}{self.options.units}"))
-
-        rect_path_data = f"M 0,0 L {rect_width},0 L {rect_width},{rect_height} L 0,{rect_height} Z"
-
-        side_rect = PathElement()
-        side_rect.set_id(self.svg.get_unique_id("side_rect"))
-        side_rect.set('d', rect_path_data)
-        side_rect.style = self.CUT_OUTER_STYLE
-        side_rect.transform = inkex.Transform(translate=(offset_x, offset_y))
-        side_group.append(side_rect)
-
-        corner_radius = self.svg.unittouu(f"{self.options.tab_border_radius}{self.options.units}")
-        total_tabs = num_tabs + 1
-        half_tab_width = tab_width / 2
-
-        full_tab_height = rect_height + 2 * tab_height
-        tab_y = -tab_height
-
-        tab_elements = []
-
-        for i in range(total_tabs):
-            if i == 0:
-                current_tab_width = half_tab_width
-                tab_x = 0
-            elif i == total_tabs - 1:
-                current_tab_width = half_tab_width
-                tab_x = rect_width - half_tab_width
+    def operation_layer(self, operation):
+        if operation not in self.operation_layers:
+            layer = inkex.Layer.new(self.OPERATION_LABELS[operation])
+            layer.set_id(self.new_id(f"layer_{operation}"))
+            if operation == "guides":
+                layer.set("sodipodi:insensitive", "true")
+
+            later = [
+                self.operation_layers[other] for other in OPERATIONS[OPERATIONS.index(operation) + 1:]
+                if other in self.operation_layers
+            ]
+            if later:
+                later[0].addprevious(layer)
             else:
-                current_tab_width = tab_width
-                spacing = rect_width / num_tabs
-                tab_x = i * spacing - current_tab_width / 2
-
-            r = min(corner_radius, current_tab_width / 2, full_tab_height / 2)
-            tab_path = (
-                f"M {tab_x + r},{tab_y} "
-                f"L {tab_x + current_tab_width - r},{tab_y} "
-                f"A {r},{r} 0 0 1 {tab_x + current_tab_width},{tab_y + r} "
-                f"L {tab_x + current_tab_width},{tab_y + full_tab_height - r} "
-                f"A {r},{r} 0 0 1 {tab_x + current_tab_width - r},{tab_y + full_tab_height} "
-                f"L {tab_x + r},{tab_y + full_tab_height} "
-                f"A {r},{r} 0 0 1 {tab_x},{tab_y + full_tab_height - r} "
-                f"L {tab_x},{tab_y + r} "
-                f"A {r},{r} 0 0 1 {tab_x + r},{tab_y} "
-                f"Z"
+                self.svg.get_current_layer().append(layer)
+            self.operation_layers[operation] = layer
+        return self.operation_layers[operation]
+
+    def piece_parts(self, piece):
+        indices = list(range(len(piece["items"])))
+        if not self.options.operation_layers:
+            return [(self.svg.get_current_layer(), piece["group"], indices)]
+
+        owners = {}
+        if "boolean" in piece:
+            target, operands = piece["boolean"]
+            owners = dict.fromkeys(operands, target)
+        operations = {}
+        for index in indices:
+            operations.setdefault(piece["items"][owners.get(index, index)]["operation"], []).append(index)
+        return [
+            (self.operation_layer(operation), f"{piece['group']}_{operation}", operations.get(operation, []))
+            for operation in OPERATIONS if operation in operations or operation == "guides"
+        ]
+
+    def assemble_piece(self, piece, offset_x=0, offset_y=0, violations=()):
+        groups = []
+        elements = {}
+        bbox = None
+        for layer, group_id, indices in self.piece_parts(piece):
+            writer = FragmentWriter()
+            writer.start_group(self.new_id(group_id))
+            writer.paths(self.piece_records(piece, indices))
+            writer.end_group()
+
+            group = writer.elements()[0]
+            layer.append(group)
+            elements.update(zip(indices, group))
+            groups.append(group)
+            bbox += writer.bbox
+
+        if "boolean" in piece:
+            target, operands = piece["boolean"]
+            boolean_lpe(
+                self.svg, elements[target], [elements[i] for i in operands], operation="union",
+                id_factory=lambda prefix: self.new_id(prefix, piece["group"])
             )
 
-            tab_elem = PathElement()
-            tab_elem.set_id(self.svg.get_unique_id("side_tab"))
-            tab_elem.set('d', tab_path)
-            tab_elem.style = self.META_STYLE
-            tab_elem.transform = inkex.Transform(translate=(offset_x, offset_y))
-            side_group.append(tab_elem)
-            tab_elements.append(tab_elem)
-
-        boolean_lpe(self.svg, side_rect, tab_elements, operation="union")
+        annotations = groups[-1]
+        annotated = len(annotations)
+        if self.options.quality != "draft":
+            text, label_id = piece["label"]
+            annotations.append(self.create_label(text, bbox, label_id, piece["group"]))
+        if violations:
+            self.annotate_violations(annotations, piece["group"], violations, bbox)
+
+        for child in annotations[annotated:]:
+            bbox += child.bounding_box()
+
+        for group in groups[:]:
+            if not len(group):
+                group.getparent().remove(group)
+                groups.remove(group)
+            elif offset_x or offset_y:
+                group.transform = inkex.Transform(translate=(offset_x, offset_y))
+        return groups, inkex.BoundingBox(
+            (bbox.left + offset_x, bbox.right + offset_x), (bbox.top + offset_y, bbox.bottom + offset_y)
+        )
 
-        path = inkex.Path(inset_path_d)
-        total_length = calculate_path_length(path)
+    def layout_box(self, results, place):
+        offset_x = self.original_path_bbox.width + self.svg.unittouu("2mm")
+        layout = [
+            ("bottom_tabs", 0, 0),
+            ("bottom", offset_x, 0),
+            ("top_tabs", 2 * offset_x, 0),
+            ("top", 3 * offset_x, 0),
+            ("side", 0, 0),
+        ]
+        placed = [(name, x, y) + place(name, x, y) for name, x, y in layout]
+
+        if not self.options.generate_lid:
+            return placed
+
+        translate_y = placed[-1][4].bottom + self.svg.unittouu("2mm") - self.original_path_bbox.top
+        lid_offset_x = 0
+        for name in ("lid_top", "lid_middle", "lid_bottom", "lid_fitting"):
+            if results[name] is None:
+                continue
+            placed.append((name, lid_offset_x, translate_y) + place(name, lid_offset_x, translate_y))
+            lid_offset_x = placed[-1][4].right + self.svg.unittouu("2mm") - self.original_path_bbox.left
+
+        return placed
+
+    def assemble_box(self, results):
+        violations = {}
+        self.drc_summary_record = None
+        if results["drc"] is not None:
+            for violation in results["drc"]["violations"]:
+                violations.setdefault(violation["piece"], []).append(violation)
+            self.drc_summary_record = self.drc_summary(results["drc"])
+
+        placed = self.layout_box(
+            results, lambda name, x, y: self.assemble_piece(results[name], x, y, violations=violations.get(name))
+        )
 
-        gap = (total_length - num_tabs * tab_width) / num_tabs
-        first_tab_start = tab_start_offset % total_length
-        first_tab_center = (first_tab_start + tab_width / 2) % total_length
-        side_start_offset = first_tab_center
+        self.messages_record = self.box_messages(results)
+        for message in self.messages_record:
+            self.msg(message)
 
-        straight_segments = detect_straight_segments(inset_path_d, 20.0, self.svg, self.options.units)
+        return placed
 
-        adjusted_straight_segments = []
-        for seg_start, seg_end in straight_segments:
-            start_pos = (seg_start - side_start_offset) % total_length
-            end_pos = (seg_end - side_start_offset) % total_length
+    def box_messages(self, results):
+        messages = []
+        fallback = results["inset"]["offset_fallback"]
+        if fallback:
+            messages.append(
+                f"Offset engine '{self.options.offset_engine}' was not used ({fallback}); used the vertex engine"
+            )
 
-            if start_pos < end_pos:
-                adjusted_straight_segments.append((start_pos, end_pos))
-            else:
-                adjusted_straight_segments.append((start_pos, total_length))
-                adjusted_straight_segments.append((0, end_pos))
+        offset_stats = results["inset"]["offset_stats"]
+        if "sdf_cell" in offset_stats:
+            units = self.options.units
+            cell = self.svg.uutounit(offset_stats["sdf_cell"], units)
+            requested = self.svg.uutounit(offset_stats["sdf_requested_cell"], units)
+            messages.append(
+                f"Distance-field offset: grid cells widened from {requested:.3g}{units} to {cell:.3g}{units} to stay "
+                f"under the cell limit; insets may be off by up to {cell:.3g}{units}"
+            )
 
-        hinge_regions = []
-        if not adjusted_straight_segments:
-            hinge_regions = [(0, rect_width)]
+        hinge_stats = results["side"]["hinge_stats"]
+        if self.options.generate_living_hinge and self.options.hinge_emission == "chained" and hinge_stats:
+            messages.append(
+                f"Living hinge: {hinge_stats['pierces']} pierces for {hinge_stats['slits']} slits "
+                f"({hinge_stats['separate_pierces'] - hinge_stats['pierces']} fewer than separate slits)"
+            )
+        if hinge_stats.get("suppressed_columns"):
+            messages.append(f"Living hinge: {hinge_stats['suppressed_columns']} slit columns suppressed around tabs")
+        return messages
+
+    def memory_stages(self, first):
+        return [] if self.monitor is None else self.monitor.stages[first:]
+
+    def layout_export(self, results):
+        def place(name, x, y):
+            bbox = piece_bbox(results[name])
+            return [], inkex.BoundingBox((bbox.left + x, bbox.right + x), (bbox.top + y, bbox.bottom + y))
+
+        self.drc_summary_record = None
+        if results["drc"] is not None:
+            self.drc_summary_record = self.drc_summary(results["drc"])
+        return self.layout_box(results, place)
+
+    def place_pieces(self, bboxes, occupied):
+        gap = self.svg.unittouu("2mm")
+
+        dy = 0
+        while True:
+            shift = 0
+            for bbox in bboxes[1:]:
+                for other in occupied:
+                    if (bbox.left < other.right and other.left < bbox.right
+                            and bbox.top + dy < other.bottom and other.top < bbox.bottom + dy):
+                        shift = max(shift, other.bottom + gap - bbox.top - dy)
+            if shift <= 0:
+                break
+            dy += shift
+
+        for index, bbox in enumerate(bboxes):
+            if index and dy:
+                bbox = inkex.BoundingBox((bbox.left, bbox.right), (bbox.top + dy, bbox.bottom + dy))
+            occupied.append(bbox)
+        return dy
+
+    def write_export(self, placed):
+        styles = {
+            "outer": str(inkex.Style(self.CUT_OUTER_STYLE)),
+            "inner": str(inkex.Style(self.CUT_INNER_STYLE)),
+            "meta": str(inkex.Style(self.META_STYLE)),
+        }
+        scale = 1 / self.svg.unittouu("1mm")
+        if self.options.operation_layers:
+            styles["hinges"] = styles["inner"]
+            styles["guides"] = styles["meta"]
+            layers = dict(OPERATION_LAYERS, guides=LAYERS["meta"]) if self.options.export_guides else OPERATION_LAYERS
+            paths = operation_paths(placed, scale, layers=layers)
         else:
-            adjusted_straight_segments = sorted(adjusted_straight_segments, key=lambda x: x[0])
-
-            current_pos = 0
-            for seg_start, seg_end in adjusted_straight_segments:
-                if current_pos < seg_start:
-                    hinge_regions.append((current_pos, seg_start))
-                current_pos = seg_end
-
-            if current_pos < rect_width:
-                hinge_regions.append((current_pos, rect_width))
-
-        for i, (hinge_start, hinge_end) in enumerate(hinge_regions):
-            hinge_rect_data = f"M {hinge_start},0 L {hinge_end},0 L {hinge_end},{rect_height} L {hinge_start},{rect_height} Z"
-
-            hinge_rect = PathElement()
-            hinge_rect.set_id(self.svg.get_unique_id(f"hinge_rect_{i}"))
-            hinge_rect.set('d', hinge_rect_data)
-            hinge_rect.style = self.META_STYLE
-            hinge_rect.transform = inkex.Transform(translate=(offset_x, offset_y))
-            side_group.append(hinge_rect)
-
-            if self.options.generate_living_hinge:
-                hinge_width = hinge_end - hinge_start
-                hinge_length_param = rect_height * (self.options.hinge_length_percent / 100.0)
-                hinge_gap = self.svg.unittouu(f"{self.options.hinge_gap}{self.options.units}")
-                hinge_spacing = self.svg.unittouu(f"{self.options.hinge_spacing}{self.options.units}")
-
-                hinge_cuts = create_living_hinge_pattern(
-                    self.svg,
-                    hinge_length_param,
-                    hinge_gap,
-                    hinge_spacing,
-                    hinge_width,
-                    rect_height,
-                    offset_x + hinge_start,
-                    offset_y,
-                    self.CUT_INNER_STYLE,
-                    tab_positions=None,
-                    segment_start=0
-                )
-
-                for hinge_cut in hinge_cuts:
-                    side_group.append(hinge_cut)
-
-        side_bbox = side_group.bounding_box()
-        side_label = self.create_label("side", side_bbox, "side_label")
-        side_group.append(side_label)
-
-        self.side_group = side_group
-
-    def create_lid_top_piece(self, offset_x, offset_y):
-        lid_top_group = Group(id=self.svg.get_unique_id("lid_top"))
-        self.svg.get_current_layer().add(lid_top_group)
-
-        lid_top_path = PathElement()
-        lid_top_path.set_id(self.svg.get_unique_id("lid_top_path"))
-        lid_top_path.set('d', str(self.original_path))
-        lid_top_path.style = self.CUT_OUTER_STYLE
-        lid_top_group.append(lid_top_path)
-
-        lid_top_inset = self.inset_path.copy()
-        lid_top_inset.set_id(self.svg.get_unique_id("lid_top_inset"))
-        lid_top_group.append(lid_top_inset)
-
-        for i, magnet in enumerate(self.magnets):
-            lid_top_magnet = magnet.copy()
-            lid_top_magnet.set_id(self.svg.get_unique_id(f"lid_top_magnet_{i}"))
-            lid_top_magnet.style = self.META_STYLE
-            lid_top_group.append(lid_top_magnet)
-
-        lid_top_bbox_local = lid_top_group.bounding_box()
-        lid_top_label = self.create_label("lid top", lid_top_bbox_local, "lid_top_label")
-        lid_top_group.append(lid_top_label)
-
-        lid_top_group.transform = inkex.Transform(translate=(offset_x, offset_y))
-
-        return lid_top_group.bounding_box()
-
-    def create_lid_middle_piece(self, offset_x, offset_y):
-        lid_middle_group = Group(id=self.svg.get_unique_id("lid_middle"))
-        self.svg.get_current_layer().add(lid_middle_group)
-
-        lid_middle_path = PathElement()
-        lid_middle_path.set_id(self.svg.get_unique_id("lid_middle_path"))
-        lid_middle_path.set('d', str(self.original_path))
-        lid_middle_path.style = self.CUT_OUTER_STYLE
-        lid_middle_group.append(lid_middle_path)
-
-        lid_middle_inset = self.inset_path.copy()
-        lid_middle_inset.set_id(self.svg.get_unique_id("lid_middle_inset"))
-        lid_middle_group.append(lid_middle_inset)
-
-        for i, magnet in enumerate(self.magnets):
-            lid_middle_magnet = magnet.copy()
-            lid_middle_magnet.set_id(self.svg.get_unique_id(f"lid_middle_magnet_{i}"))
-            lid_middle_magnet.style = self.CUT_OUTER_STYLE if self.options.hide_magnets else self.META_STYLE
-            lid_middle_group.append(lid_middle_magnet)
-
-        lid_middle_bbox_local = lid_middle_group.bounding_box()
-        lid_middle_label = self.create_label("lid middle", lid_middle_bbox_local, "lid_middle_label")
-        lid_middle_group.append(lid_middle_label)
-
-        lid_middle_group.transform = inkex.Transform(translate=(offset_x, offset_y))
-
-        return lid_middle_group.bounding_box()
-
-    def create_lid_bottom_piece(self, offset_x, offset_y):
-        lid_bottom_group = Group(id=self.svg.get_unique_id("lid_bottom"))
-        self.svg.get_current_layer().add(lid_bottom_group)
-
-        lid_bottom_path = PathElement()
-        lid_bottom_path.set_id(self.svg.get_unique_id("lid_bottom_path"))
-        lid_bottom_path.set('d', str(self.original_path))
-        lid_bottom_path.style = self.CUT_OUTER_STYLE
-        lid_bottom_group.append(lid_bottom_path)
-
-        lid_bottom_inset = self.inset_path.copy()
-        lid_bottom_inset.set_id(self.svg.get_unique_id("lid_bottom_inset"))
-        lid_bottom_group.append(lid_bottom_inset)
-
-        for i, magnet in enumerate(self.magnets):
-            lid_bottom_magnet = magnet.copy()
-            lid_bottom_magnet.set_id(self.svg.get_unique_id(f"lid_bottom_magnet_{i}"))
-            lid_bottom_magnet.style = self.CUT_OUTER_STYLE if not self.options.hide_magnets else self.META_STYLE
-            lid_bottom_group.append(lid_bottom_magnet)
-
-        lid_bottom_bbox_local = lid_bottom_group.bounding_box()
-        lid_bottom_label = self.create_label("lid bottom", lid_bottom_bbox_local, "lid_bottom_label")
-        lid_bottom_group.append(lid_bottom_label)
-
-        lid_bottom_group.transform = inkex.Transform(translate=(offset_x, offset_y))
-
-        return lid_bottom_group.bounding_box()
-
-    def create_lid_fitting_piece(self, offset_x, offset_y):
-        lid_fitting_group = Group(id=self.svg.get_unique_id("lid_fitting"))
-        self.svg.get_current_layer().add(lid_fitting_group)
-
-        top_hole_inset = self.svg.unittouu(f"{self.options.top_hole_inset}{self.options.units}")
-        extra_inset = self.svg.unittouu("1mm")
-        lid_offset_dist = -(top_hole_inset + extra_inset)
-
+            layers = LAYERS if self.options.export_guides else {
+                style: layer for style, layer in LAYERS.items() if style != "meta"
+            }
+            paths = export_paths(placed, scale, layers=layers)
         try:
-            from offset import offset_path
-            lid_fitting_path_d = offset_path(self.original_path, lid_offset_dist)
-            lid_fitting_path = PathElement()
-            lid_fitting_path.set_id(self.svg.get_unique_id("lid_fitting_path"))
-            lid_fitting_path.set('d', lid_fitting_path_d)
-            lid_fitting_path.style = self.CUT_OUTER_STYLE
-            lid_fitting_group.append(lid_fitting_path)
-
-            lid_fitting_bbox_local = lid_fitting_group.bounding_box()
-            lid_fitting_label = self.create_label("lid fitting", lid_fitting_bbox_local, "lid_fitting_label")
-            lid_fitting_group.append(lid_fitting_label)
-
-            lid_fitting_group.transform = inkex.Transform(translate=(offset_x, offset_y))
-
-            return lid_fitting_group.bounding_box()
-        except ValueError:
-            return None
+            with open(self.options.export_file, "w", encoding="utf-8") as stream:
+                if self.options.export_format == "svg":
+                    write_svg(stream, paths, styles, layers)
+                else:
+                    count = write_dxf(stream, paths, layers=layers)
+        except OSError as e:
+            raise inkex.AbortExtension(f"Could not write export file: {e}")
 
-    def effect(self):
-        if not self.svg.selection:
-            raise inkex.AbortExtension("Select a single path.")
+        if self.options.export_format != "svg":
+            for problem in dxf_problems(self.options.export_file, count):
+                self.msg(f"DXF export check: {problem}")
 
-        selected_element = list(self.svg.selection.values())[0]
+    def outline_from(self, selected_element, layer_transform_inv, multiple=False):
         node = selected_element
-
         if not isinstance(node, PathElement):
             if hasattr(node, 'path') and node.path is not None:
                 path_element = PathElement()
@@ -554,54 +571,183 @@ class Boxbot(inkex.EffectExtension):
                 try:
                     node = node.to_path_element()
                 except Exception:
-                    raise inkex.AbortExtension("Selection must be a path or convertible to a path.")
+                    raise inkex.AbortExtension("Selection must be paths or objects convertible to paths.")
 
-        current_layer = self.svg.get_current_layer()
-        layer_transform = current_layer.composed_transform()
-        layer_transform_inv = -layer_transform
+        namespace = self.options.id_namespace or selected_element.get_id()
+        if self.options.id_namespace and multiple:
+            namespace = f"{self.options.id_namespace}-{selected_element.get_id()}"
 
         doc_path = node.path.to_absolute().transform(selected_element.composed_transform())
-        self.original_path = doc_path.transform(layer_transform_inv)
-        self.original_path_bbox = self.original_path.bounding_box()
-
-        selected_element.style = self.CUT_OUTER_STYLE
+        original_path = doc_path.transform(layer_transform_inv)
+        return {
+            "element": selected_element,
+            "path": original_path,
+            "bbox": original_path.bounding_box(),
+            "shape": detect_primitive(selected_element, layer_transform_inv @ selected_element.composed_transform()),
+            "namespace": namespace,
+        }
+
+    def use_outline(self, outline):
+        self.original_path = outline["path"]
+        self.original_path_bbox = outline["bbox"]
+        self.outline_shape = outline["shape"]
+        self.id_namespace = outline["namespace"]
 
-        tab_height = self.svg.unittouu(f"{self.options.material_thickness}{self.options.units}")
+    def effect(self):
+        self.monitor = None
+        if self.options.memory_report or self.options.memory_budget_mb:
+            self.monitor = MemoryMonitor(self.options.memory_report, self.options.memory_budget_mb * MB)
+            self.monitor.start()
 
+        exceeded = None
+        try:
+            self.generate()
+        except MemoryBudgetExceeded as e:
+            exceeded = e
+        finally:
+            if self.monitor is not None:
+                self.monitor.stop()
+
+        if self.options.memory_report:
+            for line in self.monitor.report_lines(live_objects(PathElement)):
+                self.msg(line)
+        if exceeded is not None:
+            raise inkex.AbortExtension(str(exceeded))
+
+    def generate(self):
+        self.started = time.monotonic()
+        if not self.svg.selection:
+            raise inkex.AbortExtension("Select one or more paths.")
         try:
-            offset_dist = -self.svg.unittouu(f"{self.options.tab_inset}{self.options.units}")
-            inset_path_d = offset_path(self.original_path, offset_dist)
+            self.geometry_backend = use_backend(self.options.geometry_backend).name
         except ValueError as e:
             raise inkex.AbortExtension(str(e))
 
-        self.create_bottom_tabs_piece(inset_path_d)
-        offset_x = self.original_path_bbox.width + self.svg.unittouu("2mm")
-        self.create_bottom_piece(offset_x)
-        self.create_top_tabs_piece(2 * offset_x)
-        self.create_top_piece(3 * offset_x)
-
-        offset_x = self.original_path_bbox.left
-        offset_y = self.original_path_bbox.bottom + self.svg.unittouu("2mm") + tab_height
-        self.create_side_piece(offset_x, offset_y, inset_path_d)
-
-        if self.options.generate_lid:
-            side_bbox_with_tabs = self.side_group.bounding_box()
-            lid_target_x = self.original_path_bbox.left
-            lid_target_y = side_bbox_with_tabs.bottom + self.svg.unittouu("2mm")
-
-            translate_x = lid_target_x - self.original_path_bbox.left
-            translate_y = lid_target_y - self.original_path_bbox.top
-
-            lid_top_bbox = self.create_lid_top_piece(translate_x, translate_y)
-
-            lid_middle_offset_x = lid_top_bbox.right + self.svg.unittouu("2mm") - self.original_path_bbox.left
-            lid_middle_bbox = self.create_lid_middle_piece(lid_middle_offset_x, translate_y)
-
-            lid_bottom_offset_x = lid_middle_bbox.right + self.svg.unittouu("2mm") - self.original_path_bbox.left
-            lid_bottom_bbox = self.create_lid_bottom_piece(lid_bottom_offset_x, translate_y)
+        current_layer = self.svg.get_current_layer()
+        layer_transform_inv = -current_layer.composed_transform()
+        multiple = len(self.svg.selection) > 1
+        outlines = [
+            self.outline_from(element, layer_transform_inv, multiple) for element in self.svg.selection.values()
+        ]
+
+        remaining = self.started + self.options.draft_time_budget - time.monotonic()
+        self.draft_seconds = remaining / len(outlines)
+
+        cache = FragmentCache(max_bytes=self.options.cache_size_mb * 1024 * 1024)
+        if self.options.result_cache != "bypass":
+            self.stage_memo = StageCache(max_bytes=self.options.cache_size_mb * 1024 * 1024)
+        if self.options.result_cache == "clear":
+            cache.clear()
+            self.stage_memo.clear()
+
+        exporting = bool(self.options.export_file)
+        pending = []
+        for outline in outlines:
+            self.use_outline(outline)
+            if not self.options.export_only:
+                outline["element"].style = self.CUT_OUTER_STYLE
+            outline["key"] = None
+            outline["record"] = None
+            outline["memory"] = []
+            cacheable = not (self.options.export_only or self.options.operation_layers)
+            if self.options.result_cache != "bypass" and cacheable:
+                outline["key"] = cache_key(self.original_path, self.cache_options())
+                if not exporting:
+                    outline["record"] = cache.get(outline["key"])
+                if self.options.memory_report and outline["record"] and not outline["record"]["memory"]:
+                    outline["record"] = None
+            if outline["record"] is None:
+                outline["params"] = self.pipeline_params()
+                pending.append(outline)
+
+        self.run_pipelines(pending)
+
+        occupied = [outline["bbox"] for outline in outlines]
+        exported = []
+        for outline in outlines:
+            self.use_outline(outline)
+            record = outline["record"]
+            if self.options.export_only:
+                placed = self.layout_export(outline["results"])
+                record = {"drc": self.drc_summary_record}
+            elif record is not None:
+                for message in record["messages"]:
+                    self.msg(message)
+                if self.monitor is not None:
+                    self.monitor.replay(record["memory"])
+                groups = self.insert_fragments(record)
+                placed = [
+                    (None, 0, 0, [group], inkex.BoundingBox((left, right), (top, bottom)))
+                    for group, (left, right, top, bottom) in zip(groups, record["bboxes"])
+                ]
+            else:
+                defs_before = set(self.svg.defs)
+                layer_before = set(current_layer)
+                first = len(self.monitor.stages) if self.monitor is not None else 0
+                with track(f"assemble {self.id_namespace}"):
+                    placed = self.assemble_box(outline["results"])
+                record = {
+                    "drc": self.drc_summary_record,
+                    "messages": self.messages_record,
+                    "memory": outline["memory"] + self.memory_stages(first),
+                }
+                if outline["key"] is not None and outline["complete"]:
+                    record.update(self.capture_fragments(layer_before, defs_before))
+                    record["bboxes"] = [[bbox.left, bbox.right, bbox.top, bbox.bottom] for *_, bbox in placed]
+                    cache.put(outline["key"], record)
+
+            if record["drc"] is not None:
+                self.drc_summaries[self.id_namespace] = record["drc"]
+
+            dy = self.place_pieces([bbox for *_, bbox in placed], occupied)
+            for index, (name, x, y, groups, _) in enumerate(placed):
+                shift = dy if index else 0
+                for group in groups if shift else ():
+                    group.transform = inkex.Transform(translate=(0, shift)) @ group.transform
+                if exporting and name is not None:
+                    exported.append((outline["results"][name], x, y + shift))
+
+        self.report_design_rules(self.drc_summaries)
+        if exporting:
+            self.write_export(exported)
+
+    def run_pipelines(self, outlines):
+        deadline = None
+        if self.options.quality == "draft":
+            deadline = self.started + self.options.draft_time_budget
+
+        workers = self.options.pipeline_workers
+        observer = None
+        if self.monitor is not None:
+            workers = 0
+            observer = self.monitor.stage
+        jobs = [
+            (self.options.generate_lid, outline["params"], self.stage_memo,
+             0 if len(outlines) > 1 else workers, deadline, observer)
+            for outline in outlines
+        ]
+
+        outputs = None
+        try:
+            if workers > 1 and len(jobs) > 1:
+                try:
+                    from concurrent.futures import ProcessPoolExecutor
+                    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+                        outputs = list(pool.map(run_box_pipeline, jobs))
+                except (ImportError, RuntimeError) + POOL_ERRORS:
+                    outputs = None
+            if outputs is None:
+                outputs = []
+                for outline, job in zip(outlines, jobs):
+                    first = len(self.monitor.stages) if self.monitor is not None else 0
+                    outputs.append(run_box_pipeline(job))
+                    outline["memory"] = self.memory_stages(first)
+        except ValueError as e:
+            raise inkex.AbortExtension(str(e))
 
-            lid_fitting_offset_x = lid_bottom_bbox.right + self.svg.unittouu("2mm") - self.original_path_bbox.left
-            self.create_lid_fitting_piece(lid_fitting_offset_x, translate_y)
+        for outline, (results, complete) in zip(outlines, outputs):
+            outline["results"] = results
+            outline["complete"] = complete
 
 
 if __name__ == "__main__":
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+
+import hashlib
+import importlib.util
+import json
+import os
+import pickle
+import re
+import sys
+import tempfile
+from pathlib import Path as FilePath
+
+
+SOURCE_DIR = FilePath(__file__).parent
+ID_REFERENCE = re.compile(r'(?<=#)([A-Za-z_][\w.\-]*)')
+ID_ATTRIBUTE = re.compile(r'(?<=\bid=")([^"]+)(?=")')
+
+
+def user_cache_dir():
+    if sys.platform.startswith("win"):
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~/AppData/Local")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return FilePath(base) / "boxbot"
+
+
+def code_sources():
+    sources = [(source.name, source) for source in sorted(SOURCE_DIR.glob("*.py"))]
+    spec = importlib.util.find_spec("inkex")
+    for location in (spec.submodule_search_locations or []) if spec else []:
+        root = FilePath(location)
+        sources.extend(
+            (f"inkex/{source.relative_to(root).as_posix()}", source) for source in sorted(root.rglob("*.py"))
+        )
+    return sources
+
+
+def code_version():
+    digest = hashlib.sha256()
+    for name, source in code_sources():
+        digest.update(name.encode())
+        digest.update(source.read_bytes())
+    return digest.hexdigest()
+
+
+def normalize_geometry(path, digits=6):
+    parts = []
+    for segment in path.to_absolute():
+        args = ",".join(f"{round(value, digits) + 0.0:.{digits}f}" for value in segment.args)
+        parts.append(f"{segment.letter}{args}")
+    return " ".join(parts)
+
+
+def cache_key(path, options, version=None):
+    payload = json.dumps({
+        "geometry": normalize_geometry(path),
+        "options": options,
+        "version": version or code_version(),
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def reid_fragments(fragments, new_id, keep=()):
+    old_ids = []
+    for fragment in fragments:
+        old_ids.extend(ID_ATTRIBUTE.findall(fragment))
+
+    mapping = {}
+    for old_id in old_ids:
+        if old_id not in mapping and old_id not in keep:
+            mapping[old_id] = new_id(old_id)
+
+    def swap(match):
+        return mapping.get(match.group(1), match.group(1))
+
+    return [ID_ATTRIBUTE.sub(swap, ID_REFERENCE.sub(swap, fragment)) for fragment in fragments]
+
+
+class FragmentCache:
+    SUFFIX = ".json"
+
+    def __init__(self, directory=None, max_bytes=64 * 1024 * 1024):
+        self.directory = FilePath(directory) if directory else user_cache_dir()
+        self.max_bytes = max_bytes
+
+    def entry(self, key):
+        return self.directory / f"{key}{self.SUFFIX}"
+
+    def get(self, key):
+        entry = self.entry(key)
+        try:
+            with open(entry, encoding="utf-8") as handle:
+                record = json.load(handle)
+            os.utime(entry)
+        except (OSError, ValueError):
+            return None
+        return record
+
+    def put(self, key, record):
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            handle, temp_name = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(handle, "w", encoding="utf-8") as temp:
+                json.dump(record, temp)
+            os.replace(temp_name, self.entry(key))
+        except OSError:
+            return False
+        self.evict()
+        return True
+
+    def entries(self):
+        try:
+            return [entry for entry in self.directory.glob(f"*{self.SUFFIX}") if entry.is_file()]
+        except OSError:
+            return []
+
+    def evict(self):
+        entries = []
+        for entry in self.entries():
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries, key=lambda item: item[0]):
+            if total <= self.max_bytes:
+                break
+            try:
+                entry.unlink()
+                total -= size
+            except OSError:
+                pass
+
+    def clear(self):
+        for entry in self.entries():
+            try:
+                entry.unlink()
+            except OSError:
+                pass
+
+
+class StageCache(FragmentCache):
+    SUFFIX = ".pickle"
+
+    def __init__(self, directory=None, max_bytes=64 * 1024 * 1024, version=None):
+        super().__init__(directory or user_cache_dir() / "stages", max_bytes)
+        self.version = version or code_version()
+        self.loaded = {}
+        self.pending = {}
+
+    def stage_entry(self, key):
+        return hashlib.sha256(f"{self.version}:{key}".encode()).hexdigest()
+
+    def __contains__(self, key):
+        if key not in self.loaded:
+            entry = self.entry(self.stage_entry(key))
+            try:
+                with open(entry, "rb") as handle:
+                    self.loaded[key] = pickle.load(handle)
+                os.utime(entry)
+            except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+                return False
+        return True
+
+    def __getitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        return self.loaded[key]
+
+    def __setitem__(self, key, value):
+        self.loaded[key] = value
+        self.pending[key] = value
+
+    def flush(self):
+        pending, self.pending = self.pending, {}
+        written = False
+        for key, value in pending.items():
+            try:
+                payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            except (pickle.PicklingError, TypeError, AttributeError):
+                continue
+            try:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                handle, temp_name = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+                with os.fdopen(handle, "wb") as temp:
+                    temp.write(payload)
+                os.replace(temp_name, self.entry(self.stage_entry(key)))
+            except OSError:
+                break
+            written = True
+        if written:
+            self.evict()
+
+    def __getstate__(self):
+        return dict(vars(self), loaded={}, pending={})
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+
+import argparse
+import math
+import random
+from xml.sax.saxutils import quoteattr
+
+
+NODE_COUNTS = (10, 100, 1000, 10000, 100000)
+MIN_NODES = 3
+MAX_NODES = 100000
+SAWTOOTH_MIN_NODES = 8
+
+
+def point(x, y):
+    return f"{x:.4f},{y:.4f}"
+
+
+def polygon_d(points):
+    return "M " + " L ".join(point(x, y) for x, y in points) + " Z"
+
+
+def ngon(nodes, size, rng, cx, cy):
+    radius = size / 2
+    rotation = rng.uniform(0, 2 * math.pi / nodes)
+    return polygon_d([
+        (cx + radius * math.cos(rotation + 2 * math.pi * k / nodes),
+         cy + radius * math.sin(rotation + 2 * math.pi * k / nodes))
+        for k in range(nodes)
+    ])
+
+
+def star(nodes, size, rng, cx, cy):
+    radius = size / 2
+    step = 2 * math.pi / nodes
+    points = []
+    for k in range(nodes):
+        scale = rng.uniform(0.8, 1.0) if k % 2 == 0 else rng.uniform(0.3, 0.6)
+        angle = step * (k + rng.uniform(-0.3, 0.3))
+        points.append((cx + radius * scale * math.cos(angle), cy + radius * scale * math.sin(angle)))
+    return polygon_d(points)
+
+
+def superellipse(nodes, size, rng, cx, cy):
+    a = size / 2
+    b = a * rng.uniform(0.5, 1.0)
+    exponent = rng.uniform(0.5, 5.0)
+    points = []
+    for k in range(nodes):
+        t = 2 * math.pi * k / nodes
+        c, s = math.cos(t), math.sin(t)
+        points.append((cx + a * math.copysign(abs(c) ** (2 / exponent), c),
+                       cy + b * math.copysign(abs(s) ** (2 / exponent), s)))
+    return polygon_d(points)
+
+
+def bezier_blob(nodes, size, rng, cx, cy):
+    radius = size / 2
+    step = 2 * math.pi / nodes
+    points = []
+    for k in range(nodes):
+        scale = rng.uniform(0.6, 1.0)
+        angle = step * (k + rng.uniform(-0.25, 0.25))
+        points.append((cx + radius * scale * math.cos(angle), cy + radius * scale * math.sin(angle)))
+
+    path_data = "M " + point(*points[0])
+    for k in range(nodes):
+        p0, p1, p2, p3 = (points[(k + offset) % nodes] for offset in (-1, 0, 1, 2))
+        c1 = (p1[0] + (p2[0] - p0[0]) / 6, p1[1] + (p2[1] - p0[1]) / 6)
+        c2 = (p2[0] - (p3[0] - p1[0]) / 6, p2[1] - (p3[1] - p1[1]) / 6)
+        path_data += f" C {point(*c1)} {point(*c2)} {point(*p2)}"
+    return path_data + " Z"
+
+
+def sawtooth(nodes, size, rng, cx, cy, neck=0.15):
+    teeth = (nodes - 2) // 6
+    filler = nodes - 2 - 6 * teeth
+    pitch = size / teeth
+    neck_width = pitch * neck
+    stem = pitch * rng.uniform(0.5, 1.0)
+    left = cx - size / 2
+    base = cy - size / 4
+
+    points = [(left + size - size * k / (filler + 1), cy + size / 2) for k in range(filler + 1)]
+    points.append((left, cy + size / 2))
+    for k in range(teeth):
+        x = left + k * pitch
+        middle = x + pitch / 2
+        height = pitch * rng.uniform(0.8, 1.5)
+        points += [
+            (middle - neck_width / 2, base),
+            (middle - neck_width / 2, base - stem),
+            (x, base - stem),
+            (x + pitch, base - stem - height),
+            (middle + neck_width / 2, base - stem),
+            (middle + neck_width / 2, base),
+        ]
+    return polygon_d(points)
+
+
+def arc_heavy(nodes, size, rng, cx, cy):
+    radius = size / 2 * 0.8
+    step = 2 * math.pi / nodes
+    chord = 2 * radius * math.sin(step / 2)
+    start = (cx + radius, cy)
+    path_data = "M " + point(*start)
+    for k in range(1, nodes + 1):
+        arc_radius = chord / 2 * rng.uniform(1.05, 2.0)
+        sweep = k % 2
+        end = (cx + radius * math.cos(step * k), cy + radius * math.sin(step * k))
+        path_data += f" A {arc_radius:.4f},{arc_radius:.4f} 0 0 {sweep} {point(*end)}"
+    return path_data + " Z"
+
+
+SHAPES = {
+    "ngon": ngon,
+    "star": star,
+    "superellipse": superellipse,
+    "blob": bezier_blob,
+    "sawtooth": sawtooth,
+    "arcs": arc_heavy,
+}
+
+
+def generate(shape, nodes, size=100.0, seed=0, origin=(0.0, 0.0)):
+    if shape not in SHAPES:
+        raise ValueError(f"Unknown corpus shape '{shape}'.")
+    if not MIN_NODES <= nodes <= MAX_NODES:
+        raise ValueError(f"Node count must be between {MIN_NODES} and {MAX_NODES}.")
+    if shape == "sawtooth" and nodes < SAWTOOTH_MIN_NODES:
+        raise ValueError(f"Sawtooth outlines need at least {SAWTOOTH_MIN_NODES} nodes.")
+    rng = random.Random(f"{seed}:{shape}:{nodes}")
+    return SHAPES[shape](nodes, size, rng, origin[0] + size / 2, origin[1] + size / 2)
+
+
+def corpus(shapes=None, node_counts=NODE_COUNTS, size=100.0, seed=0, spacing=10.0):
+    row = 0
+    for shape in shapes or SHAPES:
+        for column, nodes in enumerate(node_counts):
+            origin = (column * (size + spacing), row * (size + spacing))
+            yield f"{shape}_{nodes}", generate(shape, nodes, size, seed, origin)
+        row += 1
+
+
+def corpus_svg(entries, width, height):
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}mm" height="{height}mm" '
+        f'viewBox="0 0 {width} {height}">',
+    ]
+    for name, path_data in entries:
+        lines.append(f'  <path id={quoteattr(name)} style="fill:none;stroke:#000000;stroke-width:0.1" '
+                     f'd={quoteattr(path_data)}/>')
+    lines.append('</svg>')
+    return "\n".join(lines) + "\n"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a seeded corpus of synthetic outlines as SVG.")
+    parser.add_argument("output")
+    parser.add_argument("--shapes", nargs="+", choices=sorted(SHAPES), default=None)
+    parser.add_argument("--nodes", nargs="+", type=int, default=list(NODE_COUNTS))
+    parser.add_argument("--size", type=float, default=100.0)
+    parser.add_argument("--spacing", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    shapes = args.shapes or list(SHAPES)
+    pitch = args.size + args.spacing
+    width = len(args.nodes) * pitch - args.spacing
+    height = len(shapes) * pitch - args.spacing
+
+    entries = corpus(shapes, args.nodes, args.size, args.seed, args.spacing)
+    with open(args.output, "w", encoding="utf-8") as stream:
+        stream.write(corpus_svg(entries, width, height))
+
+
+if __name__ == "__main__":
+    main()
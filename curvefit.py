@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+
+import math
+
+
+def normalize(vx, vy):
+    length = math.sqrt(vx * vx + vy * vy)
+    if length == 0:
+        return (0.0, 0.0)
+    return (vx / length, vy / length)
+
+
+def turn_angle(prev_point, point, next_point):
+    e1 = normalize(point[0] - prev_point[0], point[1] - prev_point[1])
+    e2 = normalize(next_point[0] - point[0], next_point[1] - point[1])
+    dot = max(-1.0, min(1.0, e1[0] * e2[0] + e1[1] * e2[1]))
+    return math.acos(dot)
+
+
+def is_corner(prev_point, point, next_point, tolerance, corner_angle):
+    angle = turn_angle(prev_point, point, next_point)
+    if angle > corner_angle:
+        return True
+    shortest = min(
+        math.hypot(point[0] - prev_point[0], point[1] - prev_point[1]),
+        math.hypot(next_point[0] - point[0], next_point[1] - point[1]),
+    )
+    return shortest * angle > 32 * tolerance
+
+
+def bezier_point(bez, t):
+    mt = 1 - t
+    a = mt * mt * mt
+    b = 3 * mt * mt * t
+    c = 3 * mt * t * t
+    d = t * t * t
+    return (
+        a * bez[0][0] + b * bez[1][0] + c * bez[2][0] + d * bez[3][0],
+        a * bez[0][1] + b * bez[1][1] + c * bez[2][1] + d * bez[3][1],
+    )
+
+
+def bezier_derivatives(bez, t):
+    mt = 1 - t
+    d1 = (
+        3 * mt * mt * (bez[1][0] - bez[0][0]) + 6 * mt * t * (bez[2][0] - bez[1][0]) + 3 * t * t * (bez[3][0] - bez[2][0]),
+        3 * mt * mt * (bez[1][1] - bez[0][1]) + 6 * mt * t * (bez[2][1] - bez[1][1]) + 3 * t * t * (bez[3][1] - bez[2][1]),
+    )
+    d2 = (
+        6 * mt * (bez[2][0] - 2 * bez[1][0] + bez[0][0]) + 6 * t * (bez[3][0] - 2 * bez[2][0] + bez[1][0]),
+        6 * mt * (bez[2][1] - 2 * bez[1][1] + bez[0][1]) + 6 * t * (bez[3][1] - 2 * bez[2][1] + bez[1][1]),
+    )
+    return d1, d2
+
+
+def chord_parameterize(points):
+    u = [0.0]
+    for i in range(1, len(points)):
+        u.append(u[-1] + math.hypot(points[i][0] - points[i - 1][0], points[i][1] - points[i - 1][1]))
+    total = u[-1]
+    if total == 0:
+        return [i / (len(points) - 1) for i in range(len(points))]
+    return [value / total for value in u]
+
+
+def generate_bezier(points, u, left_tangent, right_tangent):
+    first = points[0]
+    last = points[-1]
+
+    c00 = c01 = c11 = x0 = x1 = 0.0
+    for point, t in zip(points, u):
+        mt = 1 - t
+        b0 = mt * mt * mt
+        b1 = 3 * mt * mt * t
+        b2 = 3 * mt * t * t
+        b3 = t * t * t
+        a1 = (left_tangent[0] * b1, left_tangent[1] * b1)
+        a2 = (right_tangent[0] * b2, right_tangent[1] * b2)
+
+        c00 += a1[0] * a1[0] + a1[1] * a1[1]
+        c01 += a1[0] * a2[0] + a1[1] * a2[1]
+        c11 += a2[0] * a2[0] + a2[1] * a2[1]
+
+        tx = point[0] - (first[0] * (b0 + b1) + last[0] * (b2 + b3))
+        ty = point[1] - (first[1] * (b0 + b1) + last[1] * (b2 + b3))
+        x0 += a1[0] * tx + a1[1] * ty
+        x1 += a2[0] * tx + a2[1] * ty
+
+    det = c00 * c11 - c01 * c01
+    seg_length = math.hypot(last[0] - first[0], last[1] - first[1])
+    epsilon = 1e-6 * seg_length
+
+    if abs(det) > 1e-12:
+        alpha_l = (x0 * c11 - x1 * c01) / det
+        alpha_r = (c00 * x1 - c01 * x0) / det
+    else:
+        alpha_l = alpha_r = 0.0
+
+    if alpha_l < epsilon or alpha_r < epsilon:
+        alpha_l = alpha_r = seg_length / 3.0
+
+    return (
+        first,
+        (first[0] + left_tangent[0] * alpha_l, first[1] + left_tangent[1] * alpha_l),
+        (last[0] + right_tangent[0] * alpha_r, last[1] + right_tangent[1] * alpha_r),
+        last,
+    )
+
+
+def reparameterize(bez, points, u):
+    new_u = []
+    for point, t in zip(points, u):
+        value = bezier_point(bez, t)
+        d1, d2 = bezier_derivatives(bez, t)
+        dx = value[0] - point[0]
+        dy = value[1] - point[1]
+        numerator = dx * d1[0] + dy * d1[1]
+        denominator = d1[0] * d1[0] + d1[1] * d1[1] + dx * d2[0] + dy * d2[1]
+        if denominator == 0:
+            new_u.append(t)
+        else:
+            new_u.append(min(1.0, max(0.0, t - numerator / denominator)))
+    return new_u
+
+
+SPAN_SAMPLES = 4
+
+
+def segment_distance(point, a, b):
+    dx = b[0] - a[0]
+    dy = b[1] - a[1]
+    length_sq = dx * dx + dy * dy
+    t = 0.0 if length_sq == 0 else max(0.0, min(1.0, ((point[0] - a[0]) * dx + (point[1] - a[1]) * dy) / length_sq))
+    return math.hypot(a[0] + t * dx - point[0], a[1] + t * dy - point[1])
+
+
+def polyline_max_error(curve_point, points, params):
+    max_dist = 0.0
+    split = len(points) // 2
+    last = len(points) - 1
+    for i in range(1, last):
+        value = curve_point(params[i])
+        dist = math.hypot(value[0] - points[i][0], value[1] - points[i][1])
+        if dist > max_dist:
+            max_dist = dist
+            split = i
+
+    for i in range(last):
+        for k in range(1, SPAN_SAMPLES + 1):
+            value = curve_point(params[i] + (params[i + 1] - params[i]) * k / (SPAN_SAMPLES + 1))
+            dist = min(
+                segment_distance(value, points[j], points[j + 1]) for j in range(max(0, i - 1), min(last, i + 2))
+            )
+            if dist > max_dist:
+                max_dist = dist
+                split = i if 2 * k <= SPAN_SAMPLES else i + 1
+    return max_dist, split
+
+
+def bezier_max_error(bez, points, u):
+    return polyline_max_error(lambda t: bezier_point(bez, t), points, u)
+
+
+def line_max_error(points):
+    first = points[0]
+    last = points[-1]
+    dx = last[0] - first[0]
+    dy = last[1] - first[1]
+    length = math.hypot(dx, dy)
+    if length == 0:
+        return float("inf")
+
+    max_dist = 0.0
+    for point in points[1:-1]:
+        t = ((point[0] - first[0]) * dx + (point[1] - first[1]) * dy) / (length * length)
+        if t < 0 or t > 1:
+            return float("inf")
+        dist = abs((point[0] - first[0]) * dy - (point[1] - first[1]) * dx) / length
+        max_dist = max(max_dist, dist)
+    return max_dist
+
+
+def fit_circle(points):
+    n = len(points)
+    mean_x = sum(p[0] for p in points) / n
+    mean_y = sum(p[1] for p in points) / n
+
+    suu = suv = svv = suuu = svvv = suvv = svuu = 0.0
+    for x, y in points:
+        u = x - mean_x
+        v = y - mean_y
+        suu += u * u
+        suv += u * v
+        svv += v * v
+        suuu += u * u * u
+        svvv += v * v * v
+        suvv += u * v * v
+        svuu += v * u * u
+
+    det = suu * svv - suv * suv
+    if abs(det) < 1e-12:
+        return None
+
+    rhs_u = (suuu + suvv) / 2
+    rhs_v = (svvv + svuu) / 2
+    uc = (rhs_u * svv - rhs_v * suv) / det
+    vc = (suu * rhs_v - suv * rhs_u) / det
+
+    radius = math.sqrt(uc * uc + vc * vc + (suu + svv) / n)
+    return (uc + mean_x, vc + mean_y), radius
+
+
+ARC_HALF_TURN_MARGIN = 0.5
+
+
+def fit_arc(points, tolerance):
+    if len(points) < 4:
+        return None
+
+    fitted = fit_circle(points)
+    if fitted is None:
+        return None
+    center, radius = fitted
+
+    span = 0.0
+    direction = 0
+    prev_angle = math.atan2(points[0][1] - center[1], points[0][0] - center[0])
+    for point in points[1:]:
+        angle = math.atan2(point[1] - center[1], point[0] - center[0])
+        delta = (angle - prev_angle + math.pi) % (2 * math.pi) - math.pi
+        step = 1 if delta > 0 else -1
+        if direction and step != direction and abs(delta) > 1e-9:
+            return None
+        direction = direction or step
+        span += delta
+        prev_angle = angle
+
+    if abs(span) >= 2 * math.pi - 1e-6 or abs(abs(span) - math.pi) < ARC_HALF_TURN_MARGIN:
+        return None
+
+    large_arc = 1 if abs(span) > math.pi else 0
+    sweep = 1 if span > 0 else 0
+    center, radius = svg_arc_center(points[0], points[-1], radius, large_arc, sweep)
+    angles = [math.atan2(points[0][1] - center[1], points[0][0] - center[0])]
+    for point in points[1:]:
+        angle = math.atan2(point[1] - center[1], point[0] - center[0])
+        angles.append(angles[-1] + (angle - angles[-1]) % (2 * math.pi if sweep else -2 * math.pi))
+
+    def arc_point(angle):
+        return (center[0] + radius * math.cos(angle), center[1] + radius * math.sin(angle))
+
+    if polyline_max_error(arc_point, points, angles)[0] > tolerance:
+        return None
+
+    return radius, large_arc, sweep
+
+
+def svg_arc_center(start, end, radius, large_arc, sweep):
+    x1 = (start[0] - end[0]) / 2
+    y1 = (start[1] - end[1]) / 2
+    half_chord_sq = x1 * x1 + y1 * y1
+    radius = max(radius, math.sqrt(half_chord_sq))
+    coef = math.sqrt(max(0.0, radius * radius - half_chord_sq) / half_chord_sq) if half_chord_sq else 0.0
+    if large_arc == sweep:
+        coef = -coef
+    return ((start[0] + end[0]) / 2 + coef * y1, (start[1] + end[1]) / 2 - coef * x1), radius
+
+
+def fit_run(points, left_tangent, right_tangent, tolerance, depth=0):
+    last = points[-1]
+
+    if len(points) == 2 or line_max_error(points) <= tolerance:
+        return [('L', last)]
+
+    arc = fit_arc(points, tolerance)
+    if arc is not None:
+        radius, large_arc, sweep = arc
+        return [('A', radius, large_arc, sweep, last)]
+
+    u = chord_parameterize(points)
+    bez = generate_bezier(points, u, left_tangent, right_tangent)
+    max_error, split = bezier_max_error(bez, points, u)
+
+    if max_error <= tolerance:
+        return [('C', bez[1], bez[2], last)]
+
+    if max_error <= tolerance * 4:
+        for _ in range(4):
+            u = reparameterize(bez, points, u)
+            bez = generate_bezier(points, u, left_tangent, right_tangent)
+            max_error, split = bezier_max_error(bez, points, u)
+            if max_error <= tolerance:
+                return [('C', bez[1], bez[2], last)]
+
+    if depth > 64:
+        return [('L', point) for point in points[1:]]
+
+    split = max(1, min(len(points) - 2, split))
+    center_tangent = normalize(
+        points[split - 1][0] - points[split + 1][0],
+        points[split - 1][1] - points[split + 1][1],
+    )
+    if center_tangent == (0.0, 0.0):
+        center_tangent = normalize(
+            points[split - 1][0] - points[split][0],
+            points[split - 1][1] - points[split][1],
+        )
+
+    left = fit_run(points[:split + 1], left_tangent, center_tangent, tolerance, depth + 1)
+    right = fit_run(points[split:], (-center_tangent[0], -center_tangent[1]), right_tangent, tolerance, depth + 1)
+    return left + right
+
+
+def fit_closed_polyline(points, tolerance, corner_angle=math.radians(30)):
+    deduped = []
+    for point in points:
+        if not deduped or math.hypot(point[0] - deduped[-1][0], point[1] - deduped[-1][1]) > 1e-9:
+            deduped.append(point)
+    if len(deduped) > 1 and math.hypot(deduped[0][0] - deduped[-1][0], deduped[0][1] - deduped[-1][1]) <= 1e-9:
+        deduped.pop()
+    points = deduped
+
+    n = len(points)
+    if n < 3:
+        return points[0] if points else None, [('L', point) for point in points[1:]]
+
+    corners = [i for i in range(n) if is_corner(points[i - 1], points[i], points[(i + 1) % n], tolerance, corner_angle)]
+
+    breaks = sorted(set(corners + [0]))
+    if len(breaks) < 2:
+        breaks.append(n // 2)
+    corner_set = set(corners)
+
+    def left_tangent(i):
+        if i in corner_set:
+            return normalize(points[(i + 1) % n][0] - points[i][0], points[(i + 1) % n][1] - points[i][1])
+        return normalize(points[(i + 1) % n][0] - points[i - 1][0], points[(i + 1) % n][1] - points[i - 1][1])
+
+    def right_tangent(i):
+        if i in corner_set:
+            return normalize(points[i - 1][0] - points[i][0], points[i - 1][1] - points[i][1])
+        return normalize(points[i - 1][0] - points[(i + 1) % n][0], points[i - 1][1] - points[(i + 1) % n][1])
+
+    segments = []
+    for k, start in enumerate(breaks):
+        end = breaks[(k + 1) % len(breaks)]
+        if end <= start:
+            run = points[start:] + points[:end + 1]
+        else:
+            run = points[start:end + 1]
+        segments.extend(fit_run(run, left_tangent(start), right_tangent(end), tolerance))
+
+    return points[0], segments
+
+
+def segments_to_path_data(start, segments):
+    path_data = f"M {start[0]},{start[1]}"
+    for segment in segments:
+        if segment[0] == 'L':
+            end = segment[1]
+            path_data += f" L {end[0]},{end[1]}"
+        elif segment[0] == 'A':
+            _, radius, large_arc, sweep, end = segment
+            path_data += f" A {radius},{radius} 0 {large_arc} {sweep} {end[0]},{end[1]}"
+        else:
+            _, c1, c2, end = segment
+            path_data += f" C {c1[0]},{c1[1]} {c2[0]},{c2[1]} {end[0]},{end[1]}"
+    return path_data + " Z"
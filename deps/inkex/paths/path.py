@@ -39,6 +39,7 @@ from ..utils import strargs
 
 from .lines import Line, Move, move, ZoneClose, zoneClose
 from .curves import Curve
+from .arc import Arc
 from .interfaces import (
     ILengthSettings,
     LengthSettings,
@@ -50,12 +51,61 @@ Pathlike = TypeVar("Pathlike", bound="PathCommand")
 AbsolutePathlike = TypeVar("AbsolutePathlike", bound="AbsolutePathCommand")
 
 LEX_REX = re.compile(r"([MLHVCSQTAZmlhvcsqtaz])([^MLHVCSQTAZmlhvcsqtaz]*)")
+ABSOLUTE_REX = re.compile(r"[MLCAZ0-9eE.,+\-\s]*")
+ARC_FLAGS = ("0", "1")
 
 
 class InvalidPath(ValueError):
     """Raised when given an invalid path string"""
 
 
+def parse_absolute(path_d):
+    """Fast path for machine-generated path strings made only of absolute
+    M, L, C, A and Z commands with whitespace or comma separated numbers.
+
+    Returns the list of segments, or None if the string needs the general
+    parser (relative or curve commands, compact number forms, odd argument
+    counts, ...). The result is identical to :meth:`Path.parse_string`.
+
+    .. versionadded:: 1.4"""
+    if not ABSOLUTE_REX.fullmatch(path_d):
+        return None
+    segments = []
+    append = segments.append
+    try:
+        for cmd, numbers in LEX_REX.findall(path_d):
+            tokens = numbers.replace(",", " ").split()
+            count = len(tokens)
+            if cmd == "Z":
+                if count:
+                    return None
+                append(ZoneClose())
+            elif cmd == "A":
+                if not count or count % 7:
+                    return None
+                for i in range(0, count, 7):
+                    if tokens[i + 3] not in ARC_FLAGS or tokens[i + 4] not in ARC_FLAGS:
+                        return None
+                    args = [float(value) for value in tokens[i : i + 7]]
+                    append(Arc(*args))
+            elif cmd == "C":
+                if not count or count % 6:
+                    return None
+                args = [float(value) for value in tokens]
+                for i in range(0, count, 6):
+                    append(Curve(*args[i : i + 6]))
+            else:
+                if not count or count % 2:
+                    return None
+                args = [float(value) for value in tokens]
+                append((Move if cmd == "M" else Line)(args[0], args[1]))
+                for i in range(2, count, 2):
+                    append(Line(args[i], args[i + 1]))
+    except ValueError:
+        return None
+    return segments
+
+
 class Path(list):
     """A list of segment commands which combine to draw a shape"""
 
@@ -283,6 +333,10 @@ class Path(list):
     def __init__(self, path_d=None) -> None:
         super().__init__()
         if isinstance(path_d, str):
+            segments = parse_absolute(path_d)
+            if segments is not None:
+                super().extend(segments)
+                return
             # Returns a generator returning PathCommand objects
             path_d = self.parse_string(path_d)
         elif isinstance(path_d, CubicSuperPath):
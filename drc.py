@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+
+import math
+
+import inkex
+
+from offset import split_subpaths, subpath_to_points
+
+
+CUT_STYLES = ("outer", "inner")
+
+
+def point_segment_distance(p, a, b):
+    dx = b[0] - a[0]
+    dy = b[1] - a[1]
+    length_sq = dx * dx + dy * dy
+    if length_sq == 0:
+        return math.hypot(p[0] - a[0], p[1] - a[1]), a
+    t = max(0.0, min(1.0, ((p[0] - a[0]) * dx + (p[1] - a[1]) * dy) / length_sq))
+    closest = (a[0] + t * dx, a[1] + t * dy)
+    return math.hypot(p[0] - closest[0], p[1] - closest[1]), closest
+
+
+def segments_cross(a, b, c, d):
+    def orient(p, q, r):
+        return (q[0] - p[0]) * (r[1] - p[1]) - (q[1] - p[1]) * (r[0] - p[0])
+
+    o1 = orient(a, b, c)
+    o2 = orient(a, b, d)
+    o3 = orient(c, d, a)
+    o4 = orient(c, d, b)
+    return o1 * o2 <= 0 and o3 * o4 <= 0 and (o1, o2, o3, o4) != (0, 0, 0, 0)
+
+
+def segment_distance(a, b, c, d):
+    if segments_cross(a, b, c, d):
+        return 0.0, a
+    best = None
+    for p, q, r in ((a, c, d), (b, c, d), (c, a, b), (d, a, b)):
+        dist, closest = point_segment_distance(p, q, r)
+        if best is None or dist < best[0]:
+            best = (dist, ((p[0] + closest[0]) / 2, (p[1] + closest[1]) / 2))
+    return best
+
+
+class SegmentGrid:
+    def __init__(self, cell):
+        self.cell = cell
+        self.cells = {}
+
+    def cell_range(self, a, b, margin=0.0):
+        x0 = int(math.floor((min(a[0], b[0]) - margin) / self.cell))
+        x1 = int(math.floor((max(a[0], b[0]) + margin) / self.cell))
+        y0 = int(math.floor((min(a[1], b[1]) - margin) / self.cell))
+        y1 = int(math.floor((max(a[1], b[1]) + margin) / self.cell))
+        return x0, x1, y0, y1
+
+    def insert(self, index, a, b):
+        x0, x1, y0, y1 = self.cell_range(a, b)
+        for i in range(x0, x1 + 1):
+            for j in range(y0, y1 + 1):
+                self.cells.setdefault((i, j), []).append(index)
+
+    def near(self, a, b, radius):
+        found = set()
+        x0, x1, y0, y1 = self.cell_range(a, b, radius)
+        for i in range(x0, x1 + 1):
+            for j in range(y0, y1 + 1):
+                found.update(self.cells.get((i, j), ()))
+        return found
+
+
+def item_polylines(item, tolerance):
+    path = inkex.Path(item["d"]).to_absolute()
+    if item["transform"] is not None:
+        path = path.transform(item["transform"])
+
+    polylines = []
+    for subpath in split_subpaths(list(path)):
+        points = subpath_to_points(subpath, tolerance)
+        closed = subpath[-1].letter.upper() == 'Z'
+        if closed and len(points) > 1 and points[0] == points[-1]:
+            points.pop()
+        if len(points) >= 2:
+            polylines.append((points, closed))
+    return polylines
+
+
+def piece_geometry(piece, tolerance):
+    owners = {}
+    if "boolean" in piece:
+        target, operands = piece["boolean"]
+        for operand in operands:
+            owners[operand] = target
+
+    elements = []
+    for index, item in enumerate(piece["items"]):
+        cut = item["style"] in CUT_STYLES or index in owners
+        if not cut:
+            continue
+        elements.append((owners.get(index, index), item["id"], item_polylines(item, tolerance)))
+    return elements
+
+
+def check_features(piece_name, elements, min_feature):
+    violations = []
+    for _, item_id, polylines in elements:
+        for points, closed in polylines:
+            xs = [p[0] for p in points]
+            ys = [p[1] for p in points]
+            size = min(max(xs) - min(xs), max(ys) - min(ys)) if closed else sum(
+                math.hypot(b[0] - a[0], b[1] - a[1]) for a, b in zip(points, points[1:])
+            )
+            if size < min_feature:
+                violations.append({
+                    "rule": "feature_size",
+                    "piece": piece_name,
+                    "items": [item_id],
+                    "at": ((min(xs) + max(xs)) / 2, (min(ys) + max(ys)) / 2),
+                    "value": size,
+                    "limit": min_feature,
+                })
+    return violations
+
+
+def polyline_chunks(points, closed, max_length):
+    count = len(points) if closed else len(points) - 1
+    chunks = []
+    arc = 0.0
+    for k in range(count):
+        a = points[k]
+        b = points[(k + 1) % len(points)]
+        length = math.hypot(b[0] - a[0], b[1] - a[1])
+        parts = max(1, int(math.ceil(length / max_length)))
+        for part in range(parts):
+            t0 = part / parts
+            t1 = (part + 1) / parts
+            start = (a[0] + t0 * (b[0] - a[0]), a[1] + t0 * (b[1] - a[1]))
+            end = b if part == parts - 1 else (a[0] + t1 * (b[0] - a[0]), a[1] + t1 * (b[1] - a[1]))
+            chunks.append((start, end, arc + t0 * length))
+        arc += length
+    return chunks, arc
+
+
+def arc_position(a, b, arc, point):
+    dx = b[0] - a[0]
+    dy = b[1] - a[1]
+    length_sq = dx * dx + dy * dy
+    if length_sq == 0:
+        return arc
+    t = max(0.0, min(1.0, ((point[0] - a[0]) * dx + (point[1] - a[1]) * dy) / length_sq))
+    return arc + t * math.sqrt(length_sq)
+
+
+def check_spacing(piece_name, elements, min_web, self_separation=2.0):
+    segments = []
+    lines = []
+    for index, (owner, item_id, polylines) in enumerate(elements):
+        for points, closed in polylines:
+            chunks, length = polyline_chunks(points, closed, max(min_web, 1e-3))
+            line = len(lines)
+            lines.append((closed, length))
+            for a, b, arc in chunks:
+                segments.append((owner, index, item_id, line, a, b, arc))
+
+    grid = SegmentGrid(max(min_web, 1e-3))
+    bounds = []
+    for index, (_, _, _, _, a, b, _) in enumerate(segments):
+        grid.insert(index, a, b)
+        bounds.append((min(a[0], b[0]), min(a[1], b[1]), max(a[0], b[0]), max(a[1], b[1])))
+
+    closest = {}
+    for index, (owner, element, item_id, line, a, b, arc) in enumerate(segments):
+        x0, y0, x1, y1 = bounds[index]
+        closed, length = lines[line]
+        for other in grid.near(a, b, min_web):
+            if other <= index:
+                continue
+            other_owner, other_element, other_id, other_line, c, d, other_arc = segments[other]
+            if other_owner == owner and other_element != element:
+                continue
+            ox0, oy0, ox1, oy1 = bounds[other]
+            if ox0 - x1 >= min_web or x0 - ox1 >= min_web or oy0 - y1 >= min_web or y0 - oy1 >= min_web:
+                continue
+
+            dist, at = segment_distance(a, b, c, d)
+            if dist >= min_web:
+                continue
+            other_closed = lines[other_line][0]
+            if other_line == line:
+                separation = abs(arc_position(a, b, arc, at) - arc_position(c, d, other_arc, at))
+                if closed:
+                    separation = min(separation, length - separation)
+                if separation <= self_separation * min_web:
+                    continue
+            elif dist == 0 and not (closed and other_closed):
+                continue
+
+            pair = (line, other_line)
+            if pair not in closest or dist < closest[pair]["value"]:
+                closest[pair] = {
+                    "rule": "overlap" if dist == 0 else "web_width",
+                    "piece": piece_name,
+                    "items": [item_id] if item_id == other_id else [item_id, other_id],
+                    "at": at,
+                    "value": dist,
+                    "limit": min_web,
+                }
+
+    return list(closest.values())
+
+
+def collapsed_offset(piece_name, item_id, distance):
+    return {
+        "rule": "collapsed_offset",
+        "piece": piece_name,
+        "items": [item_id],
+        "at": None,
+        "value": abs(distance),
+        "limit": None,
+    }
+
+
+def run_drc(pieces, inset, params):
+    violations = []
+    if inset["top_hole"] is None:
+        violations.append(collapsed_offset("top_tabs", "top_hole_inset", params["top_hole_inset"]))
+    if params["generate_lid"] and inset["lid_fitting"] is None:
+        violations.append(collapsed_offset("lid_fitting", "lid_fitting_path", params["lid_fitting_inset"]))
+
+    min_feature = max(params["drc_min_feature"], 2 * params["kerf"])
+    for name, piece in pieces.items():
+        if piece is None:
+            continue
+        elements = piece_geometry(piece, params["drc_tolerance"])
+        violations += check_features(name, elements, min_feature)
+        violations += check_spacing(name, elements, params["drc_min_web"])
+
+    summary = {}
+    for violation in violations:
+        summary[violation["rule"]] = summary.get(violation["rule"], 0) + 1
+
+    return {"violations": violations, "summary": summary}
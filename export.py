@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+
+import math
+from xml.sax.saxutils import quoteattr
+
+import inkex
+
+try:
+    import ezdxf
+    from ezdxf import recover
+except ImportError:
+    ezdxf = None
+    recover = None
+
+from boolean import path_boolean
+from offset import split_subpaths, subpath_to_points
+from pieces import OPERATIONS
+
+
+LAYERS = {
+    "outer": ("CUT_OUTER", 1),
+    "inner": ("CUT_INNER", 6),
+    "meta": ("META", 2),
+}
+OPERATION_LAYERS = {
+    "inner": ("CUT_INNER", 6),
+    "hinges": ("CUT_HINGES", 5),
+    "outer": ("CUT_OUTER", 1),
+}
+
+
+def resolved_items(piece, precision=0.05):
+    paths = []
+    for record in piece["items"]:
+        path = inkex.Path(record["d"]).to_absolute()
+        if record["transform"] is not None:
+            path = path.transform(record["transform"])
+        paths.append(path)
+
+    skip = set()
+    if "boolean" in piece and piece["boolean"][1]:
+        target, operands = piece["boolean"]
+        clip = inkex.Path()
+        for index in operands:
+            clip += paths[index]
+        paths[target] = inkex.Path(path_boolean(paths[target], clip, "union", precision=precision))
+        skip.update(operands)
+
+    for index, (record, path) in enumerate(zip(piece["items"], paths)):
+        if index not in skip:
+            yield record, path
+
+
+def piece_bbox(piece):
+    bbox = None
+    for _, path in resolved_items(dict(piece, boolean=(0, []))):
+        bbox += path.bounding_box()
+    return bbox
+
+
+def export_paths(placed, scale, precision=0.05, layers=LAYERS):
+    for piece, offset_x, offset_y in placed:
+        transform = inkex.Transform(scale=scale) @ inkex.Transform(translate=(offset_x, offset_y))
+        for record, path in resolved_items(piece, precision):
+            if record["style"] in layers:
+                yield record["style"], path.transform(transform)
+
+
+def operation_paths(placed, scale, precision=0.05, layers=OPERATION_LAYERS):
+    operations = {operation: [] for operation in OPERATIONS}
+    for piece, offset_x, offset_y in placed:
+        transform = inkex.Transform(scale=scale) @ inkex.Transform(translate=(offset_x, offset_y))
+        for record, path in resolved_items(piece, precision):
+            operations[record["operation"]].append(path.transform(transform))
+
+    for operation in OPERATIONS:
+        if operation in layers:
+            for path in operations[operation]:
+                yield operation, path
+
+
+def arc_bulge(start, segment):
+    end = (segment.x, segment.y)
+    chord = math.hypot(end[0] - start[0], end[1] - start[1])
+    radius = max(segment.rx, chord / 2)
+    if chord == 0:
+        return 0.0
+    angle = 2 * math.asin(min(1.0, chord / (2 * radius)))
+    if segment.large_arc:
+        angle = 2 * math.pi - angle
+    return math.tan(angle / 4) * (1 if segment.sweep else -1)
+
+
+def path_entities(path, tolerance=0.05):
+    for subpath in split_subpaths(list(path.to_absolute())):
+        closed = subpath[-1].letter == 'Z'
+        vertices = []
+        current = None
+        for segment in subpath:
+            if segment.letter == 'M':
+                current = (segment.x, segment.y)
+                vertices.append([current, 0.0])
+            elif segment.letter == 'Z':
+                continue
+            elif segment.letter == 'L':
+                current = (segment.x, segment.y)
+                vertices.append([current, 0.0])
+            elif segment.letter == 'A' and abs(segment.rx - segment.ry) <= 1e-9 * max(1.0, segment.rx):
+                vertices[-1][1] = arc_bulge(current, segment)
+                current = (segment.x, segment.y)
+                vertices.append([current, 0.0])
+            else:
+                points = subpath_to_points([inkex.paths.Move(*current), segment], tolerance)
+                for point in points[1:]:
+                    vertices.append([point, 0.0])
+                current = points[-1]
+
+        if closed and len(vertices) > 1 and math.hypot(
+            vertices[-1][0][0] - vertices[0][0][0], vertices[-1][0][1] - vertices[0][0][1]
+        ) <= 1e-9:
+            vertices.pop()
+
+        if len(vertices) < 2:
+            continue
+        arcs = [index for index, (_, bulge) in enumerate(vertices) if bulge]
+        if closed and not arcs:
+            yield "POLYLINE", (vertices, closed)
+            continue
+        if closed:
+            vertices = vertices[arcs[-1] + 1:] + vertices[:arcs[-1] + 1]
+            vertices.append([vertices[0][0], 0.0])
+        yield from chain_entities(vertices)
+
+
+def chain_entities(vertices):
+    run = [vertices[0][0]]
+    for (start, bulge), (end, _) in zip(vertices, vertices[1:]):
+        if bulge:
+            yield from run_entities(run)
+            yield "ARC", arc_from_bulge(start, end, bulge)
+            run = [end]
+        else:
+            run.append(end)
+    yield from run_entities(run)
+
+
+def run_entities(points):
+    if len(points) == 2:
+        yield "LINE", (points[0], points[1])
+    elif len(points) > 2:
+        yield "POLYLINE", ([[point, 0.0] for point in points], False)
+
+
+def arc_from_bulge(start, end, bulge):
+    if bulge < 0:
+        start, end, bulge = end, start, -bulge
+    dx = end[0] - start[0]
+    dy = end[1] - start[1]
+    chord = math.hypot(dx, dy)
+    distance = (1 - bulge * bulge) / (4 * bulge)
+    center = ((start[0] + end[0]) / 2 - dy * distance, (start[1] + end[1]) / 2 + dx * distance)
+    radius = chord * (1 + bulge * bulge) / (4 * bulge)
+    start_angle = math.degrees(math.atan2(start[1] - center[1], start[0] - center[0])) % 360
+    end_angle = math.degrees(math.atan2(end[1] - center[1], end[0] - center[0])) % 360
+    return center, radius, start_angle, end_angle
+
+
+class DxfWriter:
+    def __init__(self, stream):
+        self.stream = stream
+        self.count = 0
+
+    def group(self, code, value):
+        if isinstance(value, float):
+            value = f"{value:.6f}"
+        self.stream.write(f"{code}\n{value}\n")
+
+    def groups(self, pairs):
+        for code, value in pairs:
+            self.group(code, value)
+
+    def header(self, layers):
+        layers = list(layers)
+        self.groups(((0, "SECTION"), (2, "HEADER"), (9, "$ACADVER"), (1, "AC1009"),
+                     (9, "$INSUNITS"), (70, 4), (0, "ENDSEC")))
+
+        self.groups(((0, "SECTION"), (2, "TABLES"), (0, "TABLE"), (2, "LTYPE"), (70, 1),
+                     (0, "LTYPE"), (2, "CONTINUOUS"), (70, 0), (3, "Solid line"), (72, 65), (73, 0), (40, 0.0),
+                     (0, "ENDTAB"), (0, "TABLE"), (2, "LAYER"), (70, len(layers))))
+        for name, color in layers:
+            self.groups(((0, "LAYER"), (2, name), (70, 0), (62, color), (6, "CONTINUOUS")))
+        self.groups(((0, "ENDTAB"), (0, "ENDSEC"), (0, "SECTION"), (2, "ENTITIES")))
+
+    def entity(self, kind, data, layer):
+        self.count += 1
+        self.groups(((0, kind), (8, layer)))
+        if kind == "LINE":
+            (x1, y1), (x2, y2) = data
+            for code, value in ((10, x1), (20, -y1), (11, x2), (21, -y2)):
+                self.group(code, float(value))
+        elif kind == "ARC":
+            (cx, cy), radius, start_angle, end_angle = data
+            for code, value in ((10, cx), (20, -cy), (40, radius), (50, -end_angle % 360), (51, -start_angle % 360)):
+                self.group(code, float(value))
+        else:
+            vertices, closed = data
+            self.groups(((66, 1), (10, 0.0), (20, 0.0), (30, 0.0), (70, 1 if closed else 0)))
+            for (x, y), bulge in vertices:
+                self.groups(((0, "VERTEX"), (8, layer), (10, float(x)), (20, float(-y)), (30, 0.0)))
+                if bulge:
+                    self.group(42, float(-bulge))
+            self.groups(((0, "SEQEND"), (8, layer)))
+
+    def footer(self):
+        self.group(0, "ENDSEC")
+        self.group(0, "EOF")
+
+
+def write_dxf(stream, paths, tolerance=0.05, layers=LAYERS):
+    writer = DxfWriter(stream)
+    writer.header(layers.values())
+    for style, path in paths:
+        layer = layers[style][0]
+        for kind, data in path_entities(path, tolerance):
+            writer.entity(kind, data, layer)
+    writer.footer()
+    return writer.count
+
+
+def dxf_problems(filename, expected=None):
+    if recover is None:
+        return []
+    try:
+        doc, auditor = recover.readfile(filename)
+    except (OSError, ezdxf.DXFError) as e:
+        return [str(e)]
+
+    problems = [error.message for error in auditor.errors]
+    if doc.dxfversion != "AC1009":
+        problems.append(f"read back as {doc.dxfversion} instead of AC1009")
+    count = len(doc.modelspace())
+    if expected is not None and count != expected:
+        problems.append(f"wrote {expected} entities but read back {count}")
+    return problems
+
+
+def write_svg(stream, paths, styles, layers=LAYERS):
+    grouped = {}
+    bbox = None
+    for style, path in paths:
+        grouped.setdefault(style, []).append(str(path))
+        bbox += path.bounding_box()
+
+    if bbox is None:
+        bbox = inkex.BoundingBox((0, 0), (0, 0))
+    stream.write(
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<svg xmlns="{inkex.NSS["svg"]}" width="{bbox.width}mm" height="{bbox.height}mm" '
+        f'viewBox="{bbox.left} {bbox.top} {bbox.width} {bbox.height}">\n'
+    )
+    for style, data in grouped.items():
+        stream.write(f'  <g id={quoteattr(layers[style][0])} style={quoteattr(styles[style])}>\n')
+        for d in data:
+            stream.write(f'    <path d={quoteattr(d)}/>\n')
+        stream.write('  </g>\n')
+    stream.write('</svg>\n')
@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+
+import sys
+from pathlib import Path
+
+deps_dir = Path(__file__).parent / "deps"
+if deps_dir.exists() and str(deps_dir) not in sys.path:
+    sys.path.insert(0, str(deps_dir))
+
+import math
+from bisect import bisect_left
+from functools import lru_cache
+from itertools import accumulate
+
+import inkex
+
+from offset import subpath_to_points, simplify_path_rdp, simplify_closed_path, offset_contour, arc_to_beziers, distance
+from boolean import polygon_boolean, contour_edges, WindingIndex
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import pyclipper
+except ImportError:
+    pyclipper = None
+
+try:
+    from shapely.geometry import LineString, Polygon
+    from shapely.geometry.polygon import orient
+    from shapely.ops import polygonize, unary_union
+except ImportError:
+    Polygon = None
+
+
+CLIPPER_SCALE = 2 ** 24
+
+
+def bezier_point_tangent(bezier, t):
+    p0, p1, p2, p3 = bezier
+    p0_p1_dist = ((p1[0] - p0[0])**2 + (p1[1] - p0[1])**2)**0.5
+    p2_p3_dist = ((p3[0] - p2[0])**2 + (p3[1] - p2[1])**2)**0.5
+
+    if p0_p1_dist < 0.001 and p2_p3_dist < 0.001:
+        point = (
+            p0[0] + t * (p3[0] - p0[0]),
+            p0[1] + t * (p3[1] - p0[1])
+        )
+    else:
+        point = inkex.bezier.bezierpointatt(bezier, t)
+
+    one_minus_t = 1.0 - t
+
+    dx = (3 * one_minus_t * one_minus_t * (p1[0] - p0[0]) +
+          6 * one_minus_t * t * (p2[0] - p1[0]) +
+          3 * t * t * (p3[0] - p2[0]))
+    dy = (3 * one_minus_t * one_minus_t * (p1[1] - p0[1]) +
+          6 * one_minus_t * t * (p2[1] - p1[1]) +
+          3 * t * t * (p3[1] - p2[1]))
+
+    length = (dx * dx + dy * dy) ** 0.5
+    if length > 0:
+        dx /= length
+        dy /= length
+
+    return (point[0], point[1]), (dx, dy)
+
+
+LENGTH_TOLERANCE = 0.001
+
+
+@lru_cache(maxsize=8192)
+def cached_bezier_length(bezier):
+    return inkex.bezier.bezierlength(bezier, tolerance=LENGTH_TOLERANCE)
+
+
+def bezier_length(bezier):
+    return cached_bezier_length(tuple((point[0], point[1]) for point in bezier))
+
+
+class ArcLengthIndex:
+    def __init__(self, path):
+        if isinstance(path, str):
+            path = inkex.Path(path)
+
+        self.beziers = []
+        self.last_point = None
+        for subpath in path.to_superpath():
+            for i, seg in enumerate(subpath[:-1]):
+                next_seg = subpath[i + 1]
+                self.beziers.append((seg[1], seg[2], next_seg[0], next_seg[1]))
+            self.last_point = subpath[-1][1]
+        self.lengths = self.measure(self.beziers)
+        self.ends = list(accumulate(self.lengths))
+        self.total = self.ends[-1] if self.ends else 0.0
+
+    def measure(self, beziers):
+        return [bezier_length(bezier) for bezier in beziers]
+
+    def locate(self, target_length):
+        k = bisect_left(self.ends, target_length)
+        if k == len(self.ends):
+            return (self.last_point[0], self.last_point[1]), (1.0, 0.0)
+
+        seg_length = self.lengths[k]
+        current_length = self.ends[k - 1] if k else 0.0
+        t = (target_length - current_length) / seg_length if seg_length > 0 else 0
+        return bezier_point_tangent(self.beziers[k], max(0.0, min(1.0, t)))
+
+
+class PythonBackend:
+    name = "python"
+
+    @staticmethod
+    def available():
+        return True
+
+    def flatten(self, subpath, precision=1.0):
+        return subpath_to_points(subpath, precision)
+
+    def simplify(self, points, epsilon, closed=True):
+        if closed:
+            return simplify_closed_path(points, epsilon)
+        return simplify_path_rdp(points, epsilon)
+
+    def offset_contour(self, points, offset_distance, precision=0.05, debug=False, fit_curves=True):
+        result = offset_contour(points, offset_distance, precision, debug, fit_curves, self.simplify)
+        return [result] if result is not None else []
+
+    def boolean(self, subject, clip, operation="union", fill_rule="nonzero"):
+        return polygon_boolean(subject, clip, operation, fill_rule)
+
+    def length_index(self, path):
+        return ArcLengthIndex(path)
+
+
+def approx_length(controls):
+    chord_length = distance(controls[0], controls[-1])
+    control_length = 0.0
+    for k in range(len(controls) - 1):
+        control_length += distance(controls[k], controls[k + 1])
+    return (chord_length + control_length) / 2
+
+
+def bernstein(controls, counts):
+    seg = np.repeat(np.arange(len(counts)), counts)
+    first = np.repeat(np.cumsum(counts) - counts, counts)
+    t = (np.arange(len(seg)) - first + 1) / counts[seg]
+    mt = 1 - t
+    if controls.shape[1] == 4:
+        mt2 = mt * mt
+        mt3 = mt2 * mt
+        t2 = t * t
+        t3 = t2 * t
+        weights = (mt3, 3 * mt2 * t, 3 * mt * t2, t3)
+    elif controls.shape[1] == 3:
+        weights = (mt * mt, 2 * mt * t, t * t)
+    else:
+        weights = None
+
+    coordinates = []
+    for axis in (0, 1):
+        p = [controls[:, k, axis][seg] for k in range(controls.shape[1])]
+        if weights is None:
+            values = p[0] + t * (p[1] - p[0])
+        else:
+            values = weights[0] * p[0]
+            for weight, control in zip(weights[1:], p[1:]):
+                values = values + weight * control
+        coordinates.append(values.tolist())
+    return list(zip(*coordinates))
+
+
+def speed_coefficients(beziers):
+    # The derivative as polynomials in t, laid out like inkex.bezier.balfargs.
+    controls = np.array(beziers, dtype=float).reshape(-1, 4, 2)
+    c = 3 * (controls[:, 1] - controls[:, 0])
+    b = 3 * (controls[:, 2] - controls[:, 1]) - c
+    a = controls[:, 3] - controls[:, 0] - c - b
+    return 3 * a, 2 * b, c
+
+
+def bezier_speeds(coefficients, t):
+    a, b, c = coefficients
+    x = a[:, 0] * t ** 2 + b[:, 0] * t + c[:, 0]
+    y = a[:, 1] * t ** 2 + b[:, 1] * t + c[:, 1]
+    return np.sqrt(x ** 2 + y ** 2)
+
+
+def simpson_lengths(beziers, tolerance=LENGTH_TOLERANCE, max_intervals=4096):
+    # inkex.bezier.simpson run on every segment at once, summing in the same order so the lengths match exactly.
+    coefficients = speed_coefficients(beziers)
+    lengths = np.zeros(len(coefficients[0]))
+    active = np.arange(len(lengths))
+    n = 2
+    multiplier = 1 / 6
+    interval = 0.5
+    end_sum = bezier_speeds(coefficients, 0.0) + bezier_speeds(coefficients, 1.0)
+    a_sum = np.zeros(len(lengths))
+    b_sum = bezier_speeds(coefficients, interval)
+    estimate = multiplier * (end_sum + 2 * a_sum + 4 * b_sum)
+    previous = 2 * estimate
+    while active.size:
+        done = np.abs(estimate - previous) <= tolerance if n < max_intervals else np.ones(active.size, bool)
+        lengths[active[done]] = estimate[done]
+        pending = ~done
+        active, end_sum, a_sum, b_sum, estimate = (
+            values[pending] for values in (active, end_sum, a_sum, b_sum, estimate)
+        )
+        if not active.size:
+            break
+        coefficients = tuple(values[pending] for values in coefficients)
+        n *= 2
+        multiplier /= 2
+        interval /= 2
+        a_sum = a_sum + b_sum
+        previous = estimate
+        b_sum = np.zeros(active.size)
+        for i in range(1, n, 2):
+            b_sum = b_sum + bezier_speeds(coefficients, i * interval)
+        estimate = multiplier * (end_sum + 2 * a_sum + 4 * b_sum)
+    return lengths
+
+
+class NumpyLengthIndex(ArcLengthIndex):
+    def measure(self, beziers):
+        return simpson_lengths(beziers).tolist() if beziers else []
+
+
+class NumpyBackend(PythonBackend):
+    name = "numpy"
+
+    @staticmethod
+    def available():
+        return np is not None
+
+    def flatten(self, subpath, precision=1.0):
+        chunks = [[]]
+        batches = {4: ([], []), 3: ([], []), 2: ([], [])}
+        current_point = (0, 0)
+
+        def sample(controls, count):
+            controls_list, counts = batches[len(controls)]
+            chunks.append((len(controls), len(controls_list)))
+            chunks.append([])
+            controls_list.append(controls)
+            counts.append(count)
+
+        for cmd in subpath:
+            if isinstance(cmd, tuple):
+                letter, args = cmd[0].upper(), cmd[1]
+            else:
+                letter, args = cmd.letter.upper(), cmd.args
+
+            if letter in 'ML':
+                current_point = args if isinstance(cmd, tuple) else (args[0], args[1])
+                chunks[-1].append(current_point)
+            elif letter == 'H':
+                current_point = (args[0], current_point[1])
+                chunks[-1].append(current_point)
+            elif letter == 'V':
+                current_point = (current_point[0], args[-1])
+                chunks[-1].append(current_point)
+            elif letter == 'C':
+                controls = (current_point, (args[0], args[1]), (args[2], args[3]), (args[4], args[5]))
+                sample(controls, max(2, int(approx_length(controls) / precision)))
+                current_point = controls[3]
+            elif letter == 'Q':
+                controls = (current_point, (args[0], args[1]), (args[2], args[3]))
+                sample(controls, max(2, int(approx_length(controls) / precision)))
+                current_point = controls[2]
+            elif letter in 'ST':
+                end = (args[-2], args[-1])
+                sample((current_point, end), max(2, int(distance(current_point, end) / precision)))
+                current_point = end
+            elif letter == 'A':
+                end = (args[5], args[6])
+                for bez in arc_to_beziers(*current_point, abs(args[0]), abs(args[1]), args[2], args[3], args[4], *end):
+                    sample(bez, max(2, int(approx_length(bez) / precision)))
+                current_point = end
+
+        if len(chunks) == 1:
+            return chunks[0]
+
+        sampled = {}
+        for order, (controls, counts) in batches.items():
+            if counts:
+                counts = np.array(counts)
+                points = bernstein(np.array(controls, dtype=float), counts)
+                ends = np.cumsum(counts).tolist()
+                sampled[order] = [points[end - count:end] for end, count in zip(ends, counts.tolist())]
+
+        points = []
+        for chunk in chunks:
+            if isinstance(chunk, list):
+                points += chunk
+            else:
+                points += sampled[chunk[0]][chunk[1]]
+        return points
+
+    def simplify(self, points, epsilon, closed=True):
+        if len(points) < (4 if closed else 3):
+            return points
+
+        coords = np.array(points, dtype=float)
+        keep = np.zeros(len(points), dtype=bool)
+        keep[0] = keep[-1] = True
+        stack = [(0, len(points) - 1)]
+        while stack:
+            first, last = stack.pop()
+            if last - first < 2:
+                continue
+            x1, y1 = coords[first]
+            x2, y2 = coords[last]
+            x0 = coords[first + 1:last, 0]
+            y0 = coords[first + 1:last, 1]
+            dx = x2 - x1
+            dy = y2 - y1
+            line_length_sq = dx * dx + dy * dy
+            if line_length_sq == 0:
+                ex = x1 - x0
+                ey = y1 - y0
+                distances = np.sqrt(ex * ex + ey * ey)
+            else:
+                distances = np.abs(dy * x0 - dx * y0 + x2 * y1 - y2 * x1) / math.sqrt(line_length_sq)
+            k = int(np.argmax(distances))
+            if distances[k] > epsilon:
+                keep[first + 1 + k] = True
+                stack += [(first + 1 + k, last), (first, first + 1 + k)]
+
+        return [points[i] for i in np.flatnonzero(keep)]
+
+    def length_index(self, path):
+        return NumpyLengthIndex(path)
+
+
+BOOLEAN_BACKEND_BASE = NumpyBackend if np is not None else PythonBackend
+
+
+class ClipperBackend(BOOLEAN_BACKEND_BASE):
+    name = "pyclipper"
+
+    @staticmethod
+    def available():
+        return pyclipper is not None
+
+    def boolean(self, subject, clip, operation="union", fill_rule="nonzero"):
+        clip_types = {
+            "union": pyclipper.CT_UNION,
+            "intersection": pyclipper.CT_INTERSECTION,
+            "difference": pyclipper.CT_DIFFERENCE,
+            "xor": pyclipper.CT_XOR,
+        }
+        if operation not in clip_types:
+            raise ValueError(f"Unknown boolean operation: {operation}")
+
+        clipper = pyclipper.Pyclipper()
+        added = False
+        for contours, poly_type in ((subject, pyclipper.PT_SUBJECT), (clip, pyclipper.PT_CLIP)):
+            contours = [contour for contour in contours if len(contour) >= 3]
+            if contours:
+                try:
+                    clipper.AddPaths(pyclipper.scale_to_clipper(contours, CLIPPER_SCALE), poly_type, True)
+                    added = True
+                except pyclipper.ClipperException:
+                    pass
+        if not added:
+            return []
+
+        fill = pyclipper.PFT_NONZERO if fill_rule == "nonzero" else pyclipper.PFT_EVENODD
+        loops = clipper.Execute(clip_types[operation], fill, fill)
+        return [list(map(tuple, loop)) for loop in pyclipper.scale_from_clipper(loops, CLIPPER_SCALE)]
+
+
+def polygon_loops(geometry):
+    polygons = getattr(geometry, "geoms", [geometry])
+    loops = []
+    for polygon in polygons:
+        if polygon.is_empty or polygon.geom_type != "Polygon":
+            continue
+        polygon = orient(polygon, 1.0)
+        for ring in [polygon.exterior] + list(polygon.interiors):
+            loops.append([tuple(point) for point in ring.coords[:-1]])
+    return loops
+
+
+def filled_region(contours, fill_rule):
+    contours = [contour for contour in contours if len(contour) >= 3]
+    edges = contour_edges(contours, 0)
+    if not edges:
+        return Polygon()
+
+    index = WindingIndex(edges)
+    faces = []
+    for face in polygonize(unary_union([LineString(list(contour) + [contour[0]]) for contour in contours])):
+        probe = face.representative_point()
+        winding = index.winding((probe.x, probe.y))
+        if (winding != 0) if fill_rule == "nonzero" else (winding % 2 != 0):
+            faces.append(face)
+    return unary_union(faces)
+
+
+class ShapelyBackend(BOOLEAN_BACKEND_BASE):
+    name = "shapely"
+
+    @staticmethod
+    def available():
+        return Polygon is not None
+
+    def boolean(self, subject, clip, operation="union", fill_rule="nonzero"):
+        operations = {
+            "union": lambda a, b: a.union(b),
+            "intersection": lambda a, b: a.intersection(b),
+            "difference": lambda a, b: a.difference(b),
+            "xor": lambda a, b: a.symmetric_difference(b),
+        }
+        if operation not in operations:
+            raise ValueError(f"Unknown boolean operation: {operation}")
+        result = operations[operation](filled_region(subject, fill_rule), filled_region(clip, fill_rule))
+        return polygon_loops(result)
+
+
+BACKENDS = {backend.name: backend for backend in (ClipperBackend, ShapelyBackend, NumpyBackend, PythonBackend)}
+AUTO_BACKENDS = ("numpy", "python")
+INSTANCES = {}
+
+
+def available_backends():
+    return [name for name, backend in BACKENDS.items() if backend.available()]
+
+
+def get_backend(name=None):
+    if name is None:
+        return ACTIVE
+    if not isinstance(name, str):
+        return name
+    if name == "auto":
+        name = next(candidate for candidate in AUTO_BACKENDS if BACKENDS[candidate].available())
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown geometry backend '{name}'. Choose from: auto, {', '.join(BACKENDS)}.")
+    if not BACKENDS[name].available():
+        raise ValueError(f"Geometry backend '{name}' is not installed. Available: {', '.join(available_backends())}.")
+    if name not in INSTANCES:
+        INSTANCES[name] = BACKENDS[name]()
+    return INSTANCES[name]
+
+
+def use_backend(name="auto"):
+    global ACTIVE
+    ACTIVE = get_backend(name)
+    return ACTIVE
+
+
+ACTIVE = get_backend("auto")
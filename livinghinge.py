@@ -7,13 +7,21 @@ deps_dir = Path(__file__).parent / "deps"
 if deps_dir.exists() and str(deps_dir) not in sys.path:
     sys.path.insert(0, str(deps_dir))
 
+import math
+from bisect import bisect_left, bisect_right
 import inkex
-from inkex import PathElement, Transform
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
-def create_living_hinge_pattern(svg, hinge_length, hinge_gap, hinge_spacing, width, height,
-                                offset_x, offset_y, cut_style, tab_positions=None, segment_start=0):
-    hinges = []
+from offset import split_subpaths
+from geometry import get_backend, bezier_length
+
+
+def hinge_slits(hinge_length, hinge_gap, hinge_spacing, width, height):
+    slits = []
     x_pos = hinge_spacing / 2
     col = 0
 
@@ -28,28 +36,12 @@ def create_living_hinge_pattern(svg, hinge_length, hinge_gap, hinge_spacing, wid
             top_cut_start = max(0, top_cut_end - hinge_length)
 
         if top_cut_start < top_cut_end and top_cut_end > 0:
-            hinge_path_data = f"M {x_pos},{top_cut_start} L {x_pos},{top_cut_end}"
-            hinge = PathElement()
-            hinge.set_id(svg.get_unique_id(f"hinge_{col}_top"))
-            hinge.set('d', hinge_path_data)
-            hinge.style = cut_style
-            hinge.transform = inkex.Transform(translate=(offset_x, offset_y))
-            hinges.append(hinge)
+            slits.append((col, "top", x_pos, top_cut_start, top_cut_end))
 
         y_pos = y_start
         cut_index = 0
         while y_pos + hinge_length <= height - hinge_gap:
-            hinge_abs_start = segment_start + x_pos
-            hinge_abs_end = segment_start + x_pos
-
-            hinge_path_data = f"M {x_pos},{y_pos} L {x_pos},{y_pos + hinge_length}"
-
-            hinge = PathElement()
-            hinge.set_id(svg.get_unique_id(f"hinge_{col}_{cut_index}"))
-            hinge.set('d', hinge_path_data)
-            hinge.style = cut_style
-            hinge.transform = inkex.Transform(translate=(offset_x, offset_y))
-            hinges.append(hinge)
+            slits.append((col, str(cut_index), x_pos, y_pos, y_pos + hinge_length))
 
             y_pos += hinge_length + hinge_spacing
             cut_index += 1
@@ -58,26 +50,176 @@ def create_living_hinge_pattern(svg, hinge_length, hinge_gap, hinge_spacing, wid
         bottom_cut_end = min(height, bottom_cut_start + hinge_length)
 
         if bottom_cut_start < height and bottom_cut_end > bottom_cut_start:
-            hinge_path_data = f"M {x_pos},{bottom_cut_start} L {x_pos},{bottom_cut_end}"
-            hinge = PathElement()
-            hinge.set_id(svg.get_unique_id(f"hinge_{col}_bottom"))
-            hinge.set('d', hinge_path_data)
-            hinge.style = cut_style
-            hinge.transform = inkex.Transform(translate=(offset_x, offset_y))
-            hinges.append(hinge)
+            slits.append((col, "bottom", x_pos, bottom_cut_start, bottom_cut_end))
 
         x_pos += hinge_spacing
         col += 1
 
-    return hinges
+    return slits
+
+
+def column_lead_in(x_pos, lead_in, index, segment_start):
+    if index is None or lead_in <= 0:
+        return lead_in
+    x_pos += segment_start
+    if index.overlaps(x_pos - lead_in, x_pos + lead_in):
+        return 0.0
+    return lead_in
+
+
+def count_pierces(toolpaths, height):
+    return sum(1 for toolpath in toolpaths if 0 <= toolpath[0][1] <= height)
+
+
+def separate_toolpaths(slits):
+    return [[(x_pos, y0), (x_pos, y1)] for _, _, x_pos, y0, y1 in slits]
+
+
+def edge_chains(ends, edge, outward, index=None, segment_start=0):
+    chains = []
+    previous = None
+    for x_pos, inner, extension in ends:
+        linked = (
+            previous is not None and extension > 0 and previous[2] > 0
+            and not (index is not None and index.overlaps(min(previous[0], x_pos) + segment_start,
+                                                          max(previous[0], x_pos) + segment_start))
+        )
+        if not linked:
+            chains.append([])
+        chains[-1].append((x_pos, inner, extension))
+        previous = (x_pos, inner, extension)
+
+    toolpaths = []
+    for chain in chains:
+        points = []
+        for x_pos, inner, extension in chain:
+            outside = edge + outward * extension
+            points += [(x_pos, outside), (x_pos, inner), (x_pos, outside)]
+        toolpaths.append(points[:-1])
+    return toolpaths
+
+
+def chain_hinge_slits(slits, height, lead_in, index=None, segment_start=0):
+    columns = {}
+    for slit in slits:
+        columns.setdefault(slit[0], []).append(slit)
+
+    top = []
+    bottom = []
+    through = []
+    inner = []
+    for order, col in enumerate(sorted(columns)):
+        column = sorted(columns[col], key=lambda slit: slit[3])
+        extension = column_lead_in(column[0][2], lead_in, index, segment_start)
+        interior = []
+        for _, _, x_pos, y0, y1 in column:
+            if y0 <= 0 and y1 >= height:
+                through.append([(x_pos, -extension), (x_pos, height + extension)])
+            elif y0 <= 0:
+                top.append((x_pos, y1, extension))
+            elif y1 >= height:
+                bottom.append((x_pos, y0, extension))
+            else:
+                interior.append([(x_pos, y0), (x_pos, y1)])
+        if order % 2:
+            interior = [toolpath[::-1] for toolpath in reversed(interior)]
+        inner += interior
+
+    return (
+        edge_chains(top, 0.0, -1, index, segment_start)
+        + through
+        + inner
+        + edge_chains(bottom[::-1], height, 1, index, segment_start)
+    )
+
+
+class IntervalIndex:
+    def __init__(self, intervals):
+        self.starts = []
+        self.ends = []
+        for start, end in sorted(intervals):
+            if self.ends and start <= self.ends[-1]:
+                self.ends[-1] = max(self.ends[-1], end)
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+
+    def overlapping(self, start, end):
+        first = bisect_right(self.ends, start)
+        last = bisect_left(self.starts, end)
+        return list(zip(self.starts[first:last], self.ends[first:last]))
+
+    def overlaps(self, start, end):
+        return bisect_right(self.ends, start) < bisect_left(self.starts, end)
+
+
+def avoid_keep_outs(slits, index, segment_start, clearance, stats=None):
+    kept = []
+    suppressed = set()
+    for slit in slits:
+        x_pos = slit[2] + segment_start
+        if index.overlaps(x_pos - clearance, x_pos + clearance):
+            suppressed.add(slit[0])
+        else:
+            kept.append(slit)
+
+    if stats is not None:
+        stats["suppressed_columns"] = stats.get("suppressed_columns", 0) + len(suppressed)
+
+    return kept
 
 
-def detect_straight_segments(inset_path_d, min_straight_length, svg, units):
+def living_hinge_paths(hinge_length, hinge_gap, hinge_spacing, width, height,
+                       tab_positions=None, segment_start=0, emission="separate", lead_in=0.0, stats=None,
+                       clearance=0.0):
+    slits = hinge_slits(hinge_length, hinge_gap, hinge_spacing, width, height)
+
+    index = None
+    if tab_positions:
+        index = IntervalIndex(tab_positions)
+        slits = avoid_keep_outs(slits, index, segment_start, clearance, stats)
+
+    separate = separate_toolpaths(slits)
+    toolpaths = chain_hinge_slits(slits, height, lead_in, index, segment_start) if emission == "chained" else separate
+
+    if stats is not None:
+        stats["slits"] = stats.get("slits", 0) + len(slits)
+        stats["pierces"] = stats.get("pierces", 0) + count_pierces(toolpaths, height)
+        stats["separate_pierces"] = stats.get("separate_pierces", 0) + count_pierces(separate, height)
+
+    if emission == "chained":
+        if not toolpaths:
+            return []
+        return [("hinge_chain", " ".join(
+            "M " + " L ".join(f"{x_pos},{y_pos}" for x_pos, y_pos in toolpath) for toolpath in toolpaths
+        ))]
+
+    return [(f"hinge_{col}_{name}", f"M {x_pos},{y0} L {x_pos},{y1}") for col, name, x_pos, y0, y1 in slits]
+
+
+def hinge_placeholder_path(width, height, spacing, max_lines=64):
+    spacing = max(spacing, (width + height) / max_lines)
+    path_data = f"M 0,0 L {width},0 L {width},{height} L 0,{height} Z"
+    if height <= 0 or spacing <= 0:
+        return path_data
+
+    c = spacing / 2 - height
+    while c < width:
+        t0 = max(0.0, -c / height)
+        t1 = min(1.0, (width - c) / height)
+        if t0 < t1:
+            path_data += (
+                f" M {c + t0 * height},{height * (1 - t0)}"
+                f" L {c + t1 * height},{height * (1 - t1)}"
+            )
+        c += spacing
+    return path_data
+
+
+def straight_segments_along(inset_path_d, min_length_uu):
     path = inkex.Path(inset_path_d)
     csp = path.to_superpath()
 
-    min_length_uu = svg.unittouu(f"{min_straight_length}{units}")
-
     straight_segments = []
     current_distance = 0.0
 
@@ -85,7 +227,7 @@ def detect_straight_segments(inset_path_d, min_straight_length, svg, units):
         for i, seg in enumerate(subpath[:-1]):
             next_seg = subpath[i + 1]
             bezier = (seg[1], seg[2], next_seg[0], next_seg[1])
-            seg_length = inkex.bezier.bezierlength(bezier)
+            seg_length = bezier_length(bezier)
 
             if seg_length >= min_length_uu:
                 straight_segments.append((current_distance, current_distance + seg_length))
@@ -93,3 +235,109 @@ def detect_straight_segments(inset_path_d, min_straight_length, svg, units):
             current_distance += seg_length
 
     return straight_segments
+
+
+def straight_regions(runs, min_length, closed=True):
+    runs = list(runs)
+    if not runs:
+        return [], []
+    contour_start = runs[0][0]
+    period = runs[-1][1] - contour_start
+    if closed and len(runs) > 2 and runs[0][2] == runs[-1][2]:
+        start, end, straight, radius = runs.pop()
+        first = runs.pop(0)
+        runs.append((start, end + first[1] - first[0], straight, min(radius, first[3])))
+
+    intervals = []
+    bends = []
+    for start, end, straight, radius in runs:
+        if straight and end - start >= min_length:
+            if end > contour_start + period + 1e-9:
+                intervals += [(start, contour_start + period), (contour_start, end - period)]
+            else:
+                intervals.append((start, end))
+        elif bends and abs(bends[-1][1] - start) <= 1e-9:
+            bends[-1] = (bends[-1][0], end, min(bends[-1][2], radius))
+        else:
+            bends.append((start, end, radius))
+
+    if closed and len(bends) > 1 and abs(bends[-1][1] - period - bends[0][0]) <= 1e-9:
+        first = bends.pop(0)
+        bends[-1] = (bends[-1][0], first[1] + period, min(bends[-1][2], first[2]))
+    return sorted(intervals), bends
+
+
+def sampled_runs(points, closed, start, scale, spacing, bend_radius):
+    if closed:
+        points = np.vstack([points, points[:1]])
+    steps = np.hypot(*np.diff(points, axis=0).T)
+    cumulative = np.concatenate([[0.0], np.cumsum(steps)])
+    length = cumulative[-1]
+    count = max(int(math.ceil(length / spacing)), 8)
+    s = np.linspace(0.0, length, count + 1)
+    x = np.interp(s, cumulative, points[:, 0])
+    y = np.interp(s, cumulative, points[:, 1])
+    heading = np.arctan2(np.diff(y), np.diff(x))
+
+    window = 2
+    if closed:
+        turn = np.roll(heading, -window) - np.roll(heading, window)
+    else:
+        index = np.arange(count)
+        turn = heading[np.minimum(index + window, count - 1)] - heading[np.maximum(index - window, 0)]
+    turn = np.angle(np.exp(1j * turn))
+    curvature = np.abs(turn) / (2 * window * length / count)
+    straight = curvature < 1.0 / bend_radius
+
+    boundaries = np.flatnonzero(np.diff(straight)) + 1
+    edges = np.concatenate([[0], boundaries, [count]])
+    step = length / count * scale
+    runs = []
+    for first, last in zip(edges[:-1], edges[1:]):
+        peak = curvature[first:last].max()
+        runs.append((
+            start + float(first * step),
+            start + float(last * step),
+            bool(straight[first]),
+            float(1.0 / peak / scale) if peak > 0 else math.inf,
+        ))
+    return runs
+
+
+def curvature_straight_regions(inset_path_d, total_length, min_length, bend_radius, tolerance=0.05, backend=None):
+    backend = get_backend(backend)
+    contours = []
+    for subpath in split_subpaths(list(inkex.Path(inset_path_d).to_absolute())):
+        points = backend.flatten(subpath, tolerance)
+        closed = subpath[-1].letter == 'Z'
+        if closed and len(points) > 1 and points[0] == points[-1]:
+            points = points[:-1]
+        if len(points) >= 2:
+            contours.append((points, closed))
+
+    if np is None or not contours:
+        intervals = straight_segments_along(inset_path_d, min_length)
+        return intervals, []
+
+    contours = [(np.array(points, dtype=float), closed) for points, closed in contours]
+    lengths = [
+        np.hypot(*np.diff(np.vstack([points, points[:1]]) if closed else points, axis=0).T).sum()
+        for points, closed in contours
+    ]
+    polyline_length = sum(lengths)
+    if polyline_length <= 0:
+        return [], []
+
+    scale = total_length / float(polyline_length)
+    spacing = max(min(min_length, bend_radius) / 16, polyline_length / 100000)
+    intervals = []
+    bends = []
+    start = 0.0
+    for (points, closed), length in zip(contours, lengths):
+        runs = sampled_runs(points, closed, start, scale, spacing, bend_radius)
+        contour_intervals, contour_bends = straight_regions(runs, min_length, closed)
+        intervals += contour_intervals
+        bends += contour_bends
+        start += float(length) * scale
+
+    return intervals, bends
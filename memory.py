@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+import gc
+import sys
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+MB = 1024 * 1024
+ACTIVE = None
+
+
+class MemoryBudgetExceeded(MemoryError):
+    pass
+
+
+def peak_rss():
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage if sys.platform == "darwin" else usage * 1024
+
+
+def live_objects(cls):
+    return sum(1 for obj in gc.get_objects() if isinstance(obj, cls))
+
+
+@contextmanager
+def track(name):
+    if ACTIVE is None:
+        yield
+        return
+    with ACTIVE.stage(name):
+        yield
+
+
+class MemoryMonitor:
+    def __init__(self, report=False, budget=0, top=10):
+        self.report = report
+        self.budget = budget
+        self.top = top
+        self.trace = report or (budget and resource is None)
+        self.stages = []
+        self.stack = []
+
+    def start(self):
+        global ACTIVE
+        if self.trace and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        ACTIVE = self
+
+    def stop(self):
+        global ACTIVE
+        ACTIVE = None
+        if self.trace and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def traced_peak(self):
+        return max([tracemalloc.get_traced_memory()[1]] + [record["peak"] for record in self.stages])
+
+    def snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+
+    @contextmanager
+    def stage(self, name):
+        record = {"name": name, "depth": len(self.stack), "peak": 0, "growth": 0, "delta": 0, "sites": []}
+        self.stages.append(record)
+        before = None
+        if self.trace:
+            current, peak = tracemalloc.get_traced_memory()
+            for parent in self.stack:
+                parent["peak"] = max(parent["peak"], peak)
+            if hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+            record["start"] = current
+            if self.report:
+                before = self.snapshot()
+
+        self.stack.append(record)
+        try:
+            yield record
+        finally:
+            self.stack.pop()
+            if self.trace:
+                current, peak = tracemalloc.get_traced_memory()
+                record["peak"] = max(record["peak"], peak)
+                record["growth"] = record["peak"] - record["start"]
+                record["delta"] = current - record.pop("start")
+                for parent in self.stack:
+                    parent["peak"] = max(parent["peak"], peak)
+                if before is not None:
+                    diff = self.snapshot().compare_to(before, "lineno")
+                    record["sites"] = [
+                        (str(stat.traceback[0]), stat.size_diff, stat.count_diff)
+                        for stat in diff[:self.top] if stat.size_diff > 0
+                    ]
+            record["rss"] = peak_rss()
+
+        self.check(name)
+
+    def replay(self, stages, label="cached"):
+        for record in stages:
+            self.stages.append(dict(record, name=f"{record['name']} ({label})"))
+
+    def check(self, name):
+        if not self.budget:
+            return
+        used = peak_rss() if resource is not None else self.traced_peak()
+        if used > self.budget:
+            raise MemoryBudgetExceeded(
+                f"Memory budget of {self.budget / MB:.0f} MB exceeded after {name} "
+                f"({used / MB:.0f} MB in use). Reduce the hinge density or box size, or raise the budget."
+            )
+
+    def report_lines(self, path_elements=None):
+        lines = []
+        summary = []
+        if self.trace:
+            summary.append(f"peak traced {self.traced_peak() / MB:.1f} MB")
+        rss = peak_rss()
+        if rss is not None:
+            summary.append(f"peak RSS {rss / MB:.1f} MB")
+        if path_elements is not None:
+            summary.append(f"{path_elements} live PathElement objects")
+        lines.append("Memory: " + ", ".join(summary))
+
+        for record in self.stages:
+            lines.append(
+                f"{'  ' * (record['depth'] + 1)}{record['name']}: peak {record['peak'] / MB:.1f} MB, "
+                f"retained {record['delta'] / MB:+.1f} MB"
+            )
+
+        heaviest = max(self.stages, key=lambda record: record["growth"], default=None)
+        if heaviest is not None and heaviest["sites"]:
+            lines.append(f"Top allocation sites in {heaviest['name']}:")
+            for site, size, count in heaviest["sites"]:
+                lines.append(f"  {site}: {size / 1024:.1f} KiB in {count} blocks")
+        return lines
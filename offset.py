@@ -2,12 +2,17 @@
 
 import math
 
+from curvefit import fit_closed_polyline, segments_to_path_data
+
 try:
     from inkex import Path
 except ImportError:
     Path = None
 
 
+HIDDER_FILTER_ID = "selectable_hidder_filter"
+
+
 def subpath_to_points(subpath, precision=1.0):
     points = []
     current_point = (0, 0)
@@ -551,112 +556,218 @@ def calculate_perpendicular_offset(point, prev_point, next_point, offset_distanc
     return (offset_x, offset_y)
 
 
-def offset_path(subpath, offset_distance, precision=0.05, debug=False):
-    try:
-        try:
-            from inkex import Path
-            if isinstance(subpath, Path):
-                subpath = list(subpath)
-        except (ImportError, NameError):
-            pass
+def contour_points(subpath, precision=0.05, debug=False, backend=None):
+    from geometry import get_backend
+    backend = get_backend(backend)
+    points = backend.flatten(subpath, precision)
 
-        points = subpath_to_points(subpath, precision)
+    if len(points) < 3:
+        if debug:
+            print(f"ERROR: Not enough points ({len(points)}) after approximation")
+        return None
 
-        if len(points) < 3:
+    if len(points) > 1:
+        first = points[0]
+        last = points[-1]
+        dist = math.sqrt((last[0] - first[0])**2 + (last[1] - first[1])**2)
+        if dist < 0.001:
+            points = points[:-1]
             if debug:
-                print(f"ERROR: Not enough points ({len(points)}) after approximation")
-            return None
+                print(f"Removed duplicate closing point (distance: {dist:.6f})")
 
-        if len(points) > 1:
-            first = points[0]
-            last = points[-1]
-            dist = math.sqrt((last[0] - first[0])**2 + (last[1] - first[1])**2)
-            if dist < 0.001:
-                points = points[:-1]
-                if debug:
-                    print(f"Removed duplicate closing point (distance: {dist:.6f})")
-
-        original_count = len(points)
-        points = simplify_closed_path(points, epsilon=precision * 2)
+    original_count = len(points)
+    points = backend.simplify(points, epsilon=precision * 2)
+    if debug:
+        print(f"Pre-simplified from {original_count} to {len(points)} points")
+
+    if len(points) < 3:
         if debug:
-            print(f"Pre-simplified from {original_count} to {len(points)} points")
+            print(f"ERROR: Not enough points ({len(points)}) after pre-simplification")
+        return None
 
-        if len(points) < 3:
-            if debug:
-                print(f"ERROR: Not enough points ({len(points)}) after pre-simplification")
-            return None
+    return points
 
-        polygon_winding = calculate_polygon_winding(points)
 
-        if debug:
-            print(f"\n=== OFFSET DEBUG ===")
-            print(f"Original polygon ({len(points)} points after pre-simplification):")
-            print(f"  First 10 points: {points[:10]}")
-            print(f"  Last 5 points: {points[-5:]}")
-            print(f"Offset distance: {offset_distance}")
-            print(f"Precision: {precision}")
-            print(f"Global polygon winding: {'CCW' if polygon_winding > 0 else 'CW'}")
-            print(f"\nProcessing first 5 points to show edge vectors:")
-
-        offset_points = []
-        n = len(points)
-        for i, point in enumerate(points):
-            prev_point = points[(i - 1) % n]
-            next_point = points[(i + 1) % n]
-
-            offset_point = calculate_perpendicular_offset(point, prev_point, next_point, offset_distance, polygon_winding, debug=(debug and i < 5))
-
-            if debug and i < 5:
-                e1_dx = point[0] - prev_point[0]
-                e1_dy = point[1] - prev_point[1]
-                e2_dx = next_point[0] - point[0]
-                e2_dy = next_point[1] - point[1]
-                print(f"\n  Point [{i}]: {point}")
-                print(f"    Prev point: {prev_point}")
-                print(f"    Next point: {next_point}")
-                print(f"    Edge 1 vector (from prev): ({e1_dx:.3f}, {e1_dy:.3f})")
-                print(f"    Edge 2 vector (to next): ({e2_dx:.3f}, {e2_dy:.3f})")
-                print(f"    Offset point: {offset_point}")
-                print(f"    Movement: ({offset_point[0] - point[0]:.3f}, {offset_point[1] - point[1]:.3f})")
-
-            if offset_point:
-                offset_points.append(offset_point)
+def offset_contour(points, offset_distance, precision=0.05, debug=False, fit_curves=True,
+                   simplify=simplify_closed_path):
+    polygon_winding = calculate_polygon_winding(points)
 
-        if debug:
-            print(f"\nResult:")
-            print(f"  Offset points generated: {len(offset_points)}")
-            print(f"  First 5 offset points: {offset_points[:5]}")
-            print(f"  Last 5 offset points: {offset_points[-5:]}")
+    if debug:
+        print(f"\n=== OFFSET DEBUG ===")
+        print(f"Original polygon ({len(points)} points after pre-simplification):")
+        print(f"  First 10 points: {points[:10]}")
+        print(f"  Last 5 points: {points[-5:]}")
+        print(f"Offset distance: {offset_distance}")
+        print(f"Precision: {precision}")
+        print(f"Global polygon winding: {'CCW' if polygon_winding > 0 else 'CW'}")
+        print(f"\nProcessing first 5 points to show edge vectors:")
+
+    offset_points = []
+    n = len(points)
+    for i, point in enumerate(points):
+        prev_point = points[(i - 1) % n]
+        next_point = points[(i + 1) % n]
+
+        offset_point = calculate_perpendicular_offset(point, prev_point, next_point, offset_distance, polygon_winding, debug=(debug and i < 5))
+
+        if debug and i < 5:
+            e1_dx = point[0] - prev_point[0]
+            e1_dy = point[1] - prev_point[1]
+            e2_dx = next_point[0] - point[0]
+            e2_dy = next_point[1] - point[1]
+            print(f"\n  Point [{i}]: {point}")
+            print(f"    Prev point: {prev_point}")
+            print(f"    Next point: {next_point}")
+            print(f"    Edge 1 vector (from prev): ({e1_dx:.3f}, {e1_dy:.3f})")
+            print(f"    Edge 2 vector (to next): ({e2_dx:.3f}, {e2_dy:.3f})")
+            print(f"    Offset point: {offset_point}")
+            print(f"    Movement: ({offset_point[0] - point[0]:.3f}, {offset_point[1] - point[1]:.3f})")
+
+        if offset_point:
+            offset_points.append(offset_point)
 
-        if len(offset_points) < 3:
-            if debug:
-                print(f"ERROR: Not enough offset points ({len(offset_points)})")
-            return None
+    if debug:
+        print(f"\nResult:")
+        print(f"  Offset points generated: {len(offset_points)}")
+        print(f"  First 5 offset points: {offset_points[:5]}")
+        print(f"  Last 5 offset points: {offset_points[-5:]}")
 
+    if len(offset_points) < 3:
         if debug:
-            print(f"\nRemoving self-intersections...")
-        cleaned_points = remove_self_intersections(offset_points, offset_distance, debug=debug)
+            print(f"ERROR: Not enough offset points ({len(offset_points)})")
+        return None
 
-        if debug:
-            print(f"  Points after cleaning: {len(cleaned_points)}")
-            if len(cleaned_points) != len(offset_points):
-                print(f"  Removed {len(offset_points) - len(cleaned_points)} points from self-intersecting loops")
+    if debug:
+        print(f"\nRemoving self-intersections...")
+    cleaned_points = remove_self_intersections(offset_points, offset_distance, debug=debug)
 
-        simplified_points = simplify_closed_path(cleaned_points, epsilon=precision)
+    if debug:
+        print(f"  Points after cleaning: {len(cleaned_points)}")
+        if len(cleaned_points) != len(offset_points):
+            print(f"  Removed {len(offset_points) - len(cleaned_points)} points from self-intersecting loops")
 
-        if debug:
-            print(f"\nSimplification:")
-            print(f"  Cleaned offset points: {len(cleaned_points)}")
-            print(f"  Simplified points: {len(simplified_points)}")
-            print(f"  Reduction: {len(cleaned_points) - len(simplified_points)} points ({100 * (1 - len(simplified_points) / len(cleaned_points)):.1f}%)")
+    simplified_points = simplify(cleaned_points, epsilon=precision)
+
+    if debug:
+        print(f"\nSimplification:")
+        print(f"  Cleaned offset points: {len(cleaned_points)}")
+        print(f"  Simplified points: {len(simplified_points)}")
+        print(f"  Reduction: {len(cleaned_points) - len(simplified_points)} points ({100 * (1 - len(simplified_points) / len(cleaned_points)):.1f}%)")
+
+    offset_points = simplified_points
 
-        offset_points = simplified_points
+    if fit_curves:
+        start, segments = fit_closed_polyline(cleaned_points, precision)
+        path_str = segments_to_path_data(start, segments)
 
+        if debug:
+            print(f"\nCurve fitting:")
+            print(f"  Fitted segments: {len(segments)} (from {len(simplified_points)} polyline points)")
+    else:
         path_str = f"M {offset_points[0][0]},{offset_points[0][1]}"
         for point in offset_points[1:]:
             path_str += f" L {point[0]},{point[1]}"
         path_str += " Z"
 
+    return path_str, offset_points
+
+
+def split_subpaths(subpath):
+    contours = []
+    for cmd in subpath:
+        letter = cmd[0].upper() if isinstance(cmd, tuple) else cmd.letter.upper()
+        if letter == 'M' or not contours:
+            contours.append([])
+        contours[-1].append(cmd)
+    return contours
+
+
+def polygon_bbox(points):
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    return (min(xs), min(ys), max(xs), max(ys))
+
+
+def contour_nesting(contours):
+    bboxes = [polygon_bbox(points) for points in contours]
+    index = sorted(
+        range(len(contours)),
+        key=lambda i: (bboxes[i][2] - bboxes[i][0]) * (bboxes[i][3] - bboxes[i][1]),
+        reverse=True
+    )
+
+    depths = [0] * len(contours)
+    for position, i in enumerate(index):
+        x0, y0, x1, y1 = bboxes[i]
+        for j in index[:position]:
+            bx0, by0, bx1, by1 = bboxes[j]
+            if bx0 <= x0 and by0 <= y0 and bx1 >= x1 and by1 >= y1:
+                if point_in_polygon(contours[i][0], contours[j]):
+                    depths[i] += 1
+
+    return depths
+
+
+def offset_contour_job(job):
+    from geometry import get_backend
+    backend, points, offset_distance, precision, debug, fit_curves = job
+    return get_backend(backend).offset_contour(points, offset_distance, precision, debug, fit_curves)
+
+
+def offset_contours(jobs, min_parallel_points=2000):
+    # Only the top-level process fans out; pipeline and batch workers already run in a pool.
+    if len(jobs) > 1 and sum(len(job[1]) for job in jobs) >= min_parallel_points:
+        import multiprocessing
+        from pipeline import POOL_ERRORS
+        if multiprocessing.parent_process() is None:
+            try:
+                import os
+                from concurrent.futures import ProcessPoolExecutor
+                workers = min(len(jobs), os.cpu_count() or 1)
+                if workers > 1:
+                    with ProcessPoolExecutor(max_workers=workers) as pool:
+                        return list(pool.map(offset_contour_job, jobs))
+            except (ImportError, RuntimeError) + POOL_ERRORS:
+                pass
+
+    return [offset_contour_job(job) for job in jobs]
+
+
+def offset_path(subpath, offset_distance, precision=0.05, debug=False, fit_curves=True, backend=None):
+    try:
+        from geometry import get_backend
+        backend = get_backend(backend)
+        try:
+            from inkex import Path
+            if isinstance(subpath, Path):
+                subpath = list(subpath)
+        except (ImportError, NameError):
+            pass
+
+        contours = []
+        for contour in split_subpaths(subpath):
+            points = contour_points(contour, precision, debug=debug, backend=backend)
+            if points is not None:
+                contours.append(points)
+
+        if not contours:
+            return None
+
+        depths = contour_nesting(contours)
+        if debug:
+            print(f"Contours: {len(contours)}, nesting depths: {depths}")
+
+        jobs = [
+            (backend.name, points, offset_distance if depth % 2 == 0 else -offset_distance, precision, debug, fit_curves)
+            for points, depth in zip(contours, depths)
+        ]
+        results = [result for contour_results in offset_contours(jobs) for result in contour_results]
+
+        if not results:
+            return None
+
+        path_str = " ".join(path_str for path_str, _ in results)
+
         if debug:
             print(f"  Path string (first 100 chars): {path_str[:100]}...")
             print(f"=== END DEBUG ===\n")
@@ -665,10 +776,12 @@ def offset_path(subpath, offset_distance, precision=0.05, debug=False):
             from inkex import Path as InkexPath
             return InkexPath(path_str)
         except ImportError:
-            result = [('M', offset_points[0])]
-            for point in offset_points[1:]:
-                result.append(('L', point))
-            result.append(('Z', None))
+            result = []
+            for _, offset_points in results:
+                result.append(('M', offset_points[0]))
+                for point in offset_points[1:]:
+                    result.append(('L', point))
+                result.append(('Z', None))
             return result
 
     except Exception as e:
@@ -703,16 +816,18 @@ def offset_lpe(element, offset_distance, unit="mm"):
     return element
 
 
-def boolean_lpe(svg, element, operand_elements, operation="union"):
+def boolean_lpe(svg, element, operand_elements, operation="union", id_factory=None):
     if not operand_elements:
         return element
 
+    new_id = id_factory or svg.get_unique_id
+
     defs = svg.defs
     if defs is None:
         from lxml import etree
         defs = etree.SubElement(svg.getroot(), 'defs')
 
-    hidder_filter_id = "selectable_hidder_filter"
+    hidder_filter_id = HIDDER_FILTER_ID
     hidder_filter = svg.getElementById(hidder_filter_id)
     if hidder_filter is None:
         from lxml import etree
@@ -733,6 +848,7 @@ def boolean_lpe(svg, element, operand_elements, operation="union"):
             'in2': 'SourceGraphic',
             'in': 'BackgroundImage'
         })
+        svg.add_to_tree_callback(hidder_filter)
 
     lpe_refs = []
 
@@ -741,7 +857,7 @@ def boolean_lpe(svg, element, operand_elements, operation="union"):
         if not operand_id:
             continue
 
-        lpe_id = svg.get_unique_id('path-effect')
+        lpe_id = new_id('path-effect')
 
         from lxml import etree
         path_effect = etree.SubElement(defs, '{http://www.inkscape.org/namespaces/inkscape}path-effect', {
@@ -0,0 +1,550 @@
+#!/usr/bin/env python3
+
+import math
+
+import inkex
+
+from offset import offset_path, split_subpaths
+from boolean import path_boolean
+from placements import (
+    placements_along_path, placement_transform, path_locator, item_distances, placements_at,
+    optimize_item_offset, nudge_items, calculate_path_length, placed_path_data, translated_path_data,
+)
+from livinghinge import (
+    living_hinge_paths, hinge_placeholder_path, straight_segments_along, curvature_straight_regions,
+)
+from sdfoffset import sdf_offset_paths
+from skeleton import skeleton_for_path
+from pipeline import Stage, Pipeline
+from cache import StageCache
+from drc import run_drc
+from memory import track
+from geometry import get_backend, bezier_length
+
+
+DRAFT_PAIR_RATE = 60000
+
+
+def draft_point_limit(seconds):
+    return max(32, int(math.sqrt(max(seconds, 0.0) * DRAFT_PAIR_RATE)))
+
+
+def draft_outline(outline, max_points, tolerance=0.5, backend=None):
+    backend = get_backend(backend)
+    contours = []
+    for subpath in split_subpaths(list(outline.to_absolute())):
+        points = backend.flatten(subpath, tolerance)
+        closed = subpath[-1].letter.upper() == 'Z'
+        if closed and len(points) > 1 and points[0] == points[-1]:
+            points = points[:-1]
+        contours.append((points, closed))
+
+    simplified = contours
+    epsilon = tolerance
+    while sum(len(points) for points, _ in simplified) > max_points:
+        epsilon *= 2
+        simplified = [(backend.simplify(points, epsilon, closed), closed) for points, closed in contours]
+        simplified = [(points, closed) for points, closed in simplified if len(points) >= (3 if closed else 2)]
+        if not simplified:
+            return outline
+
+    return inkex.Path(" ".join(
+        "M " + " L ".join(f"{x},{y}" for x, y in points) + (" Z" if closed else "")
+        for points, closed in simplified
+    ))
+
+
+def outline_offsets(outline, shape, engine, distances, precision=0.05, backend=None, stats=None):
+    results = []
+    sdf_paths = None
+    skeleton = False
+    fallback = None
+
+    for distance in distances:
+        try:
+            if shape is not None:
+                inset_shape = shape.offset(distance)
+                results.append((inset_shape.path_data(), inset_shape, None))
+                continue
+
+            if engine == "sdf":
+                if sdf_paths is None:
+                    sdf_paths = sdf_offset_paths(outline, distances, precision, stats=stats)
+                path = sdf_paths[distances.index(distance)]
+            elif engine == "skeleton" and distance <= 0:
+                if skeleton is False:
+                    try:
+                        skeleton = skeleton_for_path(outline)
+                    except ValueError as e:
+                        skeleton = None
+                        fallback = str(e)
+                    if skeleton is None and fallback is None:
+                        fallback = "outline is not a single polygon"
+                if skeleton is not None:
+                    inset_d = skeleton.inset_path_data(-distance)
+                    path = inkex.Path(inset_d) if inset_d else None
+                else:
+                    with track("offset_path"):
+                        path = offset_path(outline, distance, precision, backend=backend)
+            else:
+                with track("offset_path"):
+                    path = offset_path(outline, distance, precision, backend=backend)
+        except ValueError as e:
+            results.append((None, None, e))
+            continue
+
+        results.append((path, None, None))
+
+    return results, fallback
+
+
+OPERATIONS = ("inner", "hinges", "outer", "guides")
+STYLE_OPERATIONS = {"inner": "inner", "outer": "outer", "meta": "guides"}
+
+
+def item(id_prefix, d, style, transform=None, operation=None):
+    return {
+        "id": id_prefix,
+        "d": d,
+        "style": style,
+        "transform": transform,
+        "operation": operation or STYLE_OPERATIONS[style],
+    }
+
+
+def offset_item(id_prefix, d, style, offset, bake=False, operation=None):
+    if bake:
+        return item(id_prefix, translated_path_data(d, *offset), style, operation=operation)
+    return item(id_prefix, d, style, inkex.Transform(translate=offset), operation)
+
+
+def inset_stage(params):
+    distances = [params["tab_inset"], params["top_hole_inset"]]
+    if params["generate_lid"]:
+        distances.append(params["lid_fitting_inset"])
+
+    stats = {}
+    offsets, fallback = outline_offsets(
+        params["outline"], params["outline_shape"], params["offset_engine"], distances, params["flatten_tolerance"],
+        params["geometry_backend"], stats,
+    )
+    inset_d, inset_shape, error = offsets[0]
+    if error is not None:
+        raise error
+    if inset_d is None:
+        raise ValueError("The tab inset collapsed the outline.")
+
+    if inset_shape is not None:
+        length = inset_shape.length()
+    else:
+        inset_csp = inkex.Path(inset_d).to_superpath()
+        length = sum(
+            bezier_length((seg[1], seg[2], next_seg[0], next_seg[1]))
+            for subpath in inset_csp
+            for i, seg in enumerate(subpath[:-1])
+            for next_seg in [subpath[i + 1]]
+        )
+
+    return {
+        "d": inset_d,
+        "shape": inset_shape,
+        "length": length,
+        "top_hole": offsets[1][0],
+        "lid_fitting": offsets[2][0] if len(offsets) > 2 else None,
+        "offset_fallback": fallback,
+        "offset_stats": stats,
+    }
+
+
+def path_source(inset):
+    return inset["shape"] if inset["shape"] is not None else inset["d"]
+
+
+def straights_stage(params, inset):
+    min_length = params["min_straight_length"]
+    shape = inset["shape"]
+    if shape is not None:
+        total_length = shape.length()
+    else:
+        total_length = calculate_path_length(inkex.Path(inset["d"]))
+
+    if params["bend_detection"] == "length":
+        if shape is not None:
+            intervals = shape.straight_segments(min_length)
+        else:
+            intervals = straight_segments_along(inset["d"], min_length)
+        bends = []
+    elif shape is not None:
+        intervals, bends = shape.straight_regions(min_length, params["bend_radius"])
+    else:
+        intervals, bends = curvature_straight_regions(
+            inset["d"], total_length, min_length, params["bend_radius"], params["flatten_tolerance"],
+            params["geometry_backend"],
+        )
+
+    return {"total_length": total_length, "intervals": intervals, "bends": bends}
+
+
+def tabs_stage(params, inset, straights):
+    tab_width = params["tab_width"] - params["kerf"]
+    tab_height = params["material_thickness"] - params["kerf"]
+    num_tabs = params["num_tabs"]
+    x = -tab_width / 2
+    y = -tab_height / 2
+
+    total_length, locate = path_locator(path_source(inset), params["geometry_backend"])
+    start_offset = params["tab_start_offset"]
+    if params["tab_placement"] == "optimized":
+        start_offset = optimize_item_offset(
+            total_length, straights["intervals"], num_tabs, tab_width, start_offset
+        )
+
+    distances = []
+    if num_tabs > 0:
+        distances = item_distances(total_length, num_tabs, tab_width, start_offset, "simple")
+        distances = nudge_items(total_length, straights["intervals"], distances, tab_width, params["max_tab_nudge"])
+
+    return {
+        "d": f"M {x},{y} L {x + tab_width},{y} L {x + tab_width},{y + tab_height} L {x},{y + tab_height} Z",
+        "placements": placements_at(locate, distances),
+        "distances": distances,
+    }
+
+
+def magnets_stage(params, inset):
+    magnet_type = params["magnet_type"]
+    if magnet_type == "none":
+        return {"d": None, "placements": []}
+
+    if magnet_type == "rectangle":
+        magnet_width = params["magnet_width"]
+        magnet_height = params["magnet_height"]
+        rect_x = -magnet_width / 2
+        rect_y = -magnet_height / 2
+        path_data = (
+            f"M {rect_x},{rect_y} "
+            f"L {rect_x + magnet_width},{rect_y} "
+            f"L {rect_x + magnet_width},{rect_y + magnet_height} "
+            f"L {rect_x},{rect_y + magnet_height} Z"
+        )
+        item_width = magnet_width
+    else:
+        radius = params["magnet_diameter"] / 2
+        path_data = (
+            f"M {radius},0 "
+            f"A {radius},{radius} 0 0 1 0,{radius} "
+            f"A {radius},{radius} 0 0 1 {-radius},0 "
+            f"A {radius},{radius} 0 0 1 0,{-radius} "
+            f"A {radius},{radius} 0 0 1 {radius},0 Z"
+        )
+        item_width = params["magnet_diameter"]
+
+    return {
+        "d": path_data,
+        "placements": placements_along_path(
+            path_source(inset), params["num_magnets"], item_width, params["magnet_placement_offset"], "even",
+            params["geometry_backend"],
+        ),
+    }
+
+
+def placed_items(pattern, id_prefix, style, bake=False):
+    if bake:
+        return [
+            item(id_prefix.format(index=i), d, style)
+            for i, d in enumerate(placed_path_data(pattern["d"], pattern["placements"]))
+        ]
+    return [
+        item(id_prefix.format(index=i), pattern["d"], style, placement_transform(placement))
+        for i, placement in enumerate(pattern["placements"])
+    ]
+
+
+def bottom_tabs_stage(params, inset, tabs):
+    return {
+        "group": "boxbot",
+        "label": ("bottom tabs", "bottom_tabs_label"),
+        "items": [item("inset_path", inset["d"], "meta")] + placed_items(tabs, "tab_{index}", "inner", params["bake_transforms"]),
+    }
+
+
+def bottom_stage(params, inset, tabs):
+    return {
+        "group": "bottom",
+        "label": ("bottom", "bottom_label"),
+        "items": [
+            item("bottom_path", params["outline_d"], "outer"),
+            item("bottom_inset", inset["d"], "meta"),
+        ] + placed_items(tabs, "bottom_tab_{index}", "meta", params["bake_transforms"]),
+    }
+
+
+def top_tabs_stage(params, inset, tabs, magnets):
+    items = [
+        item("top_tabs_original", params["outline_d"], "outer"),
+        item("top_tabs_inset", inset["d"], "meta"),
+    ] + placed_items(tabs, "top_tab", "inner", params["bake_transforms"])
+    if inset["top_hole"] is not None:
+        items.append(item("top_hole_inset", inset["top_hole"], "inner"))
+    items += placed_items(
+        magnets, "magnet_{index}", "outer" if params["hide_magnets"] else "meta", params["bake_transforms"]
+    )
+
+    return {"group": "top_tabs", "label": ("top tabs", "top_tabs_label"), "items": items}
+
+
+def top_stage(params, inset, tabs, magnets):
+    items = [
+        item("top_path", params["outline_d"], "outer"),
+        item("top_inset", inset["d"], "meta"),
+    ] + placed_items(tabs, "top_tab", "meta", params["bake_transforms"])
+    if inset["top_hole"] is not None:
+        items.append(item("top_hole_inset", inset["top_hole"], "inner"))
+    items += placed_items(
+        magnets, "top_magnet_{index}", "meta" if params["hide_magnets"] else "outer", params["bake_transforms"]
+    )
+
+    return {"group": "top", "label": ("top", "top_label"), "items": items}
+
+
+def side_tab_path(tab_x, tab_y, width, height, r):
+    return (
+        f"M {tab_x + r},{tab_y} "
+        f"L {tab_x + width - r},{tab_y} "
+        f"A {r},{r} 0 0 1 {tab_x + width},{tab_y + r} "
+        f"L {tab_x + width},{tab_y + height - r} "
+        f"A {r},{r} 0 0 1 {tab_x + width - r},{tab_y + height} "
+        f"L {tab_x + r},{tab_y + height} "
+        f"A {r},{r} 0 0 1 {tab_x},{tab_y + height - r} "
+        f"L {tab_x},{tab_y + r} "
+        f"A {r},{r} 0 0 1 {tab_x + r},{tab_y} "
+        f"Z"
+    )
+
+
+def hinge_regions_for(straights, side_start_offset, rect_width):
+    total_length = straights["total_length"]
+
+    adjusted_straight_segments = []
+    for seg_start, seg_end in straights["intervals"]:
+        start_pos = (seg_start - side_start_offset) % total_length
+        end_pos = (seg_end - side_start_offset) % total_length
+
+        if start_pos < end_pos:
+            adjusted_straight_segments.append((start_pos, end_pos))
+        else:
+            adjusted_straight_segments.append((start_pos, total_length))
+            adjusted_straight_segments.append((0, end_pos))
+
+    if not adjusted_straight_segments:
+        return [(0, rect_width)]
+
+    hinge_regions = []
+    current_pos = 0
+    for seg_start, seg_end in sorted(adjusted_straight_segments, key=lambda x: x[0]):
+        if current_pos < seg_start:
+            hinge_regions.append((current_pos, seg_start))
+        current_pos = seg_end
+
+    if current_pos < rect_width:
+        hinge_regions.append((current_pos, rect_width))
+
+    return hinge_regions
+
+
+def side_stage(params, inset, tabs, straights):
+    offset_x, offset_y = params["side_offset"]
+    bake = params["bake_transforms"]
+    tab_width = params["tab_width"]
+    tab_height = params["material_thickness"]
+    num_tabs = params["num_tabs"]
+
+    rect_width = inset["length"]
+    rect_height = params["box_height"] - 4 * tab_height
+    rect_path_data = f"M 0,0 L {rect_width},0 L {rect_width},{rect_height} L 0,{rect_height} Z"
+
+    total_tabs = num_tabs + 1
+    half_tab_width = tab_width / 2
+    full_tab_height = rect_height + 2 * tab_height
+    tab_y = -tab_height
+
+    total_length = straights["total_length"]
+    distances = tabs["distances"]
+    side_start_offset = distances[0] if distances else (params["tab_start_offset"] + tab_width / 2) % total_length
+    tab_offsets = [(distance - side_start_offset) % total_length * rect_width / total_length for distance in distances]
+
+    tab_paths = []
+    tab_positions = []
+    for i in range(total_tabs):
+        if i == 0:
+            current_tab_width = half_tab_width
+            tab_x = 0
+        elif i == total_tabs - 1:
+            current_tab_width = half_tab_width
+            tab_x = rect_width - half_tab_width
+        else:
+            current_tab_width = tab_width
+            tab_x = tab_offsets[i] - current_tab_width / 2
+
+        r = min(params["tab_border_radius"], current_tab_width / 2, full_tab_height / 2)
+        tab_positions.append((tab_x, tab_x + current_tab_width))
+        tab_paths.append(side_tab_path(tab_x, tab_y, current_tab_width, full_tab_height, r))
+
+    draft = params["quality"] == "draft"
+    if params["boolean_mode"] == "baked" and not draft:
+        side_rect = offset_item(
+            "side_rect",
+            path_boolean(
+                rect_path_data, " ".join(tab_paths), "union", precision=params["flatten_tolerance"],
+                backend=params["geometry_backend"],
+            ),
+            "outer",
+            (offset_x, offset_y),
+            bake,
+        )
+        items = [side_rect]
+        operands = []
+    else:
+        side_rect = offset_item("side_rect", rect_path_data, "outer", (offset_x, offset_y), bake)
+        tab_items = [offset_item("side_tab", tab_path, "meta", (offset_x, offset_y), bake) for tab_path in tab_paths]
+        items = [side_rect] + tab_items
+        operands = [] if draft else list(range(1, len(items)))
+
+    hinge_stats = {}
+    for i, (hinge_start, hinge_end) in enumerate(hinge_regions_for(straights, side_start_offset, rect_width)):
+        hinge_offset = (offset_x + hinge_start, offset_y)
+        if draft and params["generate_living_hinge"]:
+            placeholder = hinge_placeholder_path(hinge_end - hinge_start, rect_height, params["hinge_spacing"] * 4)
+            items.append(offset_item(f"hinge_rect_{i}", placeholder, "meta", hinge_offset, bake))
+            continue
+
+        hinge_rect_data = f"M {hinge_start},0 L {hinge_end},0 L {hinge_end},{rect_height} L {hinge_start},{rect_height} Z"
+        items.append(offset_item(f"hinge_rect_{i}", hinge_rect_data, "meta", (offset_x, offset_y), bake))
+
+        if params["generate_living_hinge"]:
+            hinge_paths = living_hinge_paths(
+                rect_height * (params["hinge_length_percent"] / 100.0),
+                params["hinge_gap"],
+                params["hinge_spacing"],
+                hinge_end - hinge_start,
+                rect_height,
+                tab_positions=tab_positions,
+                segment_start=hinge_start,
+                emission=params["hinge_emission"],
+                lead_in=params["hinge_lead_in"],
+                stats=hinge_stats,
+                clearance=params["hinge_tab_clearance"]
+            )
+            items += [
+                offset_item(id_prefix, d, "inner", hinge_offset, bake, "hinges") for id_prefix, d in hinge_paths
+            ]
+
+    return {
+        "group": "side",
+        "label": ("side", "side_label"),
+        "items": items,
+        "boolean": (0, operands),
+        "hinge_stats": hinge_stats,
+    }
+
+
+def lid_piece(name, label, magnet_style, params, inset, magnets):
+    items = [
+        item(f"{name}_path", params["outline_d"], "outer"),
+        item(f"{name}_inset", inset["d"], "meta"),
+    ] + placed_items(magnets, f"{name}_magnet_{{index}}", magnet_style, params["bake_transforms"])
+    return {"group": name, "label": (label, f"{name}_label"), "items": items}
+
+
+def lid_top_stage(params, inset, magnets):
+    return lid_piece("lid_top", "lid top", "meta", params, inset, magnets)
+
+
+def lid_middle_stage(params, inset, magnets):
+    magnet_style = "outer" if params["hide_magnets"] else "meta"
+    return lid_piece("lid_middle", "lid middle", magnet_style, params, inset, magnets)
+
+
+def lid_bottom_stage(params, inset, magnets):
+    magnet_style = "meta" if params["hide_magnets"] else "outer"
+    return lid_piece("lid_bottom", "lid bottom", magnet_style, params, inset, magnets)
+
+
+def lid_fitting_stage(params, inset):
+    if inset["lid_fitting"] is None:
+        return None
+    return {
+        "group": "lid_fitting",
+        "label": ("lid fitting", "lid_fitting_label"),
+        "items": [item("lid_fitting_path", inset["lid_fitting"], "outer")],
+    }
+
+
+PLACEMENT_OPTIONS = (
+    "num_tabs", "tab_width", "kerf", "material_thickness", "tab_start_offset", "tab_placement", "max_tab_nudge",
+    "geometry_backend",
+)
+MAGNET_OPTIONS = (
+    "magnet_type", "magnet_width", "magnet_height", "magnet_diameter", "num_magnets", "magnet_placement_offset",
+    "geometry_backend",
+)
+SIDE_OPTIONS = (
+    "side_offset", "tab_width", "material_thickness", "num_tabs", "box_height", "tab_border_radius",
+    "boolean_mode", "tab_start_offset", "generate_living_hinge",
+    "hinge_length_percent", "hinge_gap", "hinge_spacing", "hinge_emission", "hinge_lead_in",
+    "hinge_tab_clearance", "quality", "flatten_tolerance", "bake_transforms", "geometry_backend",
+)
+PIECE_OPTIONS = ("outline_d", "hide_magnets", "bake_transforms")
+
+BOX_STAGES = [
+    Stage("inset", inset_stage, options=(
+        "outline", "outline_shape", "offset_engine", "tab_inset", "top_hole_inset", "lid_fitting_inset", "generate_lid",
+        "flatten_tolerance", "geometry_backend",
+    )),
+    Stage("straights", straights_stage, inputs=("inset",), options=(
+        "min_straight_length", "bend_detection", "bend_radius", "flatten_tolerance", "geometry_backend",
+    )),
+    Stage("tabs", tabs_stage, inputs=("inset", "straights"), options=PLACEMENT_OPTIONS),
+    Stage("magnets", magnets_stage, inputs=("inset",), options=MAGNET_OPTIONS),
+    Stage("bottom_tabs", bottom_tabs_stage, inputs=("inset", "tabs"), options=("bake_transforms",)),
+    Stage("bottom", bottom_stage, inputs=("inset", "tabs"), options=("outline_d", "bake_transforms")),
+    Stage("top_tabs", top_tabs_stage, inputs=("inset", "tabs", "magnets"), options=PIECE_OPTIONS),
+    Stage("top", top_stage, inputs=("inset", "tabs", "magnets"), options=PIECE_OPTIONS),
+    Stage("side", side_stage, inputs=("inset", "tabs", "straights"), options=SIDE_OPTIONS),
+]
+
+LID_STAGES = [
+    Stage("lid_top", lid_top_stage, inputs=("inset", "magnets"), options=PIECE_OPTIONS, optional=True),
+    Stage("lid_middle", lid_middle_stage, inputs=("inset", "magnets"), options=PIECE_OPTIONS, optional=True),
+    Stage("lid_bottom", lid_bottom_stage, inputs=("inset", "magnets"), options=PIECE_OPTIONS, optional=True),
+    Stage("lid_fitting", lid_fitting_stage, inputs=("inset",), optional=True),
+]
+
+
+def drc_stage(params, inset, **pieces):
+    if not params["design_rules"]:
+        return None
+    return run_drc(pieces, inset, params)
+
+
+DRC_OPTIONS = (
+    "design_rules", "drc_min_web", "drc_min_feature", "drc_tolerance", "kerf",
+    "top_hole_inset", "lid_fitting_inset", "generate_lid",
+)
+BOX_PIECES = ("bottom_tabs", "bottom", "top_tabs", "top", "side")
+LID_PIECES = ("lid_top", "lid_middle", "lid_bottom", "lid_fitting")
+
+
+def box_pipeline(generate_lid=True):
+    stages = BOX_STAGES + (LID_STAGES if generate_lid else [])
+    pieces = BOX_PIECES + (LID_PIECES if generate_lid else ())
+    return Pipeline(stages + [Stage("drc", drc_stage, inputs=("inset",) + pieces, options=DRC_OPTIONS, optional=True)])
+
+
+def run_box_pipeline(job):
+    generate_lid, params, memo, workers, deadline, observer = job
+    pipeline = box_pipeline(generate_lid)
+    results = pipeline.run(params, memo, workers, deadline, observer)
+    if isinstance(memo, StageCache):
+        memo.flush()
+    return results, not pipeline.skipped
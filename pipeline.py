@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+import hashlib
+import pickle
+import time
+from concurrent.futures import BrokenExecutor
+
+
+POOL_ERRORS = (BrokenExecutor, pickle.PicklingError, OSError)
+
+
+def fingerprint(value):
+    if isinstance(value, dict):
+        return "{" + ",".join(f"{key!r}:{fingerprint(value[key])}" for key in sorted(value)) + "}"
+    if isinstance(value, (list, tuple)):
+        return type(value).__name__ + "[" + ",".join(fingerprint(item) for item in value) + "]"
+    if type(value).__repr__ is object.__repr__ and hasattr(value, "__dict__"):
+        return type(value).__name__ + fingerprint(vars(value))
+    return repr(value)
+
+
+class Stage:
+    def __init__(self, name, func, inputs=(), options=(), optional=False):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.options = tuple(options)
+        self.optional = optional
+
+
+def run_stage(job):
+    func, params, inputs = job
+    return func(params, **inputs)
+
+
+class Pipeline:
+    def __init__(self, stages):
+        self.stages = {stage.name: stage for stage in stages}
+        self.levels = self.schedule()
+        self.skipped = []
+        self.pool = None
+
+    def schedule(self):
+        levels = []
+        done = set()
+        pending = dict(self.stages)
+
+        while pending:
+            ready = [name for name, stage in pending.items() if all(name in done for name in stage.inputs)]
+            if not ready:
+                raise ValueError(f"Pipeline stages have missing or circular inputs: {', '.join(sorted(pending))}")
+            levels.append(ready)
+            done.update(ready)
+            for name in ready:
+                del pending[name]
+
+        return levels
+
+    def stage_key(self, stage, params, keys):
+        digest = hashlib.sha256(stage.name.encode())
+        for option in stage.options:
+            digest.update(f"{option}={fingerprint(params[option])};".encode())
+        for name in stage.inputs:
+            digest.update(f"{name}={keys[name]};".encode())
+        return digest.hexdigest()
+
+    def job(self, stage, params, results):
+        return (
+            stage.func,
+            {option: params[option] for option in stage.options},
+            {name: results[name] for name in stage.inputs},
+        )
+
+    def execute(self, jobs, stages=(), observer=None):
+        if observer is not None:
+            results = []
+            for stage, job in zip(stages, jobs):
+                with observer(stage.name):
+                    results.append(run_stage(job))
+            return results
+        if self.pool is not None and len(jobs) > 1:
+            try:
+                return list(self.pool.map(run_stage, jobs))
+            except POOL_ERRORS:
+                self.pool.shutdown(wait=False, cancel_futures=True)
+                self.pool = None
+        return [run_stage(job) for job in jobs]
+
+    def run(self, params, memo=None, workers=0, deadline=None, observer=None):
+        memo = {} if memo is None else memo
+        results = {}
+        keys = {}
+        self.pool = None
+        self.skipped = []
+
+        try:
+            for level in self.levels:
+                stale = []
+                for name in level:
+                    stage = self.stages[name]
+                    keys[name] = self.stage_key(stage, params, keys)
+                    if keys[name] in memo:
+                        results[name] = memo[keys[name]]
+                    elif stage.optional and deadline is not None and time.monotonic() > deadline:
+                        results[name] = None
+                        self.skipped.append(name)
+                    else:
+                        stale.append(stage)
+
+                if self.pool is None and observer is None and workers > 1 and len(stale) > 1:
+                    try:
+                        from concurrent.futures import ProcessPoolExecutor
+                        self.pool = ProcessPoolExecutor(max_workers=workers)
+                    except (ImportError, OSError, RuntimeError):
+                        pass
+                    workers = 0
+
+                jobs = [self.job(stage, params, results) for stage in stale]
+                for stage, output in zip(stale, self.execute(jobs, stale, observer)):
+                    results[stage.name] = output
+                    memo[keys[stage.name]] = output
+        finally:
+            if self.pool is not None:
+                self.pool.shutdown()
+                self.pool = None
+
+        return results
@@ -8,9 +8,17 @@ if deps_dir.exists() and str(deps_dir) not in sys.path:
     sys.path.insert(0, str(deps_dir))
 
 import math
+from bisect import bisect_right
 import inkex
 from inkex import PathElement, Rectangle, Transform
 
+from geometry import get_backend, bezier_point_tangent, bezier_length
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 
 def calculate_path_length(path):
     if isinstance(path, str):
@@ -23,7 +31,7 @@ def calculate_path_length(path):
         for i, seg in enumerate(subpath[:-1]):
             next_seg = subpath[i + 1]
             bezier = (seg[1], seg[2], next_seg[0], next_seg[1])
-            seg_length = inkex.bezier.bezierlength(bezier, tolerance=0.01)
+            seg_length = bezier_length(bezier)
             total_length += seg_length
 
     return total_length
@@ -40,40 +48,11 @@ def point_at_length(path, target_length):
         for i, seg in enumerate(subpath[:-1]):
             next_seg = subpath[i + 1]
             bezier = (seg[1], seg[2], next_seg[0], next_seg[1])
-            seg_length = inkex.bezier.bezierlength(bezier, tolerance=0.01)
+            seg_length = bezier_length(bezier)
 
             if current_length + seg_length >= target_length:
                 t = (target_length - current_length) / seg_length if seg_length > 0 else 0
-                t = max(0.0, min(1.0, t))
-
-                p0, p1, p2, p3 = bezier
-                p0_p1_dist = ((p1[0] - p0[0])**2 + (p1[1] - p0[1])**2)**0.5
-                p2_p3_dist = ((p3[0] - p2[0])**2 + (p3[1] - p2[1])**2)**0.5
-
-                if p0_p1_dist < 0.001 and p2_p3_dist < 0.001:
-                    point = (
-                        p0[0] + t * (p3[0] - p0[0]),
-                        p0[1] + t * (p3[1] - p0[1])
-                    )
-                else:
-                    point = inkex.bezier.bezierpointatt(bezier, t)
-
-                p0, p1, p2, p3 = bezier
-                one_minus_t = 1.0 - t
-
-                dx = (3 * one_minus_t * one_minus_t * (p1[0] - p0[0]) +
-                      6 * one_minus_t * t * (p2[0] - p1[0]) +
-                      3 * t * t * (p3[0] - p2[0]))
-                dy = (3 * one_minus_t * one_minus_t * (p1[1] - p0[1]) +
-                      6 * one_minus_t * t * (p2[1] - p1[1]) +
-                      3 * t * t * (p3[1] - p2[1]))
-
-                length = (dx * dx + dy * dy) ** 0.5
-                if length > 0:
-                    dx /= length
-                    dy /= length
-
-                return (point[0], point[1]), (dx, dy)
+                return bezier_point_tangent(bezier, max(0.0, min(1.0, t)))
 
             current_length += seg_length
 
@@ -82,68 +61,204 @@ def point_at_length(path, target_length):
     return (last_point[0], last_point[1]), (1.0, 0.0)
 
 
-def pattern_along_path(path, num_items, item_width, start_offset, spacing, create_shape_fn):
+def path_locator(path, backend=None):
+    if hasattr(path, "point_at_length"):
+        return path.length(), path.point_at_length
 
-    if isinstance(path, str):
-        path = inkex.Path(path)
+    index = get_backend(backend).length_index(path)
+    return index.total, index.locate
 
-    if num_items <= 0:
-        return []
 
-    total_length = calculate_path_length(path)
-    items = []
+def item_distances(total_length, num_items, item_width, start_offset, spacing):
+    distances = []
 
-    if spacing == "even":
+    if spacing in ("even", "simple"):
         gap = (total_length - num_items * item_width) / num_items
 
         for i in range(num_items):
             item_start = (start_offset + i * (gap + item_width)) % total_length
-            item_center = (item_start + item_width / 2) % total_length
+            distances.append((item_start + item_width / 2) % total_length)
 
-            point, tangent = point_at_length(path, item_center)
-            angle = math.degrees(math.atan2(tangent[1], tangent[0]))
+    elif spacing == "endpoints":
+        for i in range(num_items):
+            base_distance = total_length * i / (num_items - 1) if num_items > 1 else 0
+            distances.append((base_distance + start_offset) % total_length)
 
-            item = create_shape_fn(i)
+    return distances
 
-            transform = Transform()
-            transform.add_translate(point[0], point[1])
-            transform.add_rotate(angle)
 
-            item.transform = transform
-            items.append(item)
+def placements_at(locate, distances):
+    placements = []
+    for distance in distances:
+        point, tangent = locate(distance)
+        placements.append(((point[0], point[1]), math.degrees(math.atan2(tangent[1], tangent[0]))))
 
-    elif spacing == "endpoints":
-        for i in range(num_items):
-            base_distance = total_length * i / (num_items - 1) if num_items > 1 else 0
-            distance = (base_distance + start_offset) % total_length
-            point, tangent = point_at_length(path, distance)
-            angle = math.degrees(math.atan2(tangent[1], tangent[0]))
+    return placements
 
-            item = create_shape_fn(i)
 
-            transform = Transform()
-            transform.add_translate(point[0], point[1])
-            transform.add_rotate(angle)
+def placements_along_path(path, num_items, item_width, start_offset, spacing, backend=None):
+
+    if num_items <= 0:
+        return []
 
-            item.transform = transform
-            items.append(item)
+    total_length, locate = path_locator(path, backend)
+    return placements_at(locate, item_distances(total_length, num_items, item_width, start_offset, spacing))
 
-    elif spacing == "simple":
-        gap = (total_length - num_items * item_width) / num_items
 
-        for i in range(num_items):
-            item_start = (start_offset + i * (gap + item_width)) % total_length
-            distance = (item_start + item_width / 2) % total_length
-            point, tangent = point_at_length(path, distance)
-            angle = math.degrees(math.atan2(tangent[1], tangent[0]))
+def usable_intervals(intervals, item_width):
+    intervals = sorted((start, end) for start, end in intervals if end - start >= item_width)
+    return intervals, [start for start, _ in intervals]
 
-            item = create_shape_fn(i)
 
-            transform = Transform()
-            transform.add_translate(point[0], point[1])
-            transform.add_rotate(angle)
+def interval_clearance(intervals, starts, item_start, item_end):
+    k = bisect_right(starts, item_start) - 1
+    if k < 0:
+        return None
 
-            item.transform = transform
-            items.append(item)
+    start, end = intervals[k]
+    if item_end > end:
+        return None
+    return min(item_start - start, end - item_end)
 
-    return items
+
+def optimize_item_offset(total_length, intervals, num_items, item_width, preferred_offset=0.0,
+                         clearance=None, samples=2048):
+    if num_items <= 0 or total_length <= 0:
+        return preferred_offset
+
+    clearance = item_width if clearance is None else clearance
+    intervals, starts = usable_intervals(intervals, item_width)
+    if not intervals:
+        return preferred_offset
+
+    period = total_length / num_items
+    half_width = item_width / 2
+    best_score = None
+    best_offset = preferred_offset
+
+    for k in range(samples):
+        offset = (preferred_offset + period * k / samples) % total_length
+        inside = 0
+        total_clearance = 0.0
+
+        for i in range(num_items):
+            center = (offset + half_width + i * period) % total_length
+            item_clearance = interval_clearance(intervals, starts, center - half_width, center + half_width)
+            if item_clearance is not None:
+                inside += 1
+                total_clearance += min(item_clearance, clearance)
+
+        score = (inside, round(total_clearance, 9))
+        if best_score is None or score > best_score:
+            best_score = score
+            best_offset = offset
+
+    return best_offset
+
+
+def nudge_items(total_length, intervals, distances, item_width, max_nudge, clearance=None):
+    if max_nudge <= 0 or not distances:
+        return list(distances)
+
+    clearance = item_width if clearance is None else clearance
+    intervals, starts = usable_intervals(intervals, item_width)
+    half_width = item_width / 2
+    count = len(distances)
+    nudged = list(distances)
+
+    for i, center in enumerate(distances):
+        low = center - max_nudge
+        high = center + max_nudge
+        if count > 1:
+            gap_before = (center - nudged[i - 1]) % total_length
+            gap_after = (distances[(i + 1) % count] - center) % total_length
+            low = max(low, center - (gap_before - item_width))
+            high = min(high, center + (gap_after - item_width))
+        if low > high:
+            continue
+
+        current = interval_clearance(intervals, starts, center % total_length - half_width, center % total_length + half_width)
+        best_clearance = -1.0 if current is None else min(current, clearance)
+        best_center = center
+
+        for shift in (-total_length, 0.0, total_length):
+            k = max(0, bisect_right(starts, low - half_width - shift) - 1)
+            while k < len(intervals) and intervals[k][0] + shift <= high + half_width:
+                start, end = intervals[k][0] + shift, intervals[k][1] + shift
+                k += 1
+
+                lowest = max(low, start + half_width)
+                highest = min(high, end - half_width)
+                if lowest > highest:
+                    continue
+
+                reach = min(clearance, (end - start - item_width) / 2)
+                target = min(max(center, start + half_width + reach), end - half_width - reach)
+                target = min(max(target, lowest), highest)
+                target_clearance = min(target - half_width - start, end - target - half_width, clearance)
+
+                if target_clearance > best_clearance + 1e-9:
+                    best_clearance = target_clearance
+                    best_center = target
+
+        nudged[i] = best_center % total_length
+
+    return nudged
+
+
+def placement_transform(placement):
+    (x, y), angle = placement
+    transform = Transform()
+    transform.add_translate(x, y)
+    transform.add_rotate(angle)
+    return transform
+
+
+def placed_path_data(path_data, placements):
+    if not placements:
+        return []
+    if np is None:
+        return [str(inkex.Path(path_data).transform(placement_transform(placement))) for placement in placements]
+
+    commands = []
+    coords = []
+    for proxy in inkex.Path(path_data).to_non_shorthand().proxy_iterator():
+        letter = proxy.letter
+        args = proxy.args
+        if letter in 'HV':
+            letter = 'L'
+            args = tuple(proxy.end_point)
+        if letter == 'A':
+            commands.append((letter, args[:5], 1))
+            coords.append(args[5:])
+        elif letter in 'MLCQ' or letter == 'Z':
+            commands.append((letter, (), len(args) // 2))
+            coords += [args[k:k + 2] for k in range(0, len(args), 2)]
+        else:
+            return [str(inkex.Path(path_data).transform(placement_transform(placement))) for placement in placements]
+
+    points = np.array(coords, dtype=float).reshape(-1, 2)
+    origins = np.array([origin for origin, _ in placements], dtype=float)
+    angles = np.array([angle for _, angle in placements], dtype=float)
+    cos = np.cos(np.radians(angles))[:, None]
+    sin = np.sin(np.radians(angles))[:, None]
+    xs = (origins[:, :1] + points[:, 0] * cos - points[:, 1] * sin).tolist()
+    ys = (origins[:, 1:] + points[:, 0] * sin + points[:, 1] * cos).tolist()
+
+    baked = []
+    for placement_xs, placement_ys, angle in zip(xs, ys, angles.tolist()):
+        parts = []
+        k = 0
+        for letter, arc, count in commands:
+            values = [f"{placement_xs[k + n]},{placement_ys[k + n]}" for n in range(count)]
+            if arc:
+                rx, ry, rotation, large_arc, sweep = arc
+                values.insert(0, f"{rx},{ry} {rotation + angle} {int(large_arc)} {int(sweep)}")
+            parts.append(" ".join([letter] + values))
+            k += count
+        baked.append(" ".join(parts))
+    return baked
+
+
+def translated_path_data(path_data, offset_x, offset_y):
+    return placed_path_data(path_data, [((offset_x, offset_y), 0.0)])[0]
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+
+import sys
+from pathlib import Path
+
+deps_dir = Path(__file__).parent / "deps"
+if deps_dir.exists() and str(deps_dir) not in sys.path:
+    sys.path.insert(0, str(deps_dir))
+
+import math
+import inkex
+
+from livinghinge import straight_regions
+
+
+def arc_point(center, radius, angle):
+    return (center[0] + radius * math.cos(angle), center[1] + radius * math.sin(angle))
+
+
+def piece_length(piece):
+    if piece[0] == 'L':
+        _, p0, p1 = piece
+        return math.hypot(p1[0] - p0[0], p1[1] - p0[1])
+    _, center, radius, a0, a1 = piece
+    return abs(a1 - a0) * radius
+
+
+def pieces_length(pieces):
+    return sum(piece_length(piece) for piece in pieces)
+
+
+def pieces_point_at_length(pieces, target_length):
+    current_length = 0.0
+
+    for piece in pieces:
+        seg_length = piece_length(piece)
+
+        if current_length + seg_length >= target_length and seg_length > 0:
+            s = max(0.0, target_length - current_length)
+
+            if piece[0] == 'L':
+                _, p0, p1 = piece
+                t = s / seg_length
+                point = (p0[0] + t * (p1[0] - p0[0]), p0[1] + t * (p1[1] - p0[1]))
+                tangent = ((p1[0] - p0[0]) / seg_length, (p1[1] - p0[1]) / seg_length)
+                return point, tangent
+
+            _, center, radius, a0, a1 = piece
+            direction = 1.0 if a1 > a0 else -1.0
+            angle = a0 + direction * s / radius
+            point = arc_point(center, radius, angle)
+            tangent = (-math.sin(angle) * direction, math.cos(angle) * direction)
+            return point, tangent
+
+        current_length += seg_length
+
+    last = pieces[-1]
+    if last[0] == 'L':
+        return last[2], (1.0, 0.0)
+    return arc_point(last[1], last[2], last[4]), (1.0, 0.0)
+
+
+def pieces_straight_segments(pieces, min_length):
+    straight_segments = []
+    current_distance = 0.0
+
+    for piece in pieces:
+        seg_length = piece_length(piece)
+        if piece[0] == 'L' and seg_length >= min_length:
+            straight_segments.append((current_distance, current_distance + seg_length))
+        current_distance += seg_length
+
+    return straight_segments
+
+
+def pieces_straight_regions(pieces, min_length, bend_radius):
+    runs = []
+    current_distance = 0.0
+    for piece in pieces:
+        seg_length = piece_length(piece)
+        radius = math.inf if piece[0] == 'L' else piece[2]
+        straight = radius >= bend_radius
+        if runs and runs[-1][2] == straight:
+            start, _, _, run_radius = runs[-1]
+            runs[-1] = (start, current_distance + seg_length, straight, min(run_radius, radius))
+        else:
+            runs.append((current_distance, current_distance + seg_length, straight, radius))
+        current_distance += seg_length
+
+    return straight_regions(runs, min_length)
+
+
+def pieces_to_path_data(pieces):
+    if not pieces:
+        return ""
+
+    first = pieces[0]
+    start = first[1] if first[0] == 'L' else arc_point(first[1], first[2], first[3])
+    path_data = f"M {start[0]},{start[1]}"
+
+    for piece in pieces:
+        if piece[0] == 'L':
+            end = piece[2]
+            path_data += f" L {end[0]},{end[1]}"
+            continue
+
+        _, center, radius, a0, a1 = piece
+        sweep = 1 if a1 > a0 else 0
+        steps = max(1, int(math.ceil(abs(a1 - a0) / math.pi - 1e-9)))
+        for i in range(1, steps + 1):
+            end = arc_point(center, radius, a0 + (a1 - a0) * i / steps)
+            path_data += f" A {radius},{radius} 0 0 {sweep} {end[0]},{end[1]}"
+
+    return path_data + " Z"
+
+
+class RoundedRect:
+    def __init__(self, left, top, width, height, radius=0.0):
+        self.left = left
+        self.top = top
+        self.width = width
+        self.height = height
+        self.radius = min(max(radius, 0.0), width / 2, height / 2)
+
+    def offset(self, distance):
+        width = self.width + 2 * distance
+        height = self.height + 2 * distance
+        if width <= 0 or height <= 0:
+            raise ValueError("Offset collapses the rectangle.")
+
+        radius = max(self.radius + distance, 0.0) if self.radius > 0 else 0.0
+        return RoundedRect(self.left - distance, self.top - distance, width, height, radius)
+
+    def pieces(self):
+        r = self.radius
+        left, top = self.left, self.top
+        right, bottom = left + self.width, top + self.height
+        half_pi = math.pi / 2
+
+        pieces = [
+            ('L', (left + r, top), (right - r, top)),
+            ('A', (right - r, top + r), r, -half_pi, 0.0),
+            ('L', (right, top + r), (right, bottom - r)),
+            ('A', (right - r, bottom - r), r, 0.0, half_pi),
+            ('L', (right - r, bottom), (left + r, bottom)),
+            ('A', (left + r, bottom - r), r, half_pi, math.pi),
+            ('L', (left, bottom - r), (left, top + r)),
+            ('A', (left + r, top + r), r, math.pi, 3 * half_pi),
+        ]
+        return [piece for piece in pieces if piece_length(piece) > 0]
+
+    def length(self):
+        return pieces_length(self.pieces())
+
+    def point_at_length(self, target_length):
+        return pieces_point_at_length(self.pieces(), target_length)
+
+    def straight_segments(self, min_length):
+        return pieces_straight_segments(self.pieces(), min_length)
+
+    def straight_regions(self, min_length, bend_radius):
+        return pieces_straight_regions(self.pieces(), min_length, bend_radius)
+
+    def path_data(self):
+        return pieces_to_path_data(self.pieces())
+
+
+class Circle:
+    def __init__(self, cx, cy, radius):
+        self.cx = cx
+        self.cy = cy
+        self.radius = radius
+
+    def offset(self, distance):
+        radius = self.radius + distance
+        if radius <= 0:
+            raise ValueError("Offset collapses the circle.")
+        return Circle(self.cx, self.cy, radius)
+
+    def pieces(self):
+        return [('A', (self.cx, self.cy), self.radius, -math.pi / 2, -5 * math.pi / 2)]
+
+    def length(self):
+        return 2 * math.pi * self.radius
+
+    def point_at_length(self, target_length):
+        return pieces_point_at_length(self.pieces(), target_length)
+
+    def straight_segments(self, min_length):
+        return []
+
+    def straight_regions(self, min_length, bend_radius):
+        return pieces_straight_regions(self.pieces(), min_length, bend_radius)
+
+    def path_data(self):
+        return pieces_to_path_data(self.pieces())
+
+
+def detect_primitive(element, transform):
+    matrix = inkex.Transform(transform)
+    a, b, c, d = matrix.a, matrix.b, matrix.c, matrix.d
+    scale = math.sqrt(abs(a * d - b * c))
+    similarity = abs(a - d) < 1e-9 and abs(b + c) < 1e-9 and a * d - b * c > 0
+
+    if isinstance(element, (inkex.Circle, inkex.Ellipse)):
+        rx, ry = element.rxry()
+        if not similarity or abs(rx - ry) > 1e-9 or rx <= 0:
+            return None
+        center = matrix.apply_to_point(element.center)
+        return Circle(center.x, center.y, rx * scale)
+
+    if isinstance(element, inkex.Rectangle):
+        if not similarity or abs(b) > 1e-9 or a <= 0:
+            return None
+        if element.width <= 0 or element.height <= 0:
+            return None
+
+        rx = element.rx if element.rx > 0 else element.ry
+        ry = element.ry if element.ry > 0 else element.rx
+        rx = min(rx, element.width / 2)
+        ry = min(ry, element.height / 2)
+        if abs(rx - ry) > 1e-9:
+            return None
+
+        corner = matrix.apply_to_point((element.left, element.top))
+        return RoundedRect(corner.x, corner.y, element.width * scale, element.height * scale, rx * scale)
+
+    return None
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+
+import math
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from offset import split_subpaths, contour_points, simplify_closed_path, calculate_polygon_winding
+from curvefit import fit_closed_polyline, segments_to_path_data
+
+
+def polygon_edges(contours):
+    starts = []
+    ends = []
+    for points in contours:
+        for i, point in enumerate(points):
+            starts.append(point)
+            ends.append(points[(i + 1) % len(points)])
+    return np.array(starts, dtype=float), np.array(ends, dtype=float)
+
+
+def inside_mask(starts, ends, x0, y0, cell, shape):
+    rows, cols = shape
+    ymin = np.minimum(starts[:, 1], ends[:, 1])
+    ymax = np.maximum(starts[:, 1], ends[:, 1])
+
+    i_start = np.clip(np.ceil((ymin - y0) / cell), 0, rows).astype(int)
+    i_end = np.clip(np.ceil((ymax - y0) / cell), 0, rows).astype(int)
+    counts = np.maximum(i_end - i_start, 0)
+
+    crossings = np.zeros((rows, cols + 1), dtype=np.int32)
+    total = int(counts.sum())
+    if total:
+        edge_index = np.repeat(np.arange(len(starts)), counts)
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        row_index = i_start[edge_index] + offsets
+
+        a = starts[edge_index]
+        b = ends[edge_index]
+        y = y0 + row_index * cell
+        x = a[:, 0] + (y - a[:, 1]) * (b[:, 0] - a[:, 0]) / (b[:, 1] - a[:, 1])
+        col_index = np.clip(np.ceil((x - x0) / cell), 0, cols).astype(int)
+        np.add.at(crossings, (row_index, col_index), 1)
+
+    return (np.cumsum(crossings, axis=1)[:, :cols] % 2) == 1
+
+
+def boundary_samples(starts, ends, spacing):
+    lengths = np.hypot(ends[:, 0] - starts[:, 0], ends[:, 1] - starts[:, 1])
+    counts = np.maximum(np.ceil(lengths / spacing).astype(int), 1)
+
+    edge_index = np.repeat(np.arange(len(starts)), counts)
+    steps = np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts)
+    t = (steps / counts[edge_index])[:, np.newaxis]
+    return starts[edge_index] + t * (ends[edge_index] - starts[edge_index])
+
+
+def seed_nearest(samples, x0, y0, cell, shape):
+    rows, cols = shape
+    field = np.full(shape, np.inf)
+    near_x = np.zeros(shape)
+    near_y = np.zeros(shape)
+    flat_field = field.reshape(-1)
+
+    base_j = np.floor((samples[:, 0] - x0) / cell).astype(int)
+    base_i = np.floor((samples[:, 1] - y0) / cell).astype(int)
+    neighbours = [(di, dj) for di in (-1, 0, 1, 2) for dj in (-1, 0, 1, 2)]
+
+    def node_distances(di, dj):
+        node_i = base_i + di
+        node_j = base_j + dj
+        valid = (node_i >= 0) & (node_i < rows) & (node_j >= 0) & (node_j < cols)
+        node_i = node_i[valid]
+        node_j = node_j[valid]
+        dist = np.hypot(x0 + node_j * cell - samples[valid, 0], y0 + node_i * cell - samples[valid, 1])
+        return node_i * cols + node_j, dist, valid
+
+    for di, dj in neighbours:
+        node, dist, _ = node_distances(di, dj)
+        np.minimum.at(flat_field, node, dist)
+
+    for di, dj in neighbours:
+        node, dist, valid = node_distances(di, dj)
+        nearest = dist == flat_field[node]
+        near_x.reshape(-1)[node[nearest]] = samples[valid, 0][nearest]
+        near_y.reshape(-1)[node[nearest]] = samples[valid, 1][nearest]
+    return field, near_x, near_y
+
+
+def relax(field, near_x, near_y, grid_x, grid_y, target, source):
+    candidate_x = near_x[source]
+    candidate_y = near_y[source]
+    dist = np.hypot(grid_x[target] - candidate_x, grid_y[target] - candidate_y)
+    better = dist < field[target]
+    if better.any():
+        field[target] = np.where(better, dist, field[target])
+        near_x[target] = np.where(better, candidate_x, near_x[target])
+        near_y[target] = np.where(better, candidate_y, near_y[target])
+
+
+def propagate_distance(field, near_x, near_y, x0, y0, cell, passes=1):
+    rows, cols = field.shape
+    grid_x, grid_y = np.meshgrid(x0 + np.arange(cols) * cell, y0 + np.arange(rows) * cell)
+    whole = slice(None)
+    head = slice(None, -1)
+    tail = slice(1, None)
+
+    for _ in range(passes):
+        for i_range, step in ((range(1, rows), -1), (range(rows - 2, -1, -1), 1)):
+            for i in i_range:
+                relax(field, near_x, near_y, grid_x, grid_y, (i, whole), (i + step, whole))
+                relax(field, near_x, near_y, grid_x, grid_y, (i, tail), (i + step, head))
+                relax(field, near_x, near_y, grid_x, grid_y, (i, head), (i + step, tail))
+
+        for j_range, step in ((range(1, cols), -1), (range(cols - 2, -1, -1), 1)):
+            for j in j_range:
+                relax(field, near_x, near_y, grid_x, grid_y, (whole, j), (whole, j + step))
+                relax(field, near_x, near_y, grid_x, grid_y, (tail, j), (head, j + step))
+                relax(field, near_x, near_y, grid_x, grid_y, (head, j), (tail, j + step))
+
+    return field
+
+
+def signed_distance_field(contours, precision=0.05, max_distance=0.0, max_cells=2000000):
+    if np is None:
+        raise ValueError("The SDF offset engine requires NumPy.")
+
+    all_points = [point for points in contours for point in points]
+    xs = [p[0] for p in all_points]
+    ys = [p[1] for p in all_points]
+
+    margin = abs(max_distance) + 4 * precision
+    width = max(xs) - min(xs) + 2 * margin
+    height = max(ys) - min(ys) + 2 * margin
+
+    cell = 2 * precision
+    if (width / cell) * (height / cell) > max_cells:
+        cell = math.sqrt(width * height / max_cells)
+    margin += 2 * cell
+
+    x0 = min(xs) - margin
+    y0 = min(ys) - margin
+    shape = (int(math.ceil((height + 4 * cell) / cell)) + 1, int(math.ceil((width + 4 * cell) / cell)) + 1)
+
+    starts, ends = polygon_edges(contours)
+    samples = boundary_samples(starts, ends, cell / 2)
+    field, near_x, near_y = seed_nearest(samples, x0, y0, cell, shape)
+    distance = propagate_distance(field, near_x, near_y, x0, y0, cell)
+    inside = inside_mask(starts, ends, x0, y0, cell, shape)
+
+    field = np.where(inside, -distance, distance)
+    return field, x0, y0, cell
+
+
+MARCHING_SQUARES_EDGES = {
+    1: ((3, 0),), 2: ((0, 1),), 3: ((3, 1),), 4: ((1, 2),),
+    5: ((3, 0), (1, 2)), 6: ((0, 2),), 7: ((3, 2),), 8: ((2, 3),),
+    9: ((2, 0),), 10: ((0, 1), (2, 3)), 11: ((2, 1),), 12: ((1, 3),),
+    13: ((1, 0),), 14: ((0, 3),),
+}
+
+
+def marching_squares(field, level, x0, y0, cell):
+    values = field - level
+    v00 = values[:-1, :-1]
+    v01 = values[:-1, 1:]
+    v11 = values[1:, 1:]
+    v10 = values[1:, :-1]
+
+    cases = ((v00 < 0) * 1 + (v01 < 0) * 2 + (v11 < 0) * 4 + (v10 < 0) * 8).astype(int)
+    rows, cols = np.nonzero((cases > 0) & (cases < 15))
+
+    def edge_key(i, j, edge):
+        if edge == 0:
+            return ('h', i, j)
+        if edge == 1:
+            return ('v', i, j + 1)
+        if edge == 2:
+            return ('h', i + 1, j)
+        return ('v', i, j)
+
+    def edge_point(key):
+        kind, i, j = key
+        if kind == 'h':
+            a = values[i, j]
+            b = values[i, j + 1]
+            t = a / (a - b)
+            return (x0 + (j + t) * cell, y0 + i * cell)
+        a = values[i, j]
+        b = values[i + 1, j]
+        t = a / (a - b)
+        return (x0 + j * cell, y0 + (i + t) * cell)
+
+    links = {}
+    for i, j in zip(rows.tolist(), cols.tolist()):
+        case = int(cases[i, j])
+        if case in (5, 10):
+            center = (v00[i, j] + v01[i, j] + v11[i, j] + v10[i, j]) / 4
+            if case == 5:
+                pairs = ((3, 2), (1, 0)) if center < 0 else MARCHING_SQUARES_EDGES[5]
+            else:
+                pairs = ((0, 3), (2, 1)) if center < 0 else MARCHING_SQUARES_EDGES[10]
+        else:
+            pairs = MARCHING_SQUARES_EDGES[case]
+
+        for start_edge, end_edge in pairs:
+            links[edge_key(i, j, start_edge)] = edge_key(i, j, end_edge)
+
+    loops = []
+    while links:
+        start, current = links.popitem()
+        loop = [edge_point(start)]
+        while current != start and current in links:
+            loop.append(edge_point(current))
+            current = links.pop(current)
+        if len(loop) >= 3:
+            loops.append(loop)
+
+    return loops
+
+
+def polygon_area(points):
+    area = 0.0
+    for i, (x1, y1) in enumerate(points):
+        x2, y2 = points[(i + 1) % len(points)]
+        area += x1 * y2 - x2 * y1
+    return area / 2
+
+
+def extract_offset(field, x0, y0, cell, offset_distance, precision, reference, fit_curves):
+    loops = marching_squares(field, offset_distance, x0, y0, cell)
+    loops = [loop for loop in loops if abs(polygon_area(loop)) > 4 * cell * cell]
+    if not loops:
+        return None
+
+    reference_start, reference_winding = reference
+    loops.sort(key=lambda loop: abs(polygon_area(loop)), reverse=True)
+    if calculate_polygon_winding(loops[0]) != reference_winding:
+        for loop in loops:
+            loop.reverse()
+
+    path_parts = []
+    for index, loop in enumerate(loops):
+        if index == 0:
+            nearest = min(
+                range(len(loop)),
+                key=lambda k: (loop[k][0] - reference_start[0]) ** 2 + (loop[k][1] - reference_start[1]) ** 2
+            )
+            loop = loop[nearest:] + loop[:nearest]
+
+        if fit_curves:
+            start, segments = fit_closed_polyline(loop, precision)
+            path_parts.append(segments_to_path_data(start, segments))
+        else:
+            simplified = simplify_closed_path(loop, epsilon=precision)
+            path_data = f"M {simplified[0][0]},{simplified[0][1]}"
+            for point in simplified[1:]:
+                path_data += f" L {point[0]},{point[1]}"
+            path_parts.append(path_data + " Z")
+
+    return " ".join(path_parts)
+
+
+def sdf_offset_paths(subpath, offset_distances, precision=0.05, debug=False, fit_curves=True, stats=None):
+    try:
+        from inkex import Path
+        if isinstance(subpath, Path):
+            subpath = list(subpath)
+    except ImportError:
+        Path = None
+
+    contours = []
+    for contour in split_subpaths(subpath):
+        points = contour_points(contour, precision)
+        if points is not None:
+            contours.append(points)
+
+    if not contours:
+        return [None for _ in offset_distances]
+
+    field, x0, y0, cell = signed_distance_field(
+        contours, precision, max(abs(distance) for distance in offset_distances)
+    )
+    if debug:
+        print(f"SDF grid {field.shape[1]}x{field.shape[0]} at cell size {cell:.4f}")
+    if stats is not None and cell > 2 * precision:
+        stats["sdf_cell"] = cell
+        stats["sdf_requested_cell"] = 2 * precision
+
+    reference = (contours[0][0], calculate_polygon_winding(contours[0]))
+    results = []
+    for offset_distance in offset_distances:
+        path_str = extract_offset(field, x0, y0, cell, offset_distance, precision, reference, fit_curves)
+        if path_str is not None and Path is not None:
+            results.append(Path(path_str))
+        else:
+            results.append(path_str)
+
+    return results
+
+
+def sdf_offset_path(subpath, offset_distance, precision=0.05, debug=False, fit_curves=True):
+    return sdf_offset_paths(subpath, [offset_distance], precision, debug, fit_curves)[0]
@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+
+import heapq
+import itertools
+import math
+from bisect import bisect_right
+
+from offset import split_subpaths, subpath_to_points
+
+
+EPSILON = 1e-9
+MAX_VERTICES = 500
+
+
+def signed_area(points):
+    area = 0.0
+    for i, (x1, y1) in enumerate(points):
+        x2, y2 = points[(i + 1) % len(points)]
+        area += x1 * y2 - x2 * y1
+    return area / 2
+
+
+def unit(dx, dy):
+    length = math.hypot(dx, dy)
+    if length < EPSILON:
+        return None
+    return (dx / length, dy / length)
+
+
+def bisector_velocity(in_dir, out_dir):
+    n1 = (-in_dir[1], in_dir[0])
+    n2 = (-out_dir[1], out_dir[0])
+    denom = 1 + n1[0] * n2[0] + n1[1] * n2[1]
+    if denom < EPSILON:
+        return None
+    return ((n1[0] + n2[0]) / denom, (n1[1] + n2[1]) / denom)
+
+
+class Vertex:
+    __slots__ = (
+        "x", "y", "vx", "vy", "in_dir", "out_dir", "prev", "next", "alive", "loop", "birth", "death",
+        "link_times", "links",
+    )
+
+    def __init__(self, x, y, in_dir, out_dir, loop, birth=0.0):
+        velocity = bisector_velocity(in_dir, out_dir)
+        self.x = x
+        self.y = y
+        self.vx, self.vy = velocity if velocity is not None else (None, None)
+        self.in_dir = in_dir
+        self.out_dir = out_dir
+        self.prev = None
+        self.next = None
+        self.alive = True
+        self.loop = loop
+        self.birth = birth
+        self.death = math.inf
+        self.link_times = []
+        self.links = []
+
+    def at(self, time):
+        if self.vx is None:
+            return self.x, self.y
+        dt = time - self.birth
+        return self.x + self.vx * dt, self.y + self.vy * dt
+
+    def next_at(self, time):
+        return self.links[bisect_right(self.link_times, time) - 1]
+
+
+def is_spike(vertex):
+    return vertex.vx is None
+
+
+def is_reflex(vertex):
+    in_dir, out_dir = vertex.in_dir, vertex.out_dir
+    return in_dir[0] * out_dir[1] - in_dir[1] * out_dir[0] < -EPSILON
+
+
+def edge_event_time(a, b, time):
+    direction = a.out_dir
+    (ax, ay), (bx, by) = a.at(time), b.at(time)
+    length = (bx - ax) * direction[0] + (by - ay) * direction[1]
+    rate = (b.vx - a.vx) * direction[0] + (b.vy - a.vy) * direction[1]
+    if rate >= -EPSILON:
+        return None
+    return max(0.0, -length / rate)
+
+
+def split_event_time(vertex, a, b, time):
+    direction = a.out_dir
+    normal = (-direction[1], direction[0])
+    (vx, vy), (ax, ay) = vertex.at(time), a.at(time)
+    gap = (vx - ax) * normal[0] + (vy - ay) * normal[1]
+    closing = 1 - (vertex.vx * normal[0] + vertex.vy * normal[1])
+    if gap <= EPSILON or closing <= EPSILON:
+        return None
+
+    t = gap / closing
+    hit = vertex.at(time + t)
+    start = a.at(time + t)
+    end = b.at(time + t)
+    span = (end[0] - start[0]) * direction[0] + (end[1] - start[1]) * direction[1]
+    along = (hit[0] - start[0]) * direction[0] + (hit[1] - start[1]) * direction[1]
+    tolerance = 1e-7 * max(1.0, span)
+    if span <= EPSILON or along < -tolerance or along > span + tolerance:
+        return None
+    return t
+
+
+def loop_vertices(vertex):
+    vertices = [vertex]
+    cursor = vertex.next
+    while cursor is not vertex:
+        vertices.append(cursor)
+        cursor = cursor.next
+    return vertices
+
+
+EDGE_EVENT = 0
+SPLIT_EVENT = 1
+
+
+class Wavefront:
+    def __init__(self, points):
+        self.live = {}
+        self.vertices = []
+        self.queue = []
+        self.sequence = itertools.count()
+        self.loops = itertools.count(1)
+        self.current = 0.0
+
+        n = len(points)
+        vertices = []
+        for i in range(n):
+            prev_point = points[i - 1]
+            point = points[i]
+            next_point = points[(i + 1) % n]
+            in_dir = unit(point[0] - prev_point[0], point[1] - prev_point[1])
+            out_dir = unit(next_point[0] - point[0], next_point[1] - point[1])
+            if in_dir is None or out_dir is None:
+                raise ValueError("Outline has a degenerate vertex.")
+            vertices.append(self.add(point, in_dir, out_dir, 0))
+
+        for a, b in zip(vertices, vertices[1:] + vertices[:1]):
+            self.link(a, b)
+
+        self.schedule(self.settle(vertices))
+
+    def add(self, point, in_dir, out_dir, loop):
+        vertex = Vertex(point[0], point[1], in_dir, out_dir, loop, self.current)
+        self.live[vertex] = None
+        self.vertices.append(vertex)
+        return vertex
+
+    def kill(self, vertex):
+        if vertex.alive:
+            vertex.death = self.current
+        vertex.alive = False
+        self.live.pop(vertex, None)
+
+    def link(self, a, b):
+        a.next = b
+        b.prev = a
+        a.link_times.append(self.current)
+        a.links.append(b)
+
+    def replace(self, old, new):
+        self.link(old.prev, new)
+        self.link(new, old.next)
+        self.kill(old)
+
+    def merge(self, a, b):
+        (ax, ay), (bx, by) = a.at(self.current), b.at(self.current)
+        merged = self.add(((ax + bx) / 2, (ay + by) / 2), a.in_dir, b.out_dir, a.loop)
+        self.link(a.prev, merged)
+        self.link(merged, b.next)
+        self.kill(a)
+        self.kill(b)
+        return merged
+
+    def settle(self, touched):
+        pending = list(touched)
+        touched = list(touched)
+        while pending:
+            vertex = pending.pop()
+            if not vertex.alive:
+                continue
+
+            third = vertex.next.next
+            if vertex.next is vertex or third is vertex or (third.next is vertex and is_spike(vertex)):
+                for dead in loop_vertices(vertex):
+                    self.kill(dead)
+                continue
+
+            for a, b in ((vertex, vertex.next), (vertex.prev, vertex)):
+                if math.dist(a.at(self.current), b.at(self.current)) < 1e-7:
+                    pending.append(self.merge(a, b))
+                    touched.append(pending[-1])
+                    break
+            else:
+                if not is_spike(vertex):
+                    continue
+                prev_vertex = vertex.prev
+                next_vertex = vertex.next
+                self.link(prev_vertex, next_vertex)
+                self.kill(vertex)
+                prev_point = prev_vertex.at(self.current)
+                next_point = next_vertex.at(self.current)
+                direction = unit(next_point[0] - prev_point[0], next_point[1] - prev_point[1])
+                if direction is not None:
+                    new_prev = self.add(prev_point, prev_vertex.in_dir, direction, vertex.loop)
+                    self.replace(prev_vertex, new_prev)
+                    new_next = self.add(next_point, direction, next_vertex.out_dir, vertex.loop)
+                    self.replace(next_vertex, new_next)
+                    prev_vertex, next_vertex = new_prev, new_next
+                pending += [prev_vertex, next_vertex]
+                touched += [prev_vertex, next_vertex]
+
+        survivors = []
+        checked = set()
+        for vertex in touched:
+            if not vertex.alive or vertex in checked:
+                continue
+            loop = loop_vertices(vertex)
+            checked.update(loop)
+            if len(loop) < 3 or abs(signed_area([v.at(self.current) for v in loop])) < 1e-9:
+                for dead in loop:
+                    self.kill(dead)
+            else:
+                members = set(loop)
+                survivors.append((loop, list(dict.fromkeys(v for v in touched if v in members))))
+        return survivors
+
+    def push(self, t, kind, vertex, a, b):
+        if t is not None:
+            heapq.heappush(self.queue, (self.current + t, kind, next(self.sequence), vertex, a, b))
+
+    def schedule(self, survivors):
+        for loop, touched in survivors:
+            reflex = [vertex for vertex in loop if is_reflex(vertex)]
+            edges = {}
+            for vertex in touched:
+                edges.update(dict.fromkeys(((vertex.prev, vertex), (vertex, vertex.next))))
+                if is_reflex(vertex):
+                    for a in loop:
+                        if a is not vertex and a.next is not vertex:
+                            self.push(split_event_time(vertex, a, a.next, self.current), SPLIT_EVENT, vertex, a, a.next)
+
+            touched = set(touched)
+            others = [vertex for vertex in reflex if vertex not in touched]
+            for a, b in edges:
+                self.push(edge_event_time(a, b, self.current), EDGE_EVENT, None, a, b)
+                for vertex in others:
+                    if vertex is not a and vertex is not b:
+                        self.push(split_event_time(vertex, a, b, self.current), SPLIT_EVENT, vertex, a, b)
+
+    def pop(self):
+        while self.queue:
+            time, kind, _, vertex, a, b = heapq.heappop(self.queue)
+            if not (a.alive and b.alive and a.next is b):
+                continue
+            if kind == SPLIT_EVENT and not (vertex.alive and vertex.loop == a.loop and vertex is not b):
+                continue
+            return time, kind, vertex, a, b
+        return None
+
+    def advance(self, time):
+        self.current = max(self.current, time)
+
+    def apply(self, kind, vertex, a, b):
+        if kind == EDGE_EVENT:
+            if a.next.next is a or a.next.next.next is a:
+                for dead in loop_vertices(a):
+                    self.kill(dead)
+                return
+            self.schedule(self.settle([self.merge(a, b)]))
+            return
+
+        point = vertex.at(self.current)
+        first = self.add(point, vertex.in_dir, a.out_dir, vertex.loop)
+        second = self.add(point, a.out_dir, vertex.out_dir, next(self.loops))
+        self.link(vertex.prev, first)
+        self.link(first, b)
+        self.link(a, second)
+        self.link(second, vertex.next)
+        self.kill(vertex)
+        for part in loop_vertices(second):
+            part.loop = second.loop
+        self.schedule(self.settle([first, second]))
+
+
+class StraightSkeleton:
+    def __init__(self, points, max_events=None):
+        points = dedupe_points(points)
+        if len(points) < 3:
+            raise ValueError("Straight skeleton needs at least three vertices.")
+        if len(points) > MAX_VERTICES:
+            raise ValueError(f"Outline has {len(points)} vertices; the skeleton engine handles at most {MAX_VERTICES}.")
+
+        self.reversed = signed_area(points) < 0
+        if self.reversed:
+            points = points[::-1]
+
+        wavefront = Wavefront(points)
+        if not wavefront.live:
+            raise ValueError("Outline has no area to inset.")
+
+        self.start = points[0]
+
+        max_events = max_events or 20 * len(points)
+        for _ in range(max_events):
+            if not wavefront.live:
+                break
+            event = wavefront.pop()
+            if event is None:
+                break
+            time, kind, vertex, a, b = event
+            wavefront.advance(time)
+            wavefront.apply(kind, vertex, a, b)
+        else:
+            raise ValueError("Straight skeleton did not converge.")
+
+        if wavefront.live:
+            raise ValueError("Straight skeleton left an unbounded wavefront.")
+        self.vertices = wavefront.vertices
+
+    def inset(self, distance):
+        polygons = []
+        seen = set()
+        for vertex in self.vertices:
+            if vertex in seen or not vertex.birth <= distance < vertex.death:
+                continue
+            points = []
+            cursor = vertex
+            while cursor not in seen:
+                seen.add(cursor)
+                points.append(cursor.at(distance))
+                cursor = cursor.next_at(distance)
+            if self.reversed:
+                points.reverse()
+            polygons.append(points)
+        return polygons
+
+    def inset_path_data(self, distance):
+        polygons = self.inset(distance)
+        if not polygons:
+            return None
+
+        polygons.sort(key=lambda points: abs(signed_area(points)), reverse=True)
+        first = polygons[0]
+        nearest = min(
+            range(len(first)),
+            key=lambda k: (first[k][0] - self.start[0]) ** 2 + (first[k][1] - self.start[1]) ** 2
+        )
+        polygons[0] = first[nearest:] + first[:nearest]
+
+        parts = []
+        for points in polygons:
+            path_data = f"M {points[0][0]},{points[0][1]}"
+            for point in points[1:]:
+                path_data += f" L {point[0]},{point[1]}"
+            parts.append(path_data + " Z")
+        return " ".join(parts)
+
+
+def dedupe_points(points):
+    deduped = []
+    for point in points:
+        if not deduped or math.hypot(point[0] - deduped[-1][0], point[1] - deduped[-1][1]) > 1e-9:
+            deduped.append(point)
+    while len(deduped) > 1 and math.hypot(deduped[0][0] - deduped[-1][0], deduped[0][1] - deduped[-1][1]) <= 1e-9:
+        deduped.pop()
+
+    cleaned = []
+    n = len(deduped)
+    for i, point in enumerate(deduped):
+        prev_point = deduped[i - 1]
+        next_point = deduped[(i + 1) % n]
+        cross = (point[0] - prev_point[0]) * (next_point[1] - point[1]) - (point[1] - prev_point[1]) * (next_point[0] - point[0])
+        if abs(cross) > 1e-12:
+            cleaned.append(point)
+    return cleaned
+
+
+def is_polygonal(subpath):
+    for cmd in subpath:
+        letter = cmd[0].upper() if isinstance(cmd, tuple) else cmd.letter.upper()
+        if letter not in ('M', 'L', 'H', 'V', 'Z'):
+            return False
+    return True
+
+
+def skeleton_for_path(subpath):
+    try:
+        from inkex import Path
+        if isinstance(subpath, Path):
+            subpath = list(subpath.to_absolute())
+    except ImportError:
+        pass
+
+    contours = split_subpaths(subpath)
+    if len(contours) != 1 or not is_polygonal(contours[0]):
+        return None
+
+    return StraightSkeleton(subpath_to_points(contours[0]))
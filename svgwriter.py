@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+
+from xml.sax.saxutils import quoteattr
+
+import inkex
+from lxml import etree
+from inkex.elements._parser import SVG_PARSER
+
+
+def attributes(**values):
+    return "".join(
+        f" {name}={quoteattr(str(value))}" for name, value in values.items() if value is not None
+    )
+
+
+class FragmentWriter:
+    def __init__(self):
+        self.parts = []
+        self.open_groups = 0
+        self.bbox = None
+
+    def start_group(self, group_id, transform=None):
+        self.parts.append(f"<g{attributes(id=group_id, transform=transform)}>")
+        self.open_groups += 1
+
+    def end_group(self):
+        if not self.open_groups:
+            raise ValueError("No open group to close.")
+        self.parts.append("</g>")
+        self.open_groups -= 1
+
+    def path(self, path_id, d, style, transform=None):
+        d = str(d)
+        self.parts.append(f"<path{attributes(id=path_id, d=d, style=style, transform=transform)}/>")
+        path = inkex.Path(d).to_absolute()
+        if transform is not None:
+            path = path.transform(inkex.Transform(str(transform)))
+        self.bbox += path.bounding_box()
+
+    def paths(self, records):
+        for path_id, d, style, transform in records:
+            self.path(path_id, d, style, transform)
+
+    def fragment(self):
+        if self.open_groups:
+            raise ValueError("Fragment has unclosed groups.")
+        return f'<g xmlns="{inkex.NSS["svg"]}">' + "".join(self.parts) + "</g>"
+
+    def elements(self):
+        root = etree.fromstring(self.fragment(), parser=SVG_PARSER)
+        self.parts = []
+        return list(root)
@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+root = Path(__file__).resolve().parent.parent
+for path in (root, root / "deps"):
+    if path.exists() and str(path) not in sys.path:
+        sys.path.insert(0, str(path))
@@ -0,0 +1,140 @@
+import math
+
+import pytest
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import geometry
+from corpus import SHAPES, generate
+from offset import split_subpaths, distance
+
+import inkex
+
+
+SIZE = 100.0
+PRECISION = 0.25
+TOLERANCE = PRECISION * 2
+NODE_COUNTS = (10, 100)
+REFERENCE = geometry.get_backend("python")
+
+
+def subpaths(path_data):
+    return split_subpaths(list(inkex.Path(path_data).to_absolute()))
+
+
+def contours(path_data):
+    return [REFERENCE.flatten(subpath, PRECISION) for subpath in subpaths(path_data)]
+
+
+def run_flatten(backend, path_data):
+    return [backend.flatten(subpath, PRECISION) for subpath in subpaths(path_data)]
+
+
+def run_simplify(backend, path_data):
+    return [backend.simplify(points, PRECISION) for points in contours(path_data)]
+
+
+def run_boolean(operation):
+    def run(backend, path_data):
+        subject = contours(path_data)
+        clip = [[(x + SIZE / 3, y + SIZE / 5) for x, y in points] for points in subject]
+        return backend.boolean(subject, clip, operation)
+    return run
+
+
+def run_length(backend, path_data):
+    index = backend.length_index(path_data)
+    return [[index.locate(index.total * k / 16)[0] for k in range(16)]]
+
+
+def points_deviation(a, b):
+    a = [point for loop in a for point in loop]
+    b = [point for loop in b for point in loop]
+    if len(a) != len(b):
+        return math.inf
+    return max((distance(p, q) for p, q in zip(a, b)), default=0.0)
+
+
+def loop_deviation(points, loops):
+    segments = [(loop[i], loop[(i + 1) % len(loop)]) for loop in loops for i in range(len(loop))]
+    if not points or not segments:
+        return 0.0 if not points and not segments else math.inf
+
+    if np is not None:
+        a = np.array([segment[0] for segment in segments], dtype=float)
+        d = np.array([segment[1] for segment in segments], dtype=float) - a
+        length_sq = np.maximum((d * d).sum(axis=1), 1e-300)
+        worst = 0.0
+        for point in np.array(points, dtype=float):
+            t = np.clip(((point - a) * d).sum(axis=1) / length_sq, 0.0, 1.0)
+            nearest = a + t[:, None] * d
+            worst = max(worst, float(np.sqrt(((nearest - point) ** 2).sum(axis=1)).min()))
+        return worst
+
+    worst = 0.0
+    for point in points:
+        best = math.inf
+        for (x1, y1), (x2, y2) in segments:
+            dx, dy = x2 - x1, y2 - y1
+            length_sq = dx * dx + dy * dy
+            t = 0.0 if length_sq == 0 else max(0.0, min(1.0, ((point[0] - x1) * dx + (point[1] - y1) * dy) / length_sq))
+            best = min(best, math.hypot(x1 + t * dx - point[0], y1 + t * dy - point[1]))
+        worst = max(worst, best)
+    return worst
+
+
+def loops_deviation(a, b):
+    return max(
+        loop_deviation([point for loop in a for point in loop], b),
+        loop_deviation([point for loop in b for point in loop], a),
+    )
+
+
+# operation: (backend method it exercises, runner, deviation measure)
+OPERATIONS = {
+    "flatten": ("flatten", run_flatten, points_deviation),
+    "simplify": ("simplify", run_simplify, loops_deviation),
+    "union": ("boolean", run_boolean("union"), loops_deviation),
+    "difference": ("boolean", run_boolean("difference"), loops_deviation),
+    "length": ("length_index", run_length, points_deviation),
+}
+
+# Only operations a backend implements itself; inherited ones are covered by the backend they come from.
+CASES = [
+    pytest.param(name, operation, id=f"{name}-{operation}")
+    for name, backend in geometry.BACKENDS.items() if name != REFERENCE.name
+    for operation, (method, _, _) in OPERATIONS.items() if method in vars(backend)
+]
+
+
+@pytest.mark.parametrize("name, operation", CASES)
+@pytest.mark.parametrize("shape", sorted(SHAPES))
+@pytest.mark.parametrize("nodes", NODE_COUNTS)
+def test_backend_matches_reference(name, operation, shape, nodes):
+    if not geometry.BACKENDS[name].available():
+        pytest.skip(f"{name} is not installed")
+    _, run, deviation = OPERATIONS[operation]
+    path_data = generate(shape, nodes, SIZE)
+    expected = run(REFERENCE, path_data)
+    assert deviation(expected, run(geometry.get_backend(name), path_data)) <= TOLERANCE
+
+
+def test_numpy_length_index_is_exact():
+    if not geometry.NumpyBackend.available():
+        pytest.skip("numpy is not installed")
+    for shape in SHAPES:
+        path_data = generate(shape, 100, SIZE)
+        assert geometry.get_backend("numpy").length_index(path_data).lengths == REFERENCE.length_index(path_data).lengths
+
+
+def test_auto_prefers_numpy_then_python():
+    expected = "numpy" if geometry.NumpyBackend.available() else "python"
+    assert geometry.get_backend("auto").name == expected
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        geometry.get_backend("missing")
@@ -0,0 +1,48 @@
+import math
+import time
+
+import pytest
+
+import inkex
+
+from corpus import SAWTOOTH_MIN_NODES, SHAPES, corpus, generate
+from offset import offset_path
+
+
+COUNT_NODES = (10, 11, 13, 100, 1000, 10000)
+BENCHMARK_NODES = (10, 100, 1000)
+SIZE = 100.0
+
+
+def node_count(path_data):
+    path = inkex.Path(path_data).to_absolute()
+    points = [(point.x, point.y) for segment, point in zip(path, path.end_points) if segment.letter != 'Z']
+    if len(points) > 1 and math.dist(points[0], points[-1]) < 1e-6:
+        points.pop()
+    return len(points)
+
+
+@pytest.mark.parametrize("shape", sorted(SHAPES))
+@pytest.mark.parametrize("nodes", COUNT_NODES)
+def test_generators_honour_node_count(shape, nodes):
+    assert node_count(generate(shape, nodes, SIZE)) == nodes
+
+
+def test_generation_is_seeded():
+    assert dict(corpus(node_counts=(10, 100))) == dict(corpus(node_counts=(10, 100)))
+    assert generate("star", 100, seed=1) != generate("star", 100, seed=2)
+
+
+def test_short_sawtooth_is_rejected():
+    with pytest.raises(ValueError):
+        generate("sawtooth", SAWTOOTH_MIN_NODES - 1)
+
+
+@pytest.mark.parametrize("shape", sorted(SHAPES))
+@pytest.mark.parametrize("nodes", BENCHMARK_NODES)
+def test_offset_benchmark(shape, nodes, record_property):
+    path = inkex.Path(generate(shape, nodes, SIZE))
+    start = time.perf_counter()
+    result = offset_path(path, -SIZE / 50, precision=0.25)
+    record_property("seconds", time.perf_counter() - start)
+    assert result is not None
@@ -0,0 +1,51 @@
+import io
+import math
+
+import inkex
+
+from export import LAYERS, export_paths, path_entities, write_dxf
+
+
+ROUNDED = "M 10,10 L 90,10 A 30,30 0 0 1 120,40 L 120,100 A 30,30 0 0 1 90,130 L 40,130 A 30,30 0 0 1 10,100 Z"
+
+
+def entity_ends(kind, data):
+    if kind == "LINE":
+        return list(data)
+    if kind == "ARC":
+        (cx, cy), radius, start_angle, end_angle = data
+        return [(cx + radius * math.cos(math.radians(angle)), cy + radius * math.sin(math.radians(angle)))
+                for angle in (start_angle, end_angle)]
+    vertices, _ = data
+    return [vertices[0][0], vertices[-1][0]]
+
+
+def test_arcs_become_arc_entities():
+    entities = list(path_entities(inkex.Path(ROUNDED)))
+    kinds = [kind for kind, _ in entities]
+    assert sorted(kinds) == ["ARC", "ARC", "ARC", "LINE", "LINE", "POLYLINE"]
+    assert all(math.isclose(data[1], 30) for kind, data in entities if kind == "ARC")
+
+    ends = [point for kind, data in entities for point in entity_ends(kind, data)]
+    for point in ends:
+        assert sum(math.dist(point, other) < 1e-9 for other in ends) == 2
+
+
+def test_straight_outline_stays_one_polyline():
+    entities = list(path_entities(inkex.Path("M 0,0 L 10,0 L 10,10 L 0,10 Z")))
+    assert [kind for kind, _ in entities] == ["POLYLINE"]
+    assert entities[0][1][1]
+
+
+def test_guides_are_left_out_unless_requested():
+    piece = {"items": [
+        {"d": "M 0,0 L 10,0 L 10,10 Z", "transform": None, "style": "outer"},
+        {"d": "M 2,2 L 4,2 L 4,4 Z", "transform": None, "style": "meta"},
+    ]}
+    cut_layers = {style: layer for style, layer in LAYERS.items() if style != "meta"}
+    assert [style for style, _ in export_paths([(piece, 0, 0)], 1.0, layers=cut_layers)] == ["outer"]
+    assert [style for style, _ in export_paths([(piece, 0, 0)], 1.0)] == ["outer", "meta"]
+
+    stream = io.StringIO()
+    write_dxf(stream, export_paths([(piece, 0, 0)], 1.0, layers=cut_layers), layers=cut_layers)
+    assert "META" not in stream.getvalue()